@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Peak RSS per concurrent generation, from base64 response to saved file.
+
+Each run is a fresh interpreter that starts ``--concurrency`` generate_diagram calls
+at once through the real server path (OpenAI provider decode, atomic save, response
+serialization). Only the network is stubbed: every call receives its own base64
+string of an ``--image-mb`` payload, as if just parsed from the API response. The
+reported figure is (peak RSS - RSS just before the calls) / concurrency, next to
+the traced Python-heap peak per call, which allocator noise does not blur.
+
+``--decoder legacy`` swaps the slice-wise decoder for ``base64.b64decode`` to show
+what the full-size ASCII copy costs. No API key, network or billing is involved.
+
+Usage examples:
+  python scripts/bench_memory.py
+  python scripts/bench_memory.py --concurrency 1,4,16 --image-mb 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+
+DECODERS = ("incremental", "legacy")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark peak RSS per concurrent generation")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument(
+        "--image-mb", type=float, default=8.0, help="Decoded image size (a 4K PNG is 8-12 MB)"
+    )
+    parser.add_argument("--decoder", choices=(*DECODERS, "both"), default="both")
+    parser.add_argument(
+        "--worker", nargs=2, metavar=("DECODER", "CONCURRENCY"), help=argparse.SUPPRESS
+    )
+    return parser.parse_args()
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb() -> float:
+    """Resident set size right now (Linux); elsewhere the peak so far."""
+    import os
+
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return _peak_rss_mb()
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+async def _worker(decoder: str, concurrency: int, image_mb: float) -> dict:
+    """Runs in a fresh interpreter (``--worker``)."""
+    import base64
+    import os
+    import tempfile
+    import tracemalloc
+    from pathlib import Path
+    from unittest.mock import patch
+
+    import yaml
+
+    from diagram_forge.providers.openai_provider import OpenAIProvider
+    from diagram_forge.server import create_server
+
+    def png_b64(size: int) -> bytes:
+        # Built in place so the setup itself never holds two full-size copies.
+        image = bytearray(os.urandom(size))
+        image[:8] = b"\x89PNG\r\n\x1a\n"
+        return base64.b64encode(image)
+
+    # Small until the warm-up call has done its lazy imports.
+    payload = {"encoded": png_b64(1024)}
+
+    class _StubTransport(OpenAIProvider):
+        async def _request_images(self, kwargs, image=None):
+            await asyncio.sleep(0.05)  # let the calls overlap like real requests
+            # A fresh str per call, like a parsed JSON response body.
+            return [payload["encoded"].decode("ascii")], None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg = {
+            "default_provider": "openai",
+            "provider_fallback_chain": ["openai"],
+            "output_directory": str(Path(tmp) / "out"),
+            "styles_directory": str(Path(tmp) / "styles"),
+            "database_path": str(Path(tmp) / "usage.db"),
+            "providers": {"openai": {"model": "gpt-image-2", "api_key_env": "BENCH_MEMORY_KEY"}},
+        }
+        config_path = Path(tmp) / "config.yaml"
+        config_path.write_text(yaml.dump(cfg))
+        os.environ["BENCH_MEMORY_KEY"] = "unused"
+        app = create_server(str(config_path))
+
+        def factory(name, api_key, model=None, **extra):
+            return _StubTransport(api_key=api_key, model=model)
+
+        patches = [patch("diagram_forge.server.get_provider", factory)]
+        if decoder == "legacy":
+            patches.append(
+                patch("diagram_forge.providers.openai_provider.decode_base64", base64.b64decode)
+            )
+        for p in patches:
+            p.start()
+
+        async def generate(name: str) -> dict:
+            raw = await app.call_tool(
+                "generate_diagram",
+                {"prompt": "a box", "output_path": str(Path(tmp) / "out" / f"{name}.png")},
+            )
+            if isinstance(raw, tuple):
+                raw = raw[-1]
+            if isinstance(raw, list) and raw and hasattr(raw[0], "text"):
+                raw = json.loads(raw[0].text)
+            return raw
+
+        try:
+            await generate("warmup")
+            payload["encoded"] = png_b64(int(image_mb * 1024 * 1024))
+            baseline = _current_rss_mb()
+            tracemalloc.start()
+            responses = await asyncio.gather(*(generate(str(n)) for n in range(concurrency)))
+            traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+            peak = _peak_rss_mb()
+        finally:
+            for p in patches:
+                p.stop()
+
+    ok = sum(1 for r in responses if r.get("status") == "success")
+    return {
+        "decoder": decoder,
+        "concurrency": concurrency,
+        "succeeded": ok,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak, 1),
+        "per_generation_mb": round((peak - baseline) / concurrency, 1),
+        "heap_per_generation_mb": round(traced_peak / concurrency, 1),
+    }
+
+
+def _run_worker(decoder: str, concurrency: int, image_mb: float) -> dict:
+    cmd = [
+        sys.executable,
+        __file__,
+        "--worker",
+        decoder,
+        str(concurrency),
+        "--image-mb",
+        str(image_mb),
+    ]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if out.returncode != 0:
+        return {"decoder": decoder, "concurrency": concurrency, "error": out.stderr.strip()[-500:]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+async def main() -> int:
+    args = parse_args()
+    if args.worker:
+        print(json.dumps(await _worker(args.worker[0], int(args.worker[1]), args.image_mb)))
+        return 0
+
+    decoders = DECODERS if args.decoder == "both" else (args.decoder,)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    report = []
+    for concurrency in levels:
+        for decoder in decoders:
+            row = _run_worker(decoder, concurrency, args.image_mb)
+            report.append(row)
+            if "error" in row:
+                print(f"{decoder:12} x{concurrency:<3} failed: {row['error']}")
+            else:
+                print(
+                    f"{decoder:12} x{concurrency:<3} peak={row['peak_rss_mb']:>7.1f} MB  "
+                    f"per generation={row['per_generation_mb']:>6.1f} MB "
+                    f"(heap {row['heap_per_generation_mb']:>5.1f} MB)  "
+                    f"({row['succeeded']}/{concurrency} ok, {args.image_mb:g} MB images)"
+                )
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Compare the vendor-SDK and raw-HTTP provider transports.
+
+Cold start is measured in a fresh interpreter per transport: module import, client
+construction and the first request (which, on the SDK path, includes importing the
+SDK). Steady state is measured in-process on one pooled provider after a warm-up call.
+
+By default each request is a health check (model listing), which is free and isolates
+transport overhead. ``--generate`` times real low-quality 1K generations instead.
+
+Usage examples:
+  python scripts/bench_transports.py --providers gemini,openai --requests 20
+  python scripts/bench_transports.py --providers openai --generate --requests 3
+"""
+
+from __future__ import annotations
+
+import time
+
+_PROCESS_START = time.perf_counter()
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+
+TRANSPORTS = ("sdk", "http")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark SDK vs raw-HTTP provider transports")
+    parser.add_argument("--providers", default="gemini,openai", help="Comma-separated providers")
+    parser.add_argument("--config", default=None, help="Optional config file path")
+    parser.add_argument(
+        "--requests", type=int, default=10, help="Steady-state requests per transport"
+    )
+    parser.add_argument("--generate", action="store_true", help="Time real generations (billed)")
+    parser.add_argument("--base-url", default=None, help="Override the http transport endpoint")
+    parser.add_argument(
+        "--cold", nargs=2, metavar=("PROVIDER", "TRANSPORT"), help=argparse.SUPPRESS
+    )
+    return parser.parse_args()
+
+
+def _provider(provider_name: str, transport: str, args: argparse.Namespace):
+    from diagram_forge.config import load_config, resolve_api_key
+    from diagram_forge.providers import get_provider
+
+    pconfig = load_config(args.config).providers[provider_name]
+    kwargs = {"transport": transport}
+    if args.base_url and transport == "http":
+        kwargs["base_url"] = args.base_url
+    return get_provider(
+        provider_name, resolve_api_key(pconfig) or "", model=pconfig.model, **kwargs
+    )
+
+
+async def _probe(provider, generate: bool) -> tuple[bool, str | None]:
+    if generate:
+        from diagram_forge.models import GenerationConfig, Quality, Resolution
+
+        result = await provider.generate(
+            GenerationConfig(
+                prompt="A single labelled box.", resolution=Resolution.RES_1K, quality=Quality.LOW
+            )
+        )
+        return result.success, result.error_message
+    health = await provider.health_check()
+    return health.available, None if health.available else health.message
+
+
+async def _cold(provider_name: str, transport: str, args: argparse.Namespace) -> dict:
+    """Runs in a fresh interpreter (``--cold``): everything up to the first response."""
+    import_start = time.perf_counter()
+    provider = _provider(provider_name, transport, args)
+    ready = time.perf_counter()
+    ok, error = await _probe(provider, args.generate)
+    done = time.perf_counter()
+    await provider.aclose()
+    return {
+        "ok": ok,
+        "error": error,
+        "import_ms": round((ready - import_start) * 1000, 1),
+        "first_request_ms": round((done - ready) * 1000, 1),
+        "total_ms": round((done - _PROCESS_START) * 1000, 1),
+    }
+
+
+def _run_cold(provider_name: str, transport: str, args: argparse.Namespace) -> dict:
+    cmd = [
+        sys.executable,
+        __file__,
+        "--cold",
+        provider_name,
+        transport,
+        "--providers",
+        provider_name,
+    ]
+    for flag, value in (("--config", args.config), ("--base-url", args.base_url)):
+        if value:
+            cmd += [flag, value]
+    if args.generate:
+        cmd.append("--generate")
+    out = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if out.returncode != 0:
+        return {"ok": False, "error": out.stderr.strip()[-500:]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+async def _steady(provider_name: str, transport: str, args: argparse.Namespace) -> dict:
+    provider = _provider(provider_name, transport, args)
+    try:
+        await _probe(provider, args.generate)  # warm-up: imports, TLS, connection pool
+        samples, failures = [], 0
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            ok, _ = await _probe(provider, args.generate)
+            samples.append((time.perf_counter() - start) * 1000)
+            failures += not ok
+    finally:
+        await provider.aclose()
+    samples.sort()
+    return {
+        "requests": len(samples),
+        "failures": failures,
+        "p50_ms": round(statistics.median(samples), 1),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+        "mean_ms": round(statistics.fmean(samples), 1),
+    }
+
+
+async def main() -> int:
+    args = parse_args()
+    if args.cold:
+        print(json.dumps(await _cold(args.cold[0], args.cold[1], args)))
+        return 0
+
+    report: dict[str, dict] = {}
+    for provider_name in [p.strip() for p in args.providers.split(",") if p.strip()]:
+        for transport in TRANSPORTS:
+            label = f"{provider_name}/{transport}"
+            cold = _run_cold(provider_name, transport, args)
+            steady = await _steady(provider_name, transport, args) if cold.get("ok") else None
+            report[label] = {"cold": cold, "steady": steady}
+            if steady:
+                print(
+                    f"{label:16} cold={cold['total_ms']:>8.1f}ms "
+                    f"(first request {cold['first_request_ms']:.1f}ms)  "
+                    f"steady p50={steady['p50_ms']:.1f}ms p95={steady['p95_ms']:.1f}ms"
+                )
+            else:
+                print(f"{label:16} failed: {cold.get('error')}")
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -4,6 +4,8 @@
 Usage examples:
   python scripts/eval_diagram_models.py --dry-run
   python scripts/eval_diagram_models.py --execute --providers gemini,openai --max-cost-usd 3
+  python scripts/eval_diagram_models.py --execute --batch --providers openai   # Batch API, ~50% off
+  python scripts/eval_diagram_models.py --execute --providers openai --output-formats png,webp
 """
 
 from __future__ import annotations
@@ -13,18 +15,25 @@ import asyncio
 import json
 import os
 import re
+import statistics
 import time
 from dataclasses import asdict, dataclass
-from io import BytesIO
 from pathlib import Path
 from typing import Any
 
 import yaml
-from PIL import Image, ImageDraw
 
 from diagram_forge.config import load_config, resolve_api_key
-from diagram_forge.models import AspectRatio, GenerationConfig, Resolution
-from diagram_forge.providers import get_provider
+from diagram_forge.imaging import stamp_label
+from diagram_forge.limiter import default_limiters, run_limited
+from diagram_forge.models import (
+    AspectRatio,
+    BatchRequest,
+    GenerationConfig,
+    OutputFormat,
+    Resolution,
+)
+from diagram_forge.providers import default_pool
 from diagram_forge.template_engine import build_prompt
 
 
@@ -35,9 +44,13 @@ class EvalResult:
     model: str
     success: bool
     elapsed_ms: int
+    queue_wait_ms: int
     cost_usd: float
     output_path: str | None
     error: str | None
+    output_format: str = "png"
+    # Size of the image as returned by the provider (before label stamping).
+    image_bytes: int = 0
 
 
 def parse_args() -> argparse.Namespace:
@@ -54,6 +67,27 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--diagram-type", default="architecture", choices=["architecture", "data_flow", "component", "sequence", "integration", "infographic", "generic"])
     parser.add_argument("--execute", action="store_true", help="Actually call providers")
     parser.add_argument("--dry-run", action="store_true", help="Plan-only mode")
+    parser.add_argument(
+        "--batch", action="store_true", help="Submit each provider's cases as one batch job"
+    )
+    parser.add_argument(
+        "--batch-poll-s", type=float, default=30.0, help="Batch status poll interval"
+    )
+    parser.add_argument(
+        "--batch-timeout-s",
+        type=float,
+        default=86_400.0,
+        help="Give up waiting on a batch after this long",
+    )
+    parser.add_argument(
+        "--output-formats",
+        default="png",
+        help="Comma-separated formats (png,webp,jpeg); each case runs once per format and "
+        "the summary compares bytes and latency against png",
+    )
+    parser.add_argument(
+        "--output-compression", type=int, default=None, help="0-100, webp/jpeg only"
+    )
     return parser.parse_args()
 
 
@@ -62,36 +96,21 @@ def _safe_model_label(model: str) -> str:
     return re.sub(r"[^a-zA-Z0-9._-]+", "-", model)
 
 
-def _stamp_model_label(image_data: bytes, provider_name: str, model: str) -> bytes:
-    """Stamp provider/model label onto generated image for side-by-side comparison."""
-    label = f"{provider_name}/{model}"
-    with Image.open(BytesIO(image_data)) as img:
-        image = img.convert("RGBA")
-        draw = ImageDraw.Draw(image, "RGBA")
-        text_x, text_y = 14, 14
-        box_w = max(180, int(len(label) * 8.5))
-        box_h = 30
-        draw.rectangle(
-            [(text_x - 8, text_y - 6), (text_x - 8 + box_w, text_y - 6 + box_h)],
-            fill=(0, 0, 0, 150),
-        )
-        draw.text((text_x, text_y), label, fill=(255, 255, 255, 255))
-        out = BytesIO()
-        image.convert("RGB").save(out, format="PNG")
-        return out.getvalue()
-
-
 def load_benchmark(path: str) -> dict[str, Any]:
     with open(path) as f:
         return yaml.safe_load(f) or {}
 
 
-def estimate_case_cost(provider_name: str, resolution: str) -> float:
+def estimate_case_cost(provider_name: str, resolution: str, batch: bool = False) -> float:
+    # Batch APIs bill at half the interactive rate.
+    discount = 0.5 if batch else 1.0
+    if provider_name == "local":
+        return 0.0
     if provider_name == "gemini":
-        return 0.039
+        return 0.039 * discount
     if provider_name == "openai":
-        return 0.011 if resolution == "1K" else 0.016
-    return 0.05
+        return (0.011 if resolution == "1K" else 0.016) * discount
+    return 0.05 * discount
 
 
 def quick_label_score(prompt_case: dict[str, Any], used_prompt: str) -> float:
@@ -107,11 +126,14 @@ async def run_case(
     provider_name: str,
     model: str,
     api_key: str,
+    provider_kwargs: dict[str, Any],
     case: dict[str, Any],
     output_dir: Path,
     resolution: str,
     aspect_ratio: str,
     execute: bool,
+    output_format: str = "png",
+    output_compression: int | None = None,
 ) -> EvalResult:
     case_id = case["id"]
     full_prompt = build_prompt(
@@ -128,31 +150,30 @@ async def run_case(
             model=model,
             success=True,
             elapsed_ms=0,
+            queue_wait_ms=0,
             cost_usd=estimate_case_cost(provider_name, resolution),
             output_path=None,
             error=None,
+            output_format=output_format,
         )
 
-    provider = get_provider(provider_name, api_key, model=model)
     cfg = GenerationConfig(
         prompt=full_prompt,
         resolution=Resolution(resolution),
         aspect_ratio=AspectRatio(aspect_ratio),
         temperature=0.3,
+        output_format=OutputFormat(output_format),
+        output_compression=output_compression,
     )
 
     start = time.monotonic()
-    result = await provider.generate(cfg)
-    elapsed_ms = int((time.monotonic() - start) * 1000)
-
-    output_path: str | None = None
-    if result.success and result.image_data:
-        stamped = _stamp_model_label(result.image_data, provider_name, model)
-        model_label = _safe_model_label(model)
-        fname = f"{provider_name}__{model_label}__{case_id}.png"
-        path = output_dir / fname
-        path.write_bytes(stamped)
-        output_path = str(path)
+    async with default_pool.lease(
+        provider_name, api_key, model=model, **provider_kwargs
+    ) as provider:
+        result = await run_limited(
+            default_limiters.get(provider_name, model), lambda: provider.generate(cfg)
+        )
+    elapsed_ms = int((time.monotonic() - start) * 1000) - result.queue_wait_ms
 
     return EvalResult(
         case_id=case_id,
@@ -160,15 +181,147 @@ async def run_case(
         model=model,
         success=result.success,
         elapsed_ms=elapsed_ms,
+        queue_wait_ms=result.queue_wait_ms,
         cost_usd=result.cost_usd,
-        output_path=output_path,
+        output_path=_save_case_image(
+            result, provider_name, model, f"{case_id}__{output_format}", output_dir
+        ),
         error=result.error_message,
+        output_format=output_format,
+        image_bytes=len(result.image_data or b""),
     )
 
 
+def _save_case_image(
+    result, provider_name: str, model: str, case_id: str, output_dir: Path
+) -> str | None:
+    if not (result.success and result.image_data):
+        return None
+    stamped = stamp_label(result.image_data, f"{provider_name}/{model}")
+    model_label = _safe_model_label(model)
+    fname = f"{provider_name}__{model_label}__{case_id}.png"
+    path = output_dir / fname
+    path.write_bytes(stamped)
+    return str(path)
+
+
+async def run_batch(
+    provider_name: str,
+    model: str,
+    api_key: str,
+    provider_kwargs: dict[str, Any],
+    cases: list[dict[str, Any]],
+    output_dir: Path,
+    resolution: str,
+    aspect_ratio: str,
+    poll_interval_s: float,
+    timeout_s: float,
+    output_format: str = "png",
+    output_compression: int | None = None,
+) -> list[EvalResult]:
+    """Run every case for one provider as a single batch job: submit, poll, fetch."""
+    requests = [
+        BatchRequest(
+            custom_id=case["id"],
+            config=GenerationConfig(
+                prompt=build_prompt(
+                    diagram_type=case["diagram_type"],
+                    user_prompt=case["prompt"],
+                    resolution=resolution,
+                    aspect_ratio=aspect_ratio,
+                ),
+                resolution=Resolution(resolution),
+                aspect_ratio=AspectRatio(aspect_ratio),
+                temperature=0.3,
+                output_format=OutputFormat(output_format),
+                output_compression=output_compression,
+            ),
+        )
+        for case in cases
+    ]
+
+    start = time.monotonic()
+    async with default_pool.lease(
+        provider_name, api_key, model=model, **provider_kwargs
+    ) as provider:
+        job = await provider.submit_batch(requests)
+        print(f"[batch] {provider_name} submitted {job.batch_id} ({job.request_count} requests)")
+        while not job.status.terminal and time.monotonic() - start < timeout_s:
+            await asyncio.sleep(poll_interval_s)
+            job = await provider.poll_batch(job)
+            print(
+                f"[batch] {provider_name} {job.status.value} {job.completed_count}/{job.request_count}"
+            )
+        results = await provider.fetch_batch(job) if job.status.terminal else {}
+    elapsed_ms = int((time.monotonic() - start) * 1000)
+
+    evals = []
+    for case in cases:
+        result = results.get(case["id"])
+        evals.append(
+            EvalResult(
+                case_id=case["id"],
+                provider=provider_name,
+                model=model,
+                success=bool(result and result.success),
+                # Batch turnaround; per-request latency is not observable.
+                elapsed_ms=elapsed_ms,
+                queue_wait_ms=0,
+                cost_usd=result.cost_usd if result else 0.0,
+                output_path=_save_case_image(
+                    result, provider_name, model, f"{case['id']}__{output_format}", output_dir
+                )
+                if result
+                else None,
+                error=result.error_message
+                if result
+                else f"batch {job.status.value} after {elapsed_ms}ms",
+                output_format=output_format,
+                image_bytes=len(result.image_data or b"") if result else 0,
+            )
+        )
+    return evals
+
+
+def format_comparison(results: list[EvalResult]) -> dict[str, dict[str, Any]]:
+    """Mean bytes and latency per provider/format, with savings relative to png."""
+    comparison: dict[str, dict[str, Any]] = {}
+    for provider_name in dict.fromkeys(r.provider for r in results):
+        per_format: dict[str, Any] = {}
+        for fmt in dict.fromkeys(r.output_format for r in results if r.provider == provider_name):
+            ok = [
+                r
+                for r in results
+                if r.provider == provider_name and r.output_format == fmt and r.success
+            ]
+            if not ok:
+                continue
+            per_format[fmt] = {
+                "n": len(ok),
+                "mean_bytes": int(statistics.mean(r.image_bytes for r in ok)),
+                "mean_elapsed_ms": int(statistics.mean(r.elapsed_ms for r in ok)),
+            }
+        baseline = per_format.get("png")
+        if baseline:
+            for fmt, stats in per_format.items():
+                if fmt == "png":
+                    continue
+                stats["bytes_saved_pct"] = round(
+                    100 * (1 - stats["mean_bytes"] / max(baseline["mean_bytes"], 1)), 1
+                )
+                stats["latency_saved_ms"] = baseline["mean_elapsed_ms"] - stats["mean_elapsed_ms"]
+        comparison[provider_name] = per_format
+    return comparison
+
+
 async def main() -> int:
     args = parse_args()
     execute = args.execute and not args.dry_run
+    output_formats = [f.strip().lower() for f in args.output_formats.split(",") if f.strip()]
+    valid_formats = {f.value for f in OutputFormat}
+    if not output_formats or not set(output_formats) <= valid_formats:
+        print(f"--output-formats must be a comma-separated subset of {sorted(valid_formats)}")
+        return 1
 
     if args.prompt_file:
         prompt_path = Path(args.prompt_file)
@@ -197,26 +350,28 @@ async def main() -> int:
     config = load_config(args.config)
     providers = [p.strip() for p in args.providers.split(",") if p.strip()]
 
-    matrix: list[tuple[str, str, str]] = []
+    matrix: list[tuple[str, str, str, dict[str, Any]]] = []
     for provider_name in providers:
         pconfig = config.providers.get(provider_name)
         if not pconfig:
             print(f"Skipping unconfigured provider: {provider_name}")
             continue
-        api_key = resolve_api_key(pconfig) or ""
-        if execute and not api_key:
+        api_key = resolve_api_key(pconfig)
+        if execute and api_key is None:
             print(f"Skipping {provider_name}: missing API key ({pconfig.api_key_env})")
             continue
-        matrix.append((provider_name, pconfig.model, api_key))
+        matrix.append((provider_name, pconfig.model, api_key or "", pconfig.extra))
 
     if not matrix:
         print("No runnable providers in matrix")
         return 1
 
     estimated_total = 0.0
-    for provider_name, _, _ in matrix:
+    for provider_name, _, _, _ in matrix:
         for _ in cases:
-            estimated_total += estimate_case_cost(provider_name, args.resolution)
+            estimated_total += estimate_case_cost(
+                provider_name, args.resolution, batch=args.batch
+            ) * len(output_formats)
 
     print(f"Estimated benchmark cost: ${estimated_total:.3f}")
     if estimated_total > args.max_cost_usd:
@@ -228,21 +383,54 @@ async def main() -> int:
     run_dir.mkdir(parents=True, exist_ok=True)
 
     results: list[EvalResult] = []
-    for provider_name, model, api_key in matrix:
-        for case in cases:
-            r = await run_case(
-                provider_name=provider_name,
-                model=model,
-                api_key=api_key,
-                case=case,
-                output_dir=run_dir,
-                resolution=args.resolution,
-                aspect_ratio=args.aspect_ratio,
-                execute=execute,
-            )
-            results.append(r)
-            status = "ok" if r.success else "fail"
-            print(f"[{status}] {provider_name} {case['id']} cost=${r.cost_usd:.4f} t={r.elapsed_ms}ms")
+    try:
+        for (provider_name, model, api_key, provider_kwargs), output_format in (
+            (entry, fmt) for entry in matrix for fmt in output_formats
+        ):
+            if args.batch and execute:
+                for r in await run_batch(
+                    provider_name=provider_name,
+                    model=model,
+                    api_key=api_key,
+                    provider_kwargs=provider_kwargs,
+                    cases=cases,
+                    output_dir=run_dir,
+                    resolution=args.resolution,
+                    aspect_ratio=args.aspect_ratio,
+                    poll_interval_s=args.batch_poll_s,
+                    timeout_s=args.batch_timeout_s,
+                    output_format=output_format,
+                    output_compression=args.output_compression,
+                ):
+                    results.append(r)
+                    status = "ok" if r.success else "fail"
+                    print(
+                        f"[{status}] {provider_name} {r.case_id} {output_format} "
+                        f"cost=${r.cost_usd:.4f} t={r.elapsed_ms}ms bytes={r.image_bytes}"
+                    )
+                continue
+            for case in cases:
+                r = await run_case(
+                    provider_name=provider_name,
+                    model=model,
+                    api_key=api_key,
+                    provider_kwargs=provider_kwargs,
+                    case=case,
+                    output_dir=run_dir,
+                    resolution=args.resolution,
+                    aspect_ratio=args.aspect_ratio,
+                    execute=execute,
+                    output_format=output_format,
+                    output_compression=args.output_compression,
+                )
+                results.append(r)
+                status = "ok" if r.success else "fail"
+                print(
+                    f"[{status}] {provider_name} {case['id']} {output_format} "
+                    f"cost=${r.cost_usd:.4f} t={r.elapsed_ms}ms bytes={r.image_bytes}"
+                )
+    finally:
+        await default_pool.aclose()
 
     # Lightweight prompt-completeness score from required labels in prompt text.
     # This is pre-change baseline only; post-change add OCR/image-based scoring.
@@ -262,14 +450,18 @@ async def main() -> int:
     summary = {
         "run_timestamp": ts,
         "execute": execute,
+        "batch": args.batch,
         "providers": providers,
         "resolution": args.resolution,
         "aspect_ratio": args.aspect_ratio,
+        "output_formats": output_formats,
+        "output_compression": args.output_compression,
         "max_cases": args.max_cases,
         "estimated_cost_usd": round(estimated_total, 6),
         "actual_cost_usd": total_cost,
         "success_rate": success_rate,
         "prompt_completeness_scores": prompt_scores,
+        "format_comparison": format_comparison(results),
         "results": [asdict(r) for r in results],
     }
 
@@ -0,0 +1,241 @@
+"""SQLite persistence for provider batch jobs submitted through the server.
+
+A batch can take up to a day to complete, far longer than an MCP session, so the
+handle returned by ``submit_batch`` and the intended output path of every item are
+stored alongside the cost ledger. ``collect_batch`` can then poll, fetch and save
+results from any later session, including after a server restart.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import uuid
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+
+from diagram_forge.models import BatchJob, BatchStatus
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    provider_batch_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    request_count INTEGER NOT NULL,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    provider_data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    collected_at TEXT
+);
+CREATE TABLE IF NOT EXISTS batch_items (
+    batch_id TEXT NOT NULL,
+    custom_id TEXT NOT NULL,
+    diagram_type TEXT,
+    resolution TEXT,
+    aspect_ratio TEXT,
+    output_path TEXT NOT NULL,
+    success INTEGER,
+    cost_usd REAL,
+    error_message TEXT,
+    PRIMARY KEY (batch_id, custom_id)
+);
+"""
+
+
+@dataclass
+class BatchItem:
+    """One diagram in a stored batch; outcome fields are filled in on collection."""
+
+    custom_id: str
+    output_path: str
+    diagram_type: str | None = None
+    resolution: str | None = None
+    aspect_ratio: str | None = None
+    success: bool | None = None
+    cost_usd: float | None = None
+    error_message: str | None = None
+
+
+@dataclass
+class StoredBatch:
+    id: str
+    provider: str
+    model: str
+    job: BatchJob
+    created_at: datetime
+    collected_at: datetime | None = None
+    items: list[BatchItem] = field(default_factory=list)
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+class BatchStore:
+    """SQLite-backed store of submitted batches and their items."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path))
+
+    def create(self, provider: str, model: str, job: BatchJob, items: list[BatchItem]) -> str:
+        """Persist a freshly submitted job; returns the server-side batch id."""
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO batches
+                    (id, provider, model, provider_batch_id, status, request_count,
+                     completed_count, failed_count, provider_data, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    batch_id,
+                    provider,
+                    model,
+                    job.batch_id,
+                    job.status.value,
+                    job.request_count,
+                    job.completed_count,
+                    job.failed_count,
+                    json.dumps(job.provider_data),
+                    now,
+                    now,
+                ),
+            )
+            conn.executemany(
+                """
+                INSERT INTO batch_items
+                    (batch_id, custom_id, diagram_type, resolution, aspect_ratio, output_path)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        batch_id,
+                        item.custom_id,
+                        item.diagram_type,
+                        item.resolution,
+                        item.aspect_ratio,
+                        item.output_path,
+                    )
+                    for item in items
+                ],
+            )
+        return batch_id
+
+    def get(self, batch_id: str) -> StoredBatch | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT provider, model, provider_batch_id, status, request_count,
+                       completed_count, failed_count, provider_data, created_at, collected_at
+                FROM batches WHERE id = ?
+                """,
+                (batch_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            item_rows = conn.execute(
+                """
+                SELECT custom_id, output_path, diagram_type, resolution, aspect_ratio,
+                       success, cost_usd, error_message
+                FROM batch_items WHERE batch_id = ? ORDER BY rowid
+                """,
+                (batch_id,),
+            ).fetchall()
+
+        job = BatchJob(
+            batch_id=row[2],
+            status=BatchStatus(row[3]),
+            request_count=row[4],
+            completed_count=row[5],
+            failed_count=row[6],
+            provider_data=json.loads(row[7]),
+        )
+        items = [
+            BatchItem(
+                custom_id=r[0],
+                output_path=r[1],
+                diagram_type=r[2],
+                resolution=r[3],
+                aspect_ratio=r[4],
+                success=None if r[5] is None else bool(r[5]),
+                cost_usd=r[6],
+                error_message=r[7],
+            )
+            for r in item_rows
+        ]
+        return StoredBatch(
+            id=batch_id,
+            provider=row[0],
+            model=row[1],
+            job=job,
+            created_at=datetime.fromisoformat(row[8]),
+            collected_at=datetime.fromisoformat(row[9]) if row[9] else None,
+            items=items,
+        )
+
+    def update_job(self, batch_id: str, job: BatchJob) -> None:
+        """Save the latest polled status, counts and provider data."""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE batches
+                SET status = ?, completed_count = ?, failed_count = ?, provider_data = ?,
+                    updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    job.status.value,
+                    job.completed_count,
+                    job.failed_count,
+                    json.dumps(job.provider_data),
+                    _now(),
+                    batch_id,
+                ),
+            )
+
+    def record_item(self, batch_id: str, item: BatchItem) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE batch_items SET success = ?, cost_usd = ?, error_message = ?
+                WHERE batch_id = ? AND custom_id = ?
+                """,
+                (
+                    None if item.success is None else int(item.success),
+                    item.cost_usd,
+                    item.error_message,
+                    batch_id,
+                    item.custom_id,
+                ),
+            )
+
+    def claim(self, batch_id: str) -> bool:
+        """Mark the batch collected unless another call already has; True if this one won.
+
+        The check and the write are a single UPDATE, so of several concurrent collections
+        exactly one fetches, saves and records the results.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE batches SET collected_at = ? WHERE id = ? AND collected_at IS NULL",
+                (_now(), batch_id),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, batch_id: str) -> None:
+        """Undo a claim whose fetch failed so a later call can retry the collection."""
+        with self._connect() as conn:
+            conn.execute("UPDATE batches SET collected_at = NULL WHERE id = ?", (batch_id,))
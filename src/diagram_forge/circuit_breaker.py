@@ -0,0 +1,134 @@
+"""Per-provider/model circuit breakers for the fallback chain.
+
+A provider that keeps failing is tripped OPEN so ``generate_diagram`` skips straight
+to the next candidate instead of paying the full timeout on every request. After
+``reset_timeout_s`` the breaker goes HALF_OPEN and lets a single probe through: a
+success closes it, a failure re-opens it for another cool-down.
+
+Only outage-like failures count. Rate limiting is the limiter's job (a throttled
+provider is up), a rejected request or prompt says nothing about provider health,
+and neither does a call cancelled by its caller. A call cut off by a deadline is
+reported as a failed result, since a provider that stops answering looks like that.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any
+
+from diagram_forge.models import CircuitBreakerConfig, CircuitState, ErrorKind, GenerationResult
+
+# Failures that reflect the request, not the provider's health.
+_NEUTRAL_KINDS = {ErrorKind.RATE_LIMITED, ErrorKind.INVALID_REQUEST, ErrorKind.POLICY}
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by failures within a sliding window."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        window_s: float = 60.0,
+        reset_timeout_s: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.reset_timeout_s = reset_timeout_s
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CircuitState.CLOSED
+        self._failures: deque[float] = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.last_error: str | None = None
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout_s
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True if a call may be attempted now (closed, or a free half-open probe slot).
+
+        In half-open a True answer claims the probe slot there and then, so callers that
+        check concurrently cannot all be let through. The caller must hand the slot back
+        with ``record`` once the call finishes, or ``release`` if it never makes it.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a half-open probe slot claimed by ``allow_request`` but never used."""
+        if self._state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, result: GenerationResult | None) -> None:
+        """Feed a finished call's outcome; ``None`` means cancelled by the caller (neutral)."""
+        self.release()
+        if result is None or result.error_kind in _NEUTRAL_KINDS:
+            return
+        if result.success:
+            self._state = CircuitState.CLOSED
+            self._failures.clear()
+            return
+        self.last_error = result.error_message
+        self._record_failure()
+
+    def _record_failure(self) -> None:
+        now = time.monotonic()
+        if self._state == CircuitState.HALF_OPEN:
+            self._trip(now)
+            return
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window_s:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = now
+        self._failures.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current state, for reporting."""
+        state = self.state
+        info: dict[str, Any] = {"state": state.value, "recent_failures": len(self._failures)}
+        if state == CircuitState.OPEN:
+            remaining = self.reset_timeout_s - (time.monotonic() - self._opened_at)
+            info["retry_in_ms"] = max(0, int(remaining * 1000))
+        if state != CircuitState.CLOSED and self.last_error:
+            info["last_error"] = self.last_error
+        return info
+
+
+class BreakerRegistry:
+    """One ``CircuitBreaker`` per (provider, model), created on first use."""
+
+    def __init__(self, config: CircuitBreakerConfig | None = None):
+        self.config = config or CircuitBreakerConfig()
+        self._breakers: dict[tuple[str, str | None], CircuitBreaker] = {}
+
+    def get(self, provider: str, model: str | None = None) -> CircuitBreaker:
+        key = (provider, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=self.config.failure_threshold,
+                window_s=self.config.window_s,
+                reset_timeout_s=self.config.reset_timeout_s,
+                half_open_max_calls=self.config.half_open_max_calls,
+            )
+            self._breakers[key] = breaker
+        return breaker
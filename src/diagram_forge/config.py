@@ -56,10 +56,16 @@ def load_config(config_path: str | Path | None = None) -> AppConfig:
 
 
 def resolve_api_key(provider_config: ProviderConfig, explicit_key: str | None = None) -> str | None:
-    """Resolve API key from explicit value or environment variable."""
+    """Resolve API key from explicit value or environment variable.
+
+    Returns ``""`` for keyless providers (no ``api_key_env``) and ``None`` when a
+    required key is missing, so callers should test ``is None`` rather than truthiness.
+    """
     if explicit_key:
         return explicit_key
-    return os.environ.get(provider_config.api_key_env)
+    if provider_config.api_key_env is None:
+        return ""
+    return os.environ.get(provider_config.api_key_env) or None
 
 
 def ensure_directories(config: AppConfig) -> None:
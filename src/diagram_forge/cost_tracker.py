@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import json
 import sqlite3
-from datetime import datetime, timezone
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta, timezone
 from pathlib import Path
+from uuid import UUID
 
 from diagram_forge.models import GenerationRecord, UsageReport
+from diagram_forge.timings import STAGES
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS generations (
@@ -18,6 +22,11 @@ CREATE TABLE IF NOT EXISTS generations (
     resolution TEXT,
     aspect_ratio TEXT,
     tokens_used INTEGER,
+    input_tokens INTEGER,
+    cached_input_tokens INTEGER,
+    output_tokens INTEGER,
+    image_input_tokens INTEGER,
+    image_output_tokens INTEGER,
     cost_usd REAL NOT NULL,
     billing_model TEXT NOT NULL,
     generation_time_ms INTEGER,
@@ -25,10 +34,45 @@ CREATE TABLE IF NOT EXISTS generations (
     output_path TEXT,
     template_used TEXT,
     style_used TEXT,
-    error_message TEXT
+    error_message TEXT,
+    timings TEXT
 );
 """
 
+# Columns added after the first release; ALTERed onto existing databases.
+_TOKEN_COLUMNS = (
+    "input_tokens",
+    "cached_input_tokens",
+    "output_tokens",
+    "image_input_tokens",
+    "image_output_tokens",
+)
+
+# Bucket width for the latency-vs-prompt-size report.
+_INPUT_TOKEN_BUCKET = 500
+
+
+def _round_or_none(value: float | None) -> int | None:
+    return None if value is None else round(value)
+
+
+def _aggregate_timings(rows: Iterable[dict[str, int]]) -> dict[str, dict[str, int]]:
+    """Count, mean and p95 per stage over many ``timings`` dicts, in pipeline order."""
+    samples: dict[str, list[int]] = {}
+    for timings in rows:
+        for stage, ms in timings.items():
+            samples.setdefault(stage, []).append(ms)
+    order = {stage: index for index, stage in enumerate(STAGES)}
+    report = {}
+    for stage in sorted(samples, key=lambda s: (order.get(s, len(order)), s)):
+        values = sorted(samples[stage])
+        report[stage] = {
+            "count": len(values),
+            "avg_ms": round(sum(values) / len(values)),
+            "p95_ms": values[min(len(values) - 1, int(0.95 * len(values)))],
+        }
+    return report
+
 
 class CostTracker:
     """SQLite-backed cost and usage tracker."""
@@ -39,9 +83,15 @@ class CostTracker:
         self._initialize()
 
     def _initialize(self) -> None:
-        """Create tables if they don't exist."""
+        """Create tables if they don't exist and add columns missing from older databases."""
         with self._connect() as conn:
             conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(generations)")}
+            for column in _TOKEN_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE generations ADD COLUMN {column} INTEGER")
+            if "timings" not in existing:
+                conn.execute("ALTER TABLE generations ADD COLUMN timings TEXT")
 
     def _connect(self) -> sqlite3.Connection:
         return sqlite3.connect(str(self.db_path))
@@ -53,10 +103,11 @@ class CostTracker:
                 """
                 INSERT INTO generations
                     (id, timestamp, provider, model, diagram_type, resolution,
-                     aspect_ratio, tokens_used, cost_usd, billing_model,
-                     generation_time_ms, success, output_path, template_used,
-                     style_used, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     aspect_ratio, tokens_used, input_tokens, cached_input_tokens,
+                     output_tokens, image_input_tokens, image_output_tokens, cost_usd,
+                     billing_model, generation_time_ms, success, output_path,
+                     template_used, style_used, error_message, timings)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     str(record.id),
@@ -67,6 +118,11 @@ class CostTracker:
                     record.resolution,
                     record.aspect_ratio,
                     record.tokens_used,
+                    record.input_tokens,
+                    record.cached_input_tokens,
+                    record.output_tokens,
+                    record.image_input_tokens,
+                    record.image_output_tokens,
                     record.cost_usd,
                     record.billing_model,
                     record.generation_time_ms,
@@ -75,9 +131,52 @@ class CostTracker:
                     record.template_used,
                     record.style_used,
                     record.error_message,
+                    json.dumps(record.timings) if record.timings is not None else None,
                 ),
             )
 
+    def update_timings(self, record_ids: Iterable[UUID], timings: dict[str, int]) -> None:
+        """Replace the timings of already-recorded rows.
+
+        The final stages of a request (saving the image, writing this ledger row) end
+        after its rows are inserted, so the full breakdown is attached afterwards.
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE generations SET timings = ? WHERE id = ?",
+                [(json.dumps(timings), str(record_id)) for record_id in record_ids],
+            )
+
+    def latency_percentile(
+        self,
+        provider: str,
+        model: str,
+        percentile: float = 0.95,
+        days: int = 7,
+        min_samples: int = 20,
+    ) -> int | None:
+        """Return the given latency percentile (ms) of recent successful generations.
+
+        Returns None when fewer than ``min_samples`` successes exist in the window, so
+        callers can fall back to a configured default instead of trusting thin history.
+        """
+        cutoff = (datetime.now(UTC) - timedelta(days=days)).isoformat()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT generation_time_ms FROM generations
+                WHERE provider = ? AND model = ? AND success = 1 AND timestamp >= ?
+                    AND generation_time_ms IS NOT NULL
+                ORDER BY generation_time_ms
+                """,
+                (provider, model, cutoff),
+            ).fetchall()
+
+        if len(rows) < min_samples:
+            return None
+        index = min(len(rows) - 1, int(percentile * len(rows)))
+        return int(rows[index][0])
+
     def get_usage_report(
         self,
         days: int = 30,
@@ -86,8 +185,6 @@ class CostTracker:
         """Generate an aggregated usage report."""
         cutoff = datetime.now(timezone.utc).isoformat()
         # Simple approach: calculate cutoff from days
-        from datetime import timedelta
-
         cutoff_dt = datetime.now(timezone.utc) - timedelta(days=days)
         cutoff = cutoff_dt.isoformat()
 
@@ -101,7 +198,10 @@ class CostTracker:
                     COUNT(*) as total,
                     COALESCE(SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END), 0) as successes,
                     COALESCE(SUM(CASE WHEN success = 0 THEN 1 ELSE 0 END), 0) as failures,
-                    COALESCE(SUM(cost_usd), 0) as total_cost
+                    COALESCE(SUM(cost_usd), 0) as total_cost,
+                    COALESCE(SUM(input_tokens), 0) as input_tokens,
+                    COALESCE(SUM(cached_input_tokens), 0) as cached_input_tokens,
+                    COALESCE(SUM(output_tokens), 0) as output_tokens
                 FROM generations
                 WHERE timestamp >= ?
                 """,
@@ -130,7 +230,10 @@ class CostTracker:
                     COUNT(*) as count,
                     SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successes,
                     COALESCE(SUM(cost_usd), 0) as cost,
-                    COALESCE(AVG(generation_time_ms), 0) as avg_time_ms
+                    COALESCE(AVG(generation_time_ms), 0) as avg_time_ms,
+                    AVG(input_tokens) as avg_input_tokens,
+                    AVG(cached_input_tokens) as avg_cached_input_tokens,
+                    AVG(output_tokens) as avg_output_tokens
                 FROM generations
                 WHERE timestamp >= ?
                 GROUP BY {group_col}
@@ -146,15 +249,56 @@ class CostTracker:
                     "successes": r["successes"],
                     "cost_usd": round(r["cost"], 6),
                     "avg_generation_time_ms": int(r["avg_time_ms"]),
+                    # None when no row in the group reported usage.
+                    "avg_input_tokens": _round_or_none(r["avg_input_tokens"]),
+                    "avg_cached_input_tokens": _round_or_none(r["avg_cached_input_tokens"]),
+                    "avg_output_tokens": _round_or_none(r["avg_output_tokens"]),
                 }
                 for r in breakdown_rows
             ]
 
+            latency_rows = conn.execute(
+                f"""
+                SELECT
+                    (input_tokens / {_INPUT_TOKEN_BUCKET}) * {_INPUT_TOKEN_BUCKET} as bucket,
+                    COUNT(*) as count,
+                    AVG(generation_time_ms) as avg_time_ms
+                FROM generations
+                WHERE timestamp >= ? AND success = 1 AND input_tokens IS NOT NULL
+                GROUP BY bucket
+                ORDER BY bucket
+                """,
+                (cutoff,),
+            ).fetchall()
+
+            latency_by_input_tokens = [
+                {
+                    "input_tokens_from": r["bucket"],
+                    "input_tokens_to": r["bucket"] + _INPUT_TOKEN_BUCKET - 1,
+                    "count": r["count"],
+                    "avg_generation_time_ms": int(r["avg_time_ms"] or 0),
+                }
+                for r in latency_rows
+            ]
+
+            timing_rows = conn.execute(
+                """
+                SELECT timings FROM generations
+                WHERE timestamp >= ? AND success = 1 AND timings IS NOT NULL
+                """,
+                (cutoff,),
+            ).fetchall()
+
         return UsageReport(
             period_days=days,
             total_generations=total,
             successful_generations=successes,
             failed_generations=failures,
             total_cost_usd=round(total_cost, 6),
+            total_input_tokens=row["input_tokens"],
+            total_cached_input_tokens=row["cached_input_tokens"],
+            total_output_tokens=row["output_tokens"],
             breakdown=breakdown,
+            latency_by_input_tokens=latency_by_input_tokens,
+            stage_timings=_aggregate_timings(json.loads(r["timings"]) for r in timing_rows),
         )
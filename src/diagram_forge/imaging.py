@@ -0,0 +1,76 @@
+"""Pillow helpers for comparing generated images side by side."""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+
+def _stamp(image: Image.Image, label: str) -> Image.Image:
+    """Draw ``label`` on a translucent dark box in the top-left corner."""
+    image = image.convert("RGBA")
+    draw = ImageDraw.Draw(image, "RGBA")
+    text_x, text_y = 14, 14
+    box_w = max(180, int(len(label) * 8.5))
+    box_h = 30
+    draw.rectangle(
+        [(text_x - 8, text_y - 6), (text_x - 8 + box_w, text_y - 6 + box_h)],
+        fill=(0, 0, 0, 150),
+    )
+    draw.text((text_x, text_y), label, fill=(255, 255, 255, 255))
+    return image.convert("RGB")
+
+
+def stamp_label(image_data: bytes, label: str) -> bytes:
+    """Return ``image_data`` as a PNG with ``label`` (e.g. "openai/gpt-image-2") stamped on."""
+    with Image.open(BytesIO(image_data)) as img:
+        stamped = _stamp(img, label)
+    out = BytesIO()
+    stamped.save(out, format="PNG")
+    return out.getvalue()
+
+
+def contact_sheet(
+    tiles: Sequence[tuple[bytes, str]],
+    columns: int = 2,
+    tile_width: int = 768,
+    gap: int = 16,
+) -> bytes:
+    """Lay labelled images out on a white grid and return it as PNG.
+
+    Every tile is scaled to ``tile_width`` (keeping its aspect ratio) before the
+    label is stamped, so labels read the same size whatever each provider returned.
+    """
+    if not tiles:
+        raise ValueError("contact_sheet needs at least one image")
+    columns = max(1, min(columns, len(tiles)))
+    scaled: list[Image.Image] = []
+    for data, label in tiles:
+        with Image.open(BytesIO(data)) as img:
+            height = max(1, round(img.height * tile_width / img.width))
+            scaled.append(_stamp(img.convert("RGB").resize((tile_width, height)), label))
+
+    rows = [scaled[i : i + columns] for i in range(0, len(scaled), columns)]
+    row_heights = [max(tile.height for tile in row) for row in rows]
+    sheet = Image.new(
+        "RGB",
+        (columns * tile_width + (columns + 1) * gap, sum(row_heights) + (len(rows) + 1) * gap),
+        (255, 255, 255),
+    )
+    y = gap
+    for row, row_height in zip(rows, row_heights):
+        for col, tile in enumerate(row):
+            sheet.paste(tile, (gap + col * (tile_width + gap), y))
+        y += row_height + gap
+
+    out = BytesIO()
+    sheet.save(out, format="PNG")
+    return out.getvalue()
+
+
+def grid_columns(count: int) -> int:
+    """Roughly square grid: 1 → 1, 2-4 → 2, 5-9 → 3, ..."""
+    return max(1, math.ceil(math.sqrt(count)))
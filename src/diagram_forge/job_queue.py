@@ -0,0 +1,215 @@
+"""In-process worker pool for ``submit_diagram_job``.
+
+``generate_diagram`` keeps the MCP call open for the whole fallback chain; a client
+that times out and retries pays for the diagram twice. Jobs instead return an id at
+once and run on a few asyncio workers, with all state in a ``JobStore``:
+
+- queued jobs are picked up again after a restart;
+- a job that was running when its server process died is marked failed, never
+  re-run, because the provider may already have billed for it;
+- resubmitting with the same idempotency key returns the existing job.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import time
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from diagram_forge.job_store import JobStore, StoredJob
+from diagram_forge.models import JobStatus
+
+logger = logging.getLogger(__name__)
+
+# How often wait() re-reads the store, for jobs run by another server process.
+_POLL_INTERVAL_S = 1.0
+
+JobResponse = dict[str, Any]
+
+
+def _process_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_alive(owner: str | None) -> bool:
+    """Whether the process that claimed a job still exists (only checkable on this host)."""
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    """Runs jobs from a ``JobStore`` on ``workers`` asyncio tasks.
+
+    ``execute`` receives a job's stored parameters and returns the response dict;
+    a response whose ``status`` is not "success" fails the job. Workers start on
+    first use or via ``start()``, which also resumes jobs left queued earlier.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        execute: Callable[[dict[str, Any]], Coroutine[Any, Any, JobResponse]],
+        workers: int = 2,
+    ):
+        self.store = store
+        self.execute = execute
+        self.worker_count = workers
+        self.owner = _process_owner()
+        # Replaced by start(), so a runner restarted on another event loop gets a fresh queue.
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._workers: list[asyncio.Task[None]] = []
+        self._running: dict[str, asyncio.Task[JobResponse]] = {}
+        # Wake-up events exist only while someone is in wait(): waiter count per job.
+        self._finished: dict[str, asyncio.Event] = {}
+        self._waiters: dict[str, int] = {}
+
+    def start(self) -> None:
+        """Start the workers (idempotent) and enqueue every job still queued in the store."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        for job in self.store.running():
+            if not _owner_alive(job.owner):
+                self.store.finish(
+                    job.id,
+                    JobStatus.FAILED,
+                    error_message=(
+                        "interrupted: the server stopped while this job was running. It was not "
+                        "retried because the provider may already have billed it; resubmit to retry."
+                    ),
+                )
+        for job_id in self.store.queued_ids():
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def aclose(self) -> None:
+        """Stop the workers; jobs they were running are marked failed (interrupted)."""
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def submit(
+        self,
+        params: dict[str, Any],
+        idempotency_key: str,
+        reuse_since: datetime | None = None,
+        reuse: bool = True,
+    ) -> tuple[StoredJob, bool]:
+        """Queue a job, or return the reusable one with this key. Returns ``(job, created)``.
+
+        ``reuse=False`` always queues a new job; the key is still stored with it.
+        """
+        existing = self.store.find_reusable(idempotency_key, since=reuse_since) if reuse else None
+        if existing is not None:
+            return existing, False
+        job = self.store.create(params, idempotency_key)
+        self.start()
+        self._queue.put_nowait(job.id)
+        return job, True
+
+    def cancel(self, job_id: str) -> StoredJob | None:
+        """Cancel a queued or running job. A running provider call is cancelled too."""
+        if self.store.cancel(job_id):
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+            self._notify(job_id)
+        return self.store.get(job_id)
+
+    async def wait(self, job_id: str, timeout_s: float) -> StoredJob | None:
+        """Return the job once it is terminal or ``timeout_s`` has passed."""
+        deadline = time.monotonic() + timeout_s
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            while True:
+                job = self.store.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job.status.terminal or remaining <= 0:
+                    return job
+                event = self._finished.setdefault(job_id, asyncio.Event())
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(event.wait(), min(remaining, _POLL_INTERVAL_S))
+        finally:
+            # The last waiter drops the event, whether the job finished here, in another
+            # process, or not yet; a finished job must not keep one around.
+            waiting = self._waiters.pop(job_id) - 1
+            if waiting:
+                self._waiters[job_id] = waiting
+            else:
+                self._finished.pop(job_id, None)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job %s crashed its worker", job_id)
+
+    async def _run(self, job_id: str) -> None:
+        if not self.store.claim(job_id, self.owner):
+            return  # cancelled, or claimed by another server process
+        job = self.store.get(job_id)
+        if job is None:
+            return  # deleted from the database since it was claimed
+        task = asyncio.create_task(self.execute(job.params))
+        self._running[job_id] = task
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # The worker is shutting down; do not leave the job looking alive.
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self.store.finish(
+                job_id, JobStatus.FAILED, error_message="interrupted: server shut down"
+            )
+            self._notify(job_id)
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        try:
+            self._record(job_id, task)
+        finally:
+            self._notify(job_id)
+
+    def _record(self, job_id: str, task: asyncio.Task[JobResponse]) -> None:
+        if task.cancelled():
+            return  # cancel_job already recorded it
+        exc = task.exception()
+        if exc is not None:
+            self.store.finish(job_id, JobStatus.FAILED, error_message=str(exc))
+            return
+        result = task.result()
+        status = JobStatus.SUCCEEDED if result.get("status") == "success" else JobStatus.FAILED
+        self.store.finish(job_id, status, result=result, error_message=result.get("error"))
+
+    def _notify(self, job_id: str) -> None:
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+
+def reuse_cutoff(window_s: int) -> datetime:
+    """Earliest ``created_at`` a parameter-derived key may match."""
+    return datetime.now(UTC) - timedelta(seconds=window_s)
@@ -0,0 +1,215 @@
+"""SQLite persistence for ``submit_diagram_job`` jobs.
+
+Jobs live in the same database as the cost ledger, so a queued job survives a
+server restart and a finished job's result can be read from any later session.
+Every state change is a single conditional UPDATE, which keeps two server
+processes sharing the database from running the same job twice.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from diagram_forge.models import JobStatus
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    owner TEXT,
+    result TEXT,
+    error_message TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(idempotency_key);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+"""
+
+_COLUMNS = (
+    "id, status, idempotency_key, params, owner, result, error_message, "
+    "created_at, started_at, finished_at"
+)
+
+
+@dataclass
+class StoredJob:
+    id: str
+    status: JobStatus
+    idempotency_key: str
+    params: dict[str, Any]
+    created_at: datetime
+    # "<host>:<pid>" of the server process that claimed the job.
+    owner: str | None = None
+    result: dict[str, Any] | None = None
+    error_message: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def _parse(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _json_object(text: str) -> dict[str, Any]:
+    """Decode a stored params/result column; both are always written as JSON objects."""
+    value = json.loads(text)
+    if not isinstance(value, dict):
+        raise TypeError(f"expected a JSON object in the jobs table, got {type(value).__name__}")
+    return value
+
+
+def _row_to_job(row: tuple[Any, ...]) -> StoredJob:
+    return StoredJob(
+        id=str(row[0]),
+        status=JobStatus(row[1]),
+        idempotency_key=str(row[2]),
+        params=_json_object(row[3]),
+        owner=row[4],
+        result=_json_object(row[5]) if row[5] else None,
+        error_message=row[6],
+        created_at=datetime.fromisoformat(row[7]),
+        started_at=_parse(row[8]),
+        finished_at=_parse(row[9]),
+    )
+
+
+class JobStore:
+    """SQLite-backed store of queued, running and finished jobs."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.db_path))
+
+    def create(self, params: dict[str, Any], idempotency_key: str) -> StoredJob:
+        job_id = f"job_{uuid.uuid4().hex[:12]}"
+        encoded = json.dumps(params)
+        created_at = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, idempotency_key, params, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JobStatus.QUEUED.value, idempotency_key, encoded, created_at),
+            )
+        return StoredJob(
+            id=job_id,
+            status=JobStatus.QUEUED,
+            idempotency_key=idempotency_key,
+            # Round-tripped like every later read, so callers see the stored form.
+            params=_json_object(encoded),
+            created_at=datetime.fromisoformat(created_at),
+        )
+
+    def get(self, job_id: str) -> StoredJob | None:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def find_reusable(
+        self, idempotency_key: str, since: datetime | None = None
+    ) -> StoredJob | None:
+        """Newest job with this key that is queued, running or succeeded."""
+        query = f"SELECT {_COLUMNS} FROM jobs WHERE idempotency_key = ? AND status IN (?, ?, ?)"
+        args: list[str] = [
+            idempotency_key,
+            JobStatus.QUEUED.value,
+            JobStatus.RUNNING.value,
+            JobStatus.SUCCEEDED.value,
+        ]
+        if since is not None:
+            query += " AND created_at >= ?"
+            args.append(since.isoformat())
+        query += " ORDER BY created_at DESC LIMIT 1"
+        with self._connect() as conn:
+            row = conn.execute(query, args).fetchone()
+        return _row_to_job(row) if row else None
+
+    def queued_ids(self) -> list[str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at",
+                (JobStatus.QUEUED.value,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def running(self) -> list[StoredJob]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status = ?", (JobStatus.RUNNING.value,)
+            ).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def queue_position(self, job_id: str) -> int | None:
+        """1-based position among queued jobs, or None if the job is not queued."""
+        ids = self.queued_ids()
+        return ids.index(job_id) + 1 if job_id in ids else None
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Move a queued job to running for ``owner``; False if it is no longer queued."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, started_at = ? WHERE id = ? AND status = ?",
+                (JobStatus.RUNNING.value, owner, _now(), job_id, JobStatus.QUEUED.value),
+            )
+        return cursor.rowcount == 1
+
+    def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        result: dict[str, Any] | None = None,
+        error_message: str | None = None,
+    ) -> bool:
+        """Record the outcome of a running job; False if it was cancelled meanwhile."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error_message = ?, finished_at = ?
+                WHERE id = ? AND status = ?
+                """,
+                (
+                    status.value,
+                    json.dumps(result) if result is not None else None,
+                    error_message,
+                    _now(),
+                    job_id,
+                    JobStatus.RUNNING.value,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it had already finished."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = ?, error_message = ?, finished_at = ?
+                WHERE id = ? AND status IN (?, ?)
+                """,
+                (
+                    JobStatus.CANCELLED.value,
+                    "cancelled by request",
+                    _now(),
+                    job_id,
+                    JobStatus.QUEUED.value,
+                    JobStatus.RUNNING.value,
+                ),
+            )
+        return cursor.rowcount == 1
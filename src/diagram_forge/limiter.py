@@ -0,0 +1,202 @@
+"""Adaptive per-provider concurrency limiting with 429 awareness.
+
+Each (provider, model) gets an AIMD limiter: every successful call raises the limit
+by ``1/limit`` (about +1 per full window of successes), and every rate-limited call
+halves it. A ``Retry-After`` / ``x-ratelimit-reset-*`` hint from the 429 also pauses
+new calls to that provider until the hinted time. Callers queue instead of
+stampeding a provider that is already pushing back — which otherwise sends the
+fallback chain to the (more expensive) secondary.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from diagram_forge.models import ConcurrencyConfig, GenerationResult
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse OpenAI-style reset durations such as ``"20ms"``, ``"1s"`` or ``"6m0s"``."""
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def retry_after_from_headers(headers: Mapping[str, str]) -> float | None:
+    """Return how long (seconds) a provider asked us to wait, from response headers.
+
+    Checks ``retry-after-ms``, ``retry-after`` (seconds or HTTP date), then the
+    ``x-ratelimit-reset-requests`` / ``-tokens`` pair when the matching
+    ``x-ratelimit-remaining-*`` is exhausted. Returns None when there is no hint.
+    """
+    lower = {k.lower(): v for k, v in headers.items()}
+
+    if "retry-after-ms" in lower:
+        try:
+            return float(lower["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+
+    if "retry-after" in lower:
+        value = lower["retry-after"].strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    waits = []
+    for kind in ("requests", "tokens"):
+        if lower.get(f"x-ratelimit-remaining-{kind}", "").strip() == "0":
+            reset = _parse_duration(lower.get(f"x-ratelimit-reset-{kind}", ""))
+            if reset is not None:
+                waits.append(reset)
+    return max(waits) if waits else None
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one provider/model."""
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        backoff_factor: float = 0.5,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self.blocked_until
+
+    async def acquire(self) -> int:
+        """Wait for a slot; returns the time spent queued in milliseconds."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while not self._has_capacity():
+            pause = self.blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken, then cancelled before taking the slot: hand it to the next waiter.
+                    self._waiters.remove(waiter)
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+        return int((time.monotonic() - start) * 1000)
+
+    def release(self, result: GenerationResult | None = None) -> None:
+        """Free a slot and adapt the limit to how the call went.
+
+        ``None`` (the call raised or was cancelled) leaves the limit unchanged.
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        if result is not None:
+            if result.rate_limited:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff_factor)
+                if result.retry_after_s:
+                    self.blocked_until = max(
+                        self.blocked_until, time.monotonic() + result.retry_after_s
+                    )
+            elif result.success:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        pause = self.blocked_until - time.monotonic()
+        if pause > 0:
+            asyncio.get_running_loop().call_later(pause, self._wake)
+            return
+        free = int(self.limit) - self.in_flight
+        for waiter in list(self._waiters):
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Current state, for reporting."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "blocked_for_ms": max(0, int((self.blocked_until - time.monotonic()) * 1000)),
+        }
+
+
+class LimiterRegistry:
+    """One ``AdaptiveLimiter`` per (provider, model), created on first use."""
+
+    def __init__(self, config: ConcurrencyConfig | None = None):
+        self.config = config or ConcurrencyConfig()
+        self._limiters: dict[tuple[str, str | None], AdaptiveLimiter] = {}
+
+    def get(self, provider: str, model: str | None = None) -> AdaptiveLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = AdaptiveLimiter(
+                initial_limit=self.config.initial_limit,
+                min_limit=self.config.min_limit,
+                max_limit=self.config.max_limit,
+                backoff_factor=self.config.backoff_factor,
+            )
+            self._limiters[key] = limiter
+        return limiter
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        return {
+            f"{provider}/{model}" if model else provider: limiter.snapshot()
+            for (provider, model), limiter in self._limiters.items()
+        }
+
+
+async def run_limited(
+    limiter: AdaptiveLimiter,
+    call: Callable[[], Awaitable[GenerationResult]],
+) -> GenerationResult:
+    """Run a provider call inside a limiter slot and stamp the queue wait on the result."""
+    wait_ms = await limiter.acquire()
+    result = None
+    try:
+        result = await call()
+    finally:
+        limiter.release(result)
+    result.queue_wait_ms = wait_ms
+    return result
+
+
+# Process-wide registry for callers without their own config (web API, eval runner).
+default_limiters = LimiterRegistry()
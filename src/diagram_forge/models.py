@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
 from enum import Enum
 from pathlib import Path
+from typing import Any
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
@@ -33,6 +34,7 @@ class ProviderName(str, Enum):
 
     GEMINI = "gemini"
     OPENAI = "openai"
+    LOCAL = "local"
 
 
 class Theme(str, Enum):
@@ -85,6 +87,45 @@ class Quality(str, Enum):
     AUTO = "auto"
 
 
+class OutputFormat(str, Enum):
+    """Encoded image format requested from the provider.
+
+    gpt-image models can return webp or jpeg, a fraction of the size of PNG for flat
+    diagram artwork; other providers return PNG regardless.
+    """
+
+    PNG = "png"
+    WEBP = "webp"
+    JPEG = "jpeg"
+
+    @property
+    def extension(self) -> str:
+        return ".jpg" if self is OutputFormat.JPEG else f".{self.value}"
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.value}"
+
+    @classmethod
+    def detect(cls, data: bytes) -> OutputFormat | None:
+        """Identify the format from the file signature, or None if unrecognised."""
+        if data.startswith(b"\x89PNG"):
+            return cls.PNG
+        if data.startswith(b"\xff\xd8\xff"):
+            return cls.JPEG
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return cls.WEBP
+        return None
+
+
+class LatencyTier(str, Enum):
+    """Caller-facing speed/quality trade-off, resolved by the server to a ``TierPlan``."""
+
+    FAST = "fast"
+    BALANCED = "balanced"
+    BEST = "best"
+
+
 class BillingModel(str, Enum):
     """How a provider charges."""
 
@@ -93,8 +134,65 @@ class BillingModel(str, Enum):
     PER_SECOND = "per_second"
 
 
+class ErrorKind(str, Enum):
+    """Why a provider call failed — decides whether to retry, fall back, or give up.
+
+    Only `transient` (and `rate_limited` with a short Retry-After) is retried on the
+    same provider; the rest go straight to the fallback chain.
+    """
+
+    TRANSIENT = "transient"  # 5xx, 408/409, connection resets, timeouts
+    RATE_LIMITED = "rate_limited"  # 429 throttling
+    AUTH = "auth"  # 401/403, exhausted quota or credit
+    INVALID_REQUEST = "invalid_request"  # 400/404/413/422 that no retry will fix
+    POLICY = "policy"  # content-policy / safety rejection
+    UNKNOWN = "unknown"
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class BatchStatus(str, Enum):
+    """Lifecycle of a provider batch job."""
+
+    SUBMITTED = "submitted"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    EXPIRED = "expired"
+    CANCELLED = "cancelled"
+
+    @property
+    def terminal(self) -> bool:
+        return self not in (BatchStatus.SUBMITTED, BatchStatus.RUNNING)
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a queued ``submit_diagram_job`` job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def terminal(self) -> bool:
+        return self not in (JobStatus.QUEUED, JobStatus.RUNNING)
+
+
 # --- Generation Config ---
 
+# Upper bound on images per request — each one is billed.
+MAX_VARIANTS = 4
+# The images API streams at most three partial frames per image.
+MAX_PARTIAL_IMAGES = 3
+
 
 class GenerationConfig(BaseModel):
     """Configuration passed to providers for image generation."""
@@ -102,10 +200,19 @@ class GenerationConfig(BaseModel):
     model_config = ConfigDict(extra="forbid")
 
     prompt: str = Field(min_length=1)
+    # Leading part of ``prompt`` that is identical for every call with the same
+    # template and theme; providers with explicit prompt caching may cache it.
+    prompt_prefix: str | None = None
     resolution: Resolution = Resolution.RES_2K
     aspect_ratio: AspectRatio = AspectRatio.WIDE
     temperature: float = Field(default=1.0, ge=0.0, le=2.0)
     quality: Quality = Quality.AUTO
+    variants: int = Field(default=1, ge=1, le=MAX_VARIANTS)
+    # Partial preview frames to stream before the final image (providers that support it).
+    partial_images: int = Field(default=0, ge=0, le=MAX_PARTIAL_IMAGES)
+    output_format: OutputFormat = OutputFormat.PNG
+    # 0-100 for webp/jpeg (providers that support it); None leaves the provider default.
+    output_compression: int | None = Field(default=None, ge=0, le=100)
     style_reference_path: Path | None = None
     output_path: Path | None = None
     reference_images: list[Path] = Field(default_factory=list)
@@ -114,20 +221,109 @@ class GenerationConfig(BaseModel):
 # --- Generation Result ---
 
 
+@dataclass
+class TokenUsage:
+    """Token counts reported by the provider for one request (or the sum of several).
+
+    ``input_tokens`` includes cached and image input tokens; ``output_tokens`` includes
+    image output tokens. The breakdowns are zero when a provider does not report them.
+    """
+
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    image_input_tokens: int = 0
+    image_output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def __add__(self, other: TokenUsage) -> TokenUsage:
+        return TokenUsage(
+            *(getattr(self, f.name) + getattr(other, f.name) for f in fields(TokenUsage))
+        )
+
+    def divided(self, parts: int) -> TokenUsage:
+        """An even share of this usage, for ledgers that record one row per image."""
+        return TokenUsage(*(getattr(self, f.name) // parts for f in fields(TokenUsage)))
+
+
 @dataclass
 class GenerationResult:
     """Result from a provider generation/edit call."""
 
     success: bool
+    # One immutable buffer per image, shared by reference from decode to disk; never copied.
     image_data: bytes | None = None
+    # Variants 2..N when more than one image was requested; image_data is variant 1.
+    extra_images: list[bytes] = field(default_factory=list)
     output_path: str | None = None
     model_used: str = ""
     tokens_used: int | None = None
+    # Provider-reported token breakdown; tokens_used is its total when present.
+    usage: TokenUsage | None = None
     cost_usd: float = 0.0
     billing_model: BillingModel = BillingModel.PER_IMAGE
     generation_time_ms: int = 0
     error_message: str | None = None
     metadata: dict = field(default_factory=dict)
+    error_kind: ErrorKind | None = None
+    # The provider's Retry-After / x-ratelimit-reset hint on a 429, when it sent one.
+    retry_after_s: float | None = None
+    # Same-provider retries spent on transient errors before this result.
+    retries: int = 0
+    # Time spent waiting for a concurrency slot, reported apart from provider latency.
+    queue_wait_ms: int = 0
+    # Time spent base64-decoding the returned images; 0 where it is not measured apart
+    # from the request (e.g. the SDK decodes internally).
+    decode_ms: int = 0
+
+    @property
+    def images(self) -> list[bytes]:
+        """Every image in the result, first variant first."""
+        return ([self.image_data] if self.image_data else []) + self.extra_images
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.error_kind == ErrorKind.RATE_LIMITED
+
+
+@dataclass
+class GenerationEvent:
+    """Progress event emitted by a provider while a generation is in flight.
+
+    ``stage`` is ``request_sent`` or ``partial_image``; partial events carry the
+    preview frame in ``image_data`` with its zero-based ``index``.
+    """
+
+    stage: str
+    index: int | None = None
+    image_data: bytes | None = None
+
+
+@dataclass
+class BatchRequest:
+    """One generation inside a batch; ``custom_id`` maps it back to its result."""
+
+    custom_id: str
+    config: GenerationConfig
+
+
+@dataclass
+class BatchJob:
+    """Handle for a submitted provider batch.
+
+    ``provider_data`` holds whatever the provider needs to poll and fetch the job later
+    (file ids, request order); it is JSON-serializable so the job can be persisted.
+    """
+
+    batch_id: str
+    status: BatchStatus
+    request_count: int
+    completed_count: int = 0
+    failed_count: int = 0
+    provider_data: dict[str, Any] = field(default_factory=dict)
 
 
 @dataclass
@@ -194,6 +390,26 @@ class TemplateVariable(BaseModel):
     default: str | None = None
 
 
+class TierPlan(BaseModel):
+    """Concrete provider/model/quality/resolution for a latency tier.
+
+    Unset fields leave the server's usual choice in place. A template's plan for a
+    tier overrides the config's field by field.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    provider: str | None = None
+    model: str | None = None
+    quality: Quality | None = None
+    resolution: Resolution | None = None
+
+    def merged(self, override: TierPlan | None) -> TierPlan:
+        if override is None:
+            return self
+        return self.model_copy(update=override.model_dump(exclude_none=True))
+
+
 class DiagramTemplate(BaseModel):
     """A YAML-loaded diagram template."""
 
@@ -209,6 +425,8 @@ class DiagramTemplate(BaseModel):
     recommended_provider: str | None = None
     recommended_model: str | None = None
     recommended_quality: str | None = None  # low|medium|high — applied when caller passes quality="auto"
+    # Per-template overrides of the config's latency_tiers plans.
+    latency_tiers: dict[LatencyTier, TierPlan] = Field(default_factory=dict)
     prompt_template: str
     variables: dict[str, str] = Field(default_factory=dict)
 
@@ -342,11 +560,92 @@ class ProviderConfig(BaseModel):
 
     enabled: bool = True
     model: str
-    api_key_env: str
+    # None for providers that need no key (the offline "local" provider).
+    api_key_env: str | None = None
     endpoint: str | None = None
     extra: dict = Field(default_factory=dict)
 
 
+# --- Hedging ---
+
+
+class HedgingConfig(BaseModel):
+    """Opt-in hedged requests across the provider fallback chain.
+
+    When enabled, the next candidate is started once the in-flight one has run past
+    its latency threshold — its historical p95 when enough history exists, otherwise
+    ``delay_ms``. The first success wins and the others are cancelled.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    enabled: bool = False
+    delay_ms: int = Field(default=30_000, ge=0)
+    use_p95: bool = True
+    min_samples: int = Field(default=20, ge=1)
+    lookback_days: int = Field(default=7, ge=1)
+
+
+# --- Job queue ---
+
+
+class JobQueueConfig(BaseModel):
+    """In-process worker pool behind ``submit_diagram_job``.
+
+    Submissions with the same idempotency key return the existing job unless it
+    failed or was cancelled. Submissions without a key always queue a new job, since
+    asking for the same diagram twice can be deliberate; set ``dedupe_window_s`` to
+    also treat identical parameters within that many seconds as a resubmission.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    workers: int = Field(default=2, ge=1)
+    dedupe_window_s: int = Field(default=0, ge=0)
+    # Upper bound for one wait_for_job call, kept under common client tool timeouts.
+    max_wait_s: float = Field(default=50.0, gt=0)
+
+
+# --- Concurrency ---
+
+
+class ConcurrencyConfig(BaseModel):
+    """Per-provider/model adaptive (AIMD) concurrency limits."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    initial_limit: int = Field(default=4, ge=1)
+    min_limit: int = Field(default=1, ge=1)
+    max_limit: int = Field(default=16, ge=1)
+    backoff_factor: float = Field(default=0.5, gt=0.0, lt=1.0)
+
+
+# --- Circuit Breaker ---
+
+
+class CircuitBreakerConfig(BaseModel):
+    """Per-provider/model circuit breaker thresholds."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    enabled: bool = True
+    failure_threshold: int = Field(default=5, ge=1)
+    window_s: float = Field(default=60.0, gt=0.0)
+    reset_timeout_s: float = Field(default=30.0, gt=0.0)
+    half_open_max_calls: int = Field(default=1, ge=1)
+
+
+# --- Latency Tiers ---
+
+
+def _default_latency_tiers() -> dict[LatencyTier, TierPlan]:
+    return {
+        LatencyTier.FAST: TierPlan(provider="gemini_flash_31", resolution=Resolution.RES_1K),
+        LatencyTier.BALANCED: TierPlan(provider="openai", quality=Quality.MEDIUM),
+        LatencyTier.BEST: TierPlan(provider="openai", quality=Quality.HIGH),
+    }
+
+
 # --- App Config ---
 
 
@@ -360,9 +659,16 @@ class AppConfig(BaseModel):
     provider_fallback_chain: list[str] = Field(default_factory=list)
     design_tokens: GlobalDesignTokens = Field(default_factory=GlobalDesignTokens)
     output_directory: str = "~/.diagram-forge/output"
+    # fsync each saved image (and its directory) before reporting it; slower, crash-safe.
+    fsync_output: bool = False
     styles_directory: str = "~/.diagram-forge/styles"
     database_path: str = "~/.diagram-forge/usage.db"
     providers: dict[str, ProviderConfig] = Field(default_factory=dict)
+    hedging: HedgingConfig = Field(default_factory=HedgingConfig)
+    latency_tiers: dict[LatencyTier, TierPlan] = Field(default_factory=_default_latency_tiers)
+    concurrency: ConcurrencyConfig = Field(default_factory=ConcurrencyConfig)
+    circuit_breaker: CircuitBreakerConfig = Field(default_factory=CircuitBreakerConfig)
+    jobs: JobQueueConfig = Field(default_factory=JobQueueConfig)
 
 
 # --- Cost Tracking ---
@@ -381,6 +687,11 @@ class GenerationRecord(BaseModel):
     resolution: str | None = None
     aspect_ratio: str | None = None
     tokens_used: int | None = None
+    input_tokens: int | None = None
+    cached_input_tokens: int | None = None
+    output_tokens: int | None = None
+    image_input_tokens: int | None = None
+    image_output_tokens: int | None = None
     cost_usd: float
     billing_model: str
     generation_time_ms: int = 0
@@ -389,6 +700,8 @@ class GenerationRecord(BaseModel):
     template_used: str | None = None
     style_used: str | None = None
     error_message: str | None = None
+    # Per-stage breakdown (see diagram_forge.timings), stored as JSON.
+    timings: dict[str, int] | None = None
 
 
 class UsageReport(BaseModel):
@@ -401,4 +714,11 @@ class UsageReport(BaseModel):
     successful_generations: int = 0
     failed_generations: int = 0
     total_cost_usd: float = 0.0
+    total_input_tokens: int = 0
+    total_cached_input_tokens: int = 0
+    total_output_tokens: int = 0
     breakdown: list[dict] = Field(default_factory=list)
+    # Successful generations bucketed by input-token count: how latency tracks prompt size.
+    latency_by_input_tokens: list[dict[str, Any]] = Field(default_factory=list)
+    # Successful generations with a timings breakdown: {stage: {count, avg_ms, p95_ms}}.
+    stage_timings: dict[str, dict[str, int]] = Field(default_factory=dict)
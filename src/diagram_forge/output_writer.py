@@ -0,0 +1,71 @@
+"""Saving generated images: off the event loop, atomically, under unique names.
+
+A 4K PNG is several MB; writing it inline stalls every other request on the loop.
+Each file is written to a temporary sibling and renamed over the target, so a
+reader (or a crash) never sees a half-written image, and default names carry a
+suffix that never repeats within the process, so concurrent generations started
+in the same second never overwrite each other.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import os
+import secrets
+import tempfile
+import time
+from pathlib import Path
+
+_SUFFIX_SPACE = 16**6
+# Consecutive suffixes from a random start: never repeat within a process (so tests and
+# concurrent calls cannot collide by chance) and differ between processes.
+_suffixes = itertools.count(secrets.randbelow(_SUFFIX_SPACE))
+
+# mkstemp creates files 0600; saved images get the mode a plain open() would give them.
+# The umask can only be read by setting it, so do that once, before any worker thread.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+
+def output_stamp() -> str:
+    """``<YYYYmmdd_HHMMSS>_<6 hex>``: sorts by time, unique across concurrent calls."""
+    return f"{time.strftime('%Y%m%d_%H%M%S')}_{next(_suffixes) % _SUFFIX_SPACE:06x}"
+
+
+def write_atomic(path: str | Path, data: bytes, fsync: bool = False) -> Path:
+    """Write ``data`` to ``path`` via a temp file in the same directory and a rename.
+
+    With ``fsync`` the file, and then its directory entry, are flushed to disk
+    before returning, so the image survives a power loss right after the call.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            if hasattr(os, "fchmod"):
+                os.fchmod(tmp.fileno(), _FILE_MODE)
+            tmp.write(data)
+            if fsync:
+                tmp.flush()
+                os.fsync(tmp.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_name)
+        raise
+    if fsync and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path.parent, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return path
+
+
+async def save_image(path: str | Path, data: bytes, fsync: bool = False) -> Path:
+    """``write_atomic`` on a worker thread."""
+    return await asyncio.to_thread(write_atomic, path, data, fsync)
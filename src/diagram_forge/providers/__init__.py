@@ -1,31 +1,57 @@
-"""Provider registry and factory for image generation providers."""
+"""Provider registry and factory for image generation providers.
 
+Provider classes are imported on first use (see ``registry``), so importing this
+package does not pull in any provider SDK.
+"""
+
+from typing import Any
+
+from diagram_forge.providers.asset_cache import AssetCache, default_asset_cache
 from diagram_forge.providers.base import BaseImageProvider
-from diagram_forge.providers.gemini import GeminiProvider
-from diagram_forge.providers.openai_provider import OpenAIProvider
-
-PROVIDER_MAP: dict[str, type[BaseImageProvider]] = {
-    "gemini": GeminiProvider,
-    "gemini_flash": GeminiProvider,        # legacy alias
-    "gemini_flash_31": GeminiProvider,     # gemini-3.1-flash-image (current default)
-    "gemini_flash_25": GeminiProvider,     # gemini-2.5-flash-image (deprecated, shut down Jan 2026)
-    "openai": OpenAIProvider,              # default: gpt-image-2-2026-04-21
-    "openai_mini": OpenAIProvider,         # gpt-image-1-mini (cheap tier, opt-in)
+from diagram_forge.providers.pool import ProviderPool, default_pool
+from diagram_forge.providers.registry import (
+    ENTRY_POINT_GROUP,
+    ProviderRegistry,
+    ProviderSpec,
+    default_registry,
+)
+
+# Kept under its historical name: a read-only name → class mapping.
+PROVIDER_MAP = default_registry
+
+_LAZY_CLASSES = {
+    "GeminiProvider": "gemini",
+    "LocalProvider": "local",
+    "OpenAIProvider": "openai",
 }
 
 
-def get_provider(provider_name: str, api_key: str, **kwargs) -> BaseImageProvider:
+def __getattr__(name: str) -> type[BaseImageProvider]:
+    if name in _LAZY_CLASSES:
+        return default_registry[_LAZY_CLASSES[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_provider(provider_name: str, api_key: str, **kwargs: Any) -> BaseImageProvider:
     """Instantiate a provider by name."""
-    provider_cls = PROVIDER_MAP.get(provider_name)
-    if not provider_cls:
+    if provider_name not in PROVIDER_MAP:
         raise ValueError(f"Unknown provider: {provider_name}. Available: {list(PROVIDER_MAP)}")
-    return provider_cls(api_key=api_key, **kwargs)
+    return PROVIDER_MAP[provider_name](api_key=api_key, **kwargs)
 
 
 __all__ = [
+    "AssetCache",
     "BaseImageProvider",
+    "ENTRY_POINT_GROUP",
     "GeminiProvider",
+    "LocalProvider",
     "OpenAIProvider",
     "PROVIDER_MAP",
+    "ProviderPool",
+    "ProviderRegistry",
+    "ProviderSpec",
+    "default_asset_cache",
+    "default_pool",
+    "default_registry",
     "get_provider",
 ]
@@ -0,0 +1,116 @@
+"""Cache of provider-side file handles for reference images, keyed by content hash.
+
+Style references and edit inputs are the same bytes call after call. Uploading them
+once (e.g. to the Gemini Files API) and sending the returned handle afterwards turns
+a multi-megabyte inline payload into a short URI. Handles expire on the provider
+side, so each entry carries its expiry and is treated as gone ``safety_margin_s``
+before then; callers fall back to inline bytes if a handle is rejected anyway.
+
+Entries are namespaced by provider and a digest of the API key, since uploaded files
+are only visible to the project that uploaded them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+
+@dataclass
+class RemoteAsset:
+    """A provider-side copy of some bytes."""
+
+    handle: str
+    mime_type: str
+    # Wall-clock expiry (epoch seconds); None if the provider did not say.
+    expires_at: float | None = None
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def asset_namespace(provider: str, api_key: str) -> str:
+    return f"{provider}:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+
+
+class AssetCache:
+    """In-memory (namespace, sha256) → ``RemoteAsset`` map with expiry and LRU bound."""
+
+    def __init__(self, safety_margin_s: float = 300.0, max_entries: int = 256):
+        self.safety_margin_s = safety_margin_s
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], RemoteAsset] = OrderedDict()
+        # Upload locks belong to the loop that created them; see ``_lock``.
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self._locks_loop: asyncio.AbstractEventLoop | None = None
+        self.hits = 0
+        self.uploads = 0
+
+    def get(self, namespace: str, digest: str) -> RemoteAsset | None:
+        key = (namespace, digest)
+        asset = self._entries.get(key)
+        if asset is None:
+            return None
+        if asset.expires_at is not None and time.time() >= asset.expires_at - self.safety_margin_s:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return asset
+
+    def put(self, namespace: str, digest: str, asset: RemoteAsset) -> None:
+        self._entries[(namespace, digest)] = asset
+        self._entries.move_to_end((namespace, digest))
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def invalidate(self, namespace: str, digest: str) -> None:
+        self._entries.pop((namespace, digest), None)
+
+    def _lock(self, key: tuple[str, str]) -> asyncio.Lock:
+        """Upload lock for ``key``, created in the running loop.
+
+        The cache is module-global and can outlive an event loop (tests, ``asyncio.run``
+        per CLI call); locks from a previous loop are dropped rather than reused.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._locks_loop:
+            self._locks = {}
+            self._locks_loop = loop
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def get_or_upload(
+        self,
+        namespace: str,
+        data: bytes,
+        mime_type: str,
+        upload: Callable[[bytes, str, str], Awaitable[RemoteAsset]],
+    ) -> tuple[RemoteAsset, str]:
+        """Return ``(asset, digest)``, calling ``upload(data, mime_type, digest)`` on a miss.
+
+        Concurrent requests for the same bytes (variants, hedged attempts) share one
+        upload.
+        """
+        digest = content_digest(data)
+        key = (namespace, digest)
+        async with self._lock(key):
+            asset = self.get(namespace, digest)
+            if asset is not None:
+                self.hits += 1
+                return asset, digest
+            asset = await upload(data, mime_type, digest)
+            self.uploads += 1
+            self.put(namespace, digest, asset)
+            return asset, digest
+
+
+# Shared by every provider instance in the process.
+default_asset_cache = AssetCache()
@@ -2,27 +2,76 @@
 
 from __future__ import annotations
 
+import asyncio
+import random
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, TypeVar
 
+import httpx
+
+from diagram_forge.limiter import retry_after_from_headers
 from diagram_forge.models import (
+    BatchJob,
+    BatchRequest,
     BillingModel,
+    ErrorKind,
     GenerationConfig,
+    GenerationEvent,
     GenerationResult,
     PricingInfo,
     ProviderHealth,
 )
+from diagram_forge.providers.http_transport import TRANSPORTS
+
+T = TypeVar("T")
+
+EventCallback = Callable[[GenerationEvent], Awaitable[None]]
+
+_TRANSIENT_STATUS = {408, 409, 500, 502, 503, 504, 529}
+_INVALID_STATUS = {400, 404, 413, 422}
+_POLICY_MARKERS = ("content_policy", "moderation", "safety", "blocked", "prohibited")
+_QUOTA_MARKERS = ("insufficient_quota", "credit_balance", "billing")
+# SDK connection/timeout errors that don't subclass httpx's (openai wraps them).
+_TRANSIENT_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+class RetriesExhausted(Exception):
+    """Raised from ``_call_with_retries`` (chained to the last error) once retries run out."""
+
+    def __init__(self, retries: int):
+        super().__init__(f"gave up after {retries} retries")
+        self.retries = retries
 
 
 class BaseImageProvider(ABC):
     """Abstract base for all image generation providers.
 
     Each provider implements generate, edit, health_check, pricing, and feature reporting.
+    Providers that talk to a remote API hold one long-lived SDK client per instance
+    (created lazily by ``_get_client``) so repeated calls reuse its connection pool;
+    ``aclose`` releases it. Instances are meant to be shared via ``ProviderPool``.
     """
 
+    # Same-provider retries for transient errors; override per instance via kwargs.
+    max_retries: int = 2
+    retry_base_delay_s: float = 0.5
+    retry_max_delay_s: float = 8.0
+
     def __init__(self, api_key: str, model: str | None = None, **kwargs):
         self.api_key = api_key
         self.model = model or self.default_model()
+        self.max_retries = int(kwargs.pop("max_retries", self.max_retries))
+        self.retry_base_delay_s = float(kwargs.pop("retry_base_delay_s", self.retry_base_delay_s))
+        self.retry_max_delay_s = float(kwargs.pop("retry_max_delay_s", self.retry_max_delay_s))
+        # "sdk" (vendor SDK) or "http" (raw httpx, see http_transport); base_url overrides
+        # the API endpoint for the http transport.
+        self.transport = kwargs.pop("transport", "sdk")
+        if self.transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport: {self.transport}. Available: {list(TRANSPORTS)}")
+        self.base_url = kwargs.pop("base_url", None)
         self.extra = kwargs
+        self._client: Any = None
 
     @abstractmethod
     def default_model(self) -> str:
@@ -34,11 +83,38 @@ class BaseImageProvider(ABC):
         """Generate an image from a text prompt."""
         ...
 
+    async def generate_with_progress(
+        self,
+        config: GenerationConfig,
+        on_event: EventCallback,
+    ) -> GenerationResult:
+        """Like ``generate``, reporting progress through ``on_event`` as it goes.
+
+        The default only announces the request; providers that can stream partial
+        frames (``"partial_images"`` in ``supported_features``) override this.
+        """
+        await on_event(GenerationEvent(stage="request_sent"))
+        return await self.generate(config)
+
     @abstractmethod
     async def edit(self, input_image: bytes, config: GenerationConfig) -> GenerationResult:
         """Edit an existing image based on a prompt."""
         ...
 
+    # --- Batch mode: bulk, non-interactive generation at the providers' batch discount ---
+
+    async def submit_batch(self, requests: list[BatchRequest]) -> BatchJob:
+        """Submit ``requests`` as one provider batch job (``"batch"`` in ``supported_features``)."""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch generation")
+
+    async def poll_batch(self, job: BatchJob) -> BatchJob:
+        """Refresh ``job``'s status and progress counts."""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch generation")
+
+    async def fetch_batch(self, job: BatchJob) -> dict[str, GenerationResult]:
+        """Results of a completed job, keyed by ``BatchRequest.custom_id``."""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch generation")
+
     @abstractmethod
     async def health_check(self) -> ProviderHealth:
         """Verify API connectivity and readiness."""
@@ -49,6 +125,14 @@ class BaseImageProvider(ABC):
         """Return pricing information for this provider."""
         ...
 
+    def estimate_cost(self, config: GenerationConfig) -> float:
+        """Expected charge for ``config`` when the provider reports no usage.
+
+        Used for calls abandoned after they were sent; defaults to the listed unit
+        price per variant.
+        """
+        return round(self.get_pricing().cost_per_unit * config.variants, 6)
+
     @abstractmethod
     def supported_features(self) -> set[str]:
         """Return set of supported feature strings.
@@ -57,7 +141,16 @@ class BaseImageProvider(ABC):
         """
         ...
 
-    def _make_error_result(self, error: str, time_ms: int = 0) -> GenerationResult:
+    async def aclose(self) -> None:
+        """Release the underlying SDK client and its connections, if one was created."""
+        self._client = None
+
+    def _make_error_result(
+        self,
+        error: str,
+        time_ms: int = 0,
+        kind: ErrorKind | None = None,
+    ) -> GenerationResult:
         """Helper to create a failed GenerationResult."""
         return GenerationResult(
             success=False,
@@ -65,4 +158,124 @@ class BaseImageProvider(ABC):
             model_used=self.model,
             generation_time_ms=time_ms,
             billing_model=BillingModel.PER_IMAGE,
+            error_kind=kind,
         )
+
+    def _error_from_exception(self, exc: Exception, time_ms: int = 0) -> GenerationResult:
+        """Build a failed result from an SDK exception, classified by ``_classify_exception``.
+
+        Rate-limit results carry the provider's Retry-After hint so callers' limiters
+        can back off.
+        """
+        retries = 0
+        cause: BaseException = exc
+        if isinstance(exc, RetriesExhausted):
+            retries = exc.retries
+            cause = exc.__cause__ or exc
+        result = self._make_error_result(str(cause), time_ms, self._classify_exception(cause))
+        result.retries = retries
+        if result.rate_limited:
+            result.retry_after_s = _retry_after(cause)
+        return result
+
+    @staticmethod
+    def _classify_exception(exc: BaseException) -> ErrorKind:
+        """Map an SDK/transport exception onto the ErrorKind taxonomy.
+
+        Both SDKs expose the HTTP status (``status_code`` on openai errors, ``code`` on
+        google-genai errors); connection failures and timeouts carry no status.
+        """
+        status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+        message = str(exc).lower()
+        if isinstance(status, int):
+            if any(m in message for m in _QUOTA_MARKERS):
+                return ErrorKind.AUTH
+            if status == 429:
+                return ErrorKind.RATE_LIMITED
+            if status in (401, 403):
+                return ErrorKind.AUTH
+            if status in _TRANSIENT_STATUS:
+                return ErrorKind.TRANSIENT
+            if any(m in message for m in _POLICY_MARKERS):
+                return ErrorKind.POLICY
+            if status in _INVALID_STATUS:
+                return ErrorKind.INVALID_REQUEST
+            if status >= 500:
+                return ErrorKind.TRANSIENT
+            return ErrorKind.UNKNOWN
+        if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+            return ErrorKind.TRANSIENT
+        if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__):
+            return ErrorKind.TRANSIENT
+        return ErrorKind.UNKNOWN
+
+    async def _call_with_retries(self, call: Callable[[], Awaitable[T]]) -> tuple[T, int]:
+        """Await ``call()``, retrying transient errors with full-jitter exponential backoff.
+
+        A 429 is retried too when the provider asked for a wait no longer than
+        ``retry_max_delay_s``. Anything else is raised immediately so the fallback chain
+        can move on. Returns ``(value, retries_used)``; when retries were spent before
+        the final failure, the error is wrapped in ``RetriesExhausted``.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await call(), attempt
+            except Exception as exc:
+                kind = self._classify_exception(exc)
+                delay = None
+                if attempt < self.max_retries:
+                    if kind == ErrorKind.TRANSIENT:
+                        cap = min(self.retry_max_delay_s, self.retry_base_delay_s * 2**attempt)
+                        delay = random.uniform(0, cap)
+                    elif kind == ErrorKind.RATE_LIMITED:
+                        hint = _retry_after(exc)
+                        if hint is not None and hint <= self.retry_max_delay_s:
+                            delay = hint + random.uniform(0, self.retry_base_delay_s)
+                if delay is None:
+                    if attempt:
+                        raise RetriesExhausted(attempt) from exc
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _gather_variants(
+        self, calls: Iterable[Awaitable[tuple[T, int]]]
+    ) -> tuple[list[tuple[T, int]], list[Exception]]:
+        """Await independent variant round-trips concurrently, keeping those that succeed.
+
+        Each variant is billed once the provider answers it, so one failure must not
+        throw the others away (and send the fallback chain to pay again). Returns
+        ``(outcomes, errors)``; only when every variant fails is the first error raised.
+        """
+        settled = await asyncio.gather(*calls, return_exceptions=True)
+        outcomes: list[tuple[T, int]] = []
+        errors: list[Exception] = []
+        for item in settled:
+            if isinstance(item, Exception):
+                errors.append(item)
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                outcomes.append(item)
+        if not outcomes:
+            raise errors[0]
+        return outcomes, errors
+
+    @staticmethod
+    def _note_failed_variants(
+        result: GenerationResult, errors: list[Exception]
+    ) -> GenerationResult:
+        """Record variants lost to errors in ``metadata`` of an otherwise successful result."""
+        if errors:
+            result.metadata["failed_variants"] = len(errors)
+            result.metadata["variant_errors"] = [str(exc) for exc in errors]
+        return result
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """The Retry-After hint from an SDK exception's HTTP response, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    return retry_after_from_headers(headers)
@@ -2,162 +2,607 @@
 
 from __future__ import annotations
 
+import base64
+import io
+import logging
 import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import httpx
 
 from diagram_forge.models import (
+    BatchJob,
+    BatchRequest,
+    BatchStatus,
     BillingModel,
     GenerationConfig,
     GenerationResult,
+    OutputFormat,
     PricingInfo,
     ProviderHealth,
+    TokenUsage,
+)
+from diagram_forge.payloads import decode_base64
+from diagram_forge.providers.asset_cache import (
+    AssetCache,
+    RemoteAsset,
+    asset_namespace,
+    content_digest,
+    default_asset_cache,
 )
 from diagram_forge.providers.base import BaseImageProvider
+from diagram_forge.providers.http_transport import gemini_client
+
+if TYPE_CHECKING:
+    from google.genai import types as genai_types
+
+logger = logging.getLogger(__name__)
+
+_COST_PER_IMAGE = 0.039
+# Batch mode bills at half the interactive rate.
+_BATCH_DISCOUNT = 0.5
+
+_BATCH_STATUS = {
+    "JOB_STATE_PENDING": BatchStatus.SUBMITTED,
+    "JOB_STATE_QUEUED": BatchStatus.SUBMITTED,
+    "JOB_STATE_SUCCEEDED": BatchStatus.COMPLETED,
+    "JOB_STATE_PARTIALLY_SUCCEEDED": BatchStatus.COMPLETED,
+    "JOB_STATE_FAILED": BatchStatus.FAILED,
+    "JOB_STATE_CANCELLED": BatchStatus.CANCELLED,
+    "JOB_STATE_EXPIRED": BatchStatus.EXPIRED,
+}
+
+_MIME_BY_SUFFIX = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+
+
+# Request content: prompt text, or inline image bytes with their MIME type. Kept
+# transport-neutral and converted by the SDK or raw-HTTP request builder.
+ContentPart = str | tuple[bytes, str]
+
+# One generate_content reply: the first image (if any) and the reported token usage.
+ImageReply = tuple[bytes | None, TokenUsage | None]
+
+
+def _image_part(path: Path) -> tuple[bytes, str]:
+    """Inline image part for a local reference file."""
+    mime = _MIME_BY_SUFFIX.get(path.suffix.lower(), "image/png")
+    return path.read_bytes(), mime
+
+
+def _first_image(response: Any) -> bytes | None:
+    """Bytes of the first inline image in a generate_content response, if any."""
+    if response.candidates:
+        for part in response.candidates[0].content.parts:
+            if part.inline_data and part.inline_data.mime_type.startswith("image/"):
+                image: bytes = part.inline_data.data
+                return image
+    return None
+
+
+def _usage_from(meta: dict[str, Any] | None) -> TokenUsage | None:
+    """TokenUsage from ``usage_metadata`` (SDK, dumped to JSON) or REST ``usageMetadata``."""
+    if not isinstance(meta, dict) or not meta:
+        return None
+
+    def field(name: str) -> Any:
+        head, *rest = name.split("_")
+        return meta.get(name, meta.get(head + "".join(part.title() for part in rest)))
+
+    def image_tokens(details_name: str) -> int:
+        details = field(details_name) or []
+        return sum(
+            (d.get("token_count", d.get("tokenCount")) or 0)
+            for d in details
+            if d.get("modality") == "IMAGE"
+        )
+
+    return TokenUsage(
+        input_tokens=field("prompt_token_count") or 0,
+        cached_input_tokens=field("cached_content_token_count") or 0,
+        # Thinking tokens are billed as output.
+        output_tokens=(field("candidates_token_count") or 0) + (field("thoughts_token_count") or 0),
+        image_input_tokens=image_tokens("prompt_tokens_details"),
+        image_output_tokens=image_tokens("candidates_tokens_details"),
+    )
+
+
+def _sdk_usage(response: Any) -> TokenUsage | None:
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None or not hasattr(meta, "model_dump"):
+        return None
+    return _usage_from(meta.model_dump(mode="json", exclude_none=True))
+
+
+def _first_image_json(payload: dict[str, Any]) -> bytes | None:
+    """``_first_image`` for a raw REST generateContent response."""
+    for candidate in payload.get("candidates", [])[:1]:
+        for part in candidate.get("content", {}).get("parts", []):
+            inline = part.get("inlineData")
+            if inline and inline.get("mimeType", "").startswith("image/"):
+                return decode_base64(inline["data"])
+    return None
+
+
+def _is_missing_file_error(exc: BaseException) -> bool:
+    """True if a request failed because an uploaded file handle is gone or foreign."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status in (400, 403, 404) and "file" in str(exc).lower()
+
+
+def _is_missing_cache_error(exc: BaseException) -> bool:
+    """True if a request failed because a cached-content handle is gone or foreign."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status in (400, 403, 404) and "cached" in str(exc).lower()
+
+
+def _without_prefix(contents: list[Any], config: GenerationConfig) -> list[Any]:
+    """``contents`` with the prompt cut down to what follows ``config.prompt_prefix``."""
+    rest = config.prompt[len(config.prompt_prefix or "") :].lstrip("\n")
+    return [rest if isinstance(part, str) and part == config.prompt else part for part in contents]
 
 
 class GeminiProvider(BaseImageProvider):
-    """Provider for Google Gemini image generation."""
+    """Provider for Google Gemini image generation.
+
+    On the SDK transport, image parts of at least ``asset_cache_min_bytes`` (style
+    references, edit inputs) are uploaded once to the Files API and then sent by URI;
+    see ``asset_cache``. Set ``asset_cache: false`` in the provider's ``extra`` to
+    always send them inline.
+
+    With ``prompt_cache: true`` in ``extra``, the static template prefix of a prompt
+    (``GenerationConfig.prompt_prefix``) is stored once as Gemini cached content for
+    ``prompt_cache_ttl_s`` and later requests send only the rest of the prompt. A
+    prefix the API refuses to cache (e.g. below the model's minimum size) is sent
+    inline from then on.
+    """
+
+    def __init__(self, api_key: str, model: str | None = None, **kwargs: Any):
+        self.use_asset_cache = bool(kwargs.pop("asset_cache", True))
+        self.asset_cache_min_bytes = int(kwargs.pop("asset_cache_min_bytes", 32_768))
+        self._assets: AssetCache = kwargs.pop("asset_cache_store", default_asset_cache)
+        self.use_prompt_cache = bool(kwargs.pop("prompt_cache", False))
+        self.prompt_cache_ttl_s = int(kwargs.pop("prompt_cache_ttl_s", 3600))
+        # Digests of prefixes the API would not cache; not retried by this instance.
+        self._uncacheable_prefixes: set[str] = set()
+        super().__init__(api_key=api_key, model=model, **kwargs)
 
     def default_model(self) -> str:
         return "gemini-3.1-flash-image-preview"
 
+    def _get_client(self) -> Any:
+        """Return this instance's long-lived client (genai or raw HTTP), creating it on first use."""
+        if self._client is None:
+            if self.transport == "http":
+                self._client = gemini_client(self.api_key, self.base_url)
+            else:
+                from google import genai
+
+                self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is None:
+            return
+        if self.transport == "http":
+            await client.aclose()
+        else:
+            await client.aio.aclose()
+            client.close()
+
     async def generate(self, config: GenerationConfig) -> GenerationResult:
         start = time.monotonic()
         try:
-            from google import genai
-            from google.genai import types
+            contents = self._generation_contents(config)
+            return await self._request_images(contents, config, start, "Gemini response")
 
-            client = genai.Client(api_key=self.api_key)
-
-            # Build generation config
-            gen_config = types.GenerateContentConfig(
-                response_modalities=["IMAGE", "TEXT"],
-                temperature=config.temperature,
-            )
+        except Exception as e:
+            elapsed_ms = int((time.monotonic() - start) * 1000)
+            return self._error_from_exception(e, elapsed_ms)
 
-            # Build prompt parts
-            contents: list = [config.prompt]
-
-            # Add style reference if provided
-            if config.style_reference_path and config.style_reference_path.exists():
-                ref_bytes = config.style_reference_path.read_bytes()
-                suffix = config.style_reference_path.suffix.lower()
-                mime = {
-                    ".png": "image/png",
-                    ".jpg": "image/jpeg",
-                    ".jpeg": "image/jpeg",
-                    ".webp": "image/webp",
-                }.get(suffix, "image/png")
-                contents.insert(0, types.Part.from_bytes(data=ref_bytes, mime_type=mime))
+    async def edit(self, input_image: bytes, config: GenerationConfig) -> GenerationResult:
+        start = time.monotonic()
+        try:
+            # Build contents with input image + edit prompt
+            input_format = OutputFormat.detect(input_image) or OutputFormat.PNG
+            contents: list[ContentPart] = [(input_image, input_format.mime_type), config.prompt]
 
             # Add reference images
             for ref_path in config.reference_images:
                 if ref_path.exists():
-                    ref_bytes = ref_path.read_bytes()
-                    suffix = ref_path.suffix.lower()
-                    mime = {
-                        ".png": "image/png",
-                        ".jpg": "image/jpeg",
-                        ".jpeg": "image/jpeg",
-                        ".webp": "image/webp",
-                    }.get(suffix, "image/png")
-                    contents.insert(0, types.Part.from_bytes(data=ref_bytes, mime_type=mime))
-
-            response = client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=gen_config,
-            )
+                    contents.insert(0, _image_part(ref_path))
 
+            return await self._request_images(contents, config, start, "Gemini edit response")
+
+        except Exception as e:
             elapsed_ms = int((time.monotonic() - start) * 1000)
+            return self._error_from_exception(e, elapsed_ms)
 
-            # Extract image from response
-            if response.candidates:
-                for part in response.candidates[0].content.parts:
-                    if part.inline_data and part.inline_data.mime_type.startswith("image/"):
-                        return GenerationResult(
-                            success=True,
-                            image_data=part.inline_data.data,
-                            model_used=self.model,
-                            cost_usd=0.039,
-                            billing_model=BillingModel.PER_IMAGE,
-                            generation_time_ms=elapsed_ms,
-                        )
+    @staticmethod
+    def _generation_contents(config: GenerationConfig) -> list[ContentPart]:
+        """Prompt plus any style/reference images, references first."""
+        # Build prompt parts
+        contents: list[ContentPart] = [config.prompt]
+
+        # Add style reference if provided
+        if config.style_reference_path and config.style_reference_path.exists():
+            contents.insert(0, _image_part(config.style_reference_path))
+
+        # Add reference images
+        for ref_path in config.reference_images:
+            if ref_path.exists():
+                contents.insert(0, _image_part(ref_path))
+        return contents
+
+    async def _request_images(
+        self,
+        contents: list[ContentPart],
+        config: GenerationConfig,
+        start: float,
+        label: str,
+    ) -> GenerationResult:
+        """Send ``contents`` and collect ``config.variants`` images.
 
-            return self._make_error_result(
-                "No image in Gemini response", elapsed_ms
+        Gemini image models reject ``candidate_count > 1``, so extra variants are
+        separate requests issued concurrently over the pooled client rather than one
+        after another. Variants that fail are reported in ``metadata``; the ones
+        that arrived are kept and billed.
+        """
+        if self.transport == "http":
+            request = self._http_request(contents, config)
+        else:
+            request = await self._sdk_request(contents, config)
+
+        async def one_image() -> tuple[ImageReply, int]:
+            return await self._call_with_retries(request)
+
+        outcomes, errors = await self._gather_variants(one_image() for _ in range(config.variants))
+
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        images = [image for (image, _), _ in outcomes if image]
+        retries = sum(r for _, r in outcomes)
+        if not images:
+            return self._make_error_result(f"No image in {label}", elapsed_ms)
+        reported = [usage for (_, usage), _ in outcomes if usage is not None]
+        usage = sum(reported, TokenUsage()) if reported else None
+
+        result = GenerationResult(
+            success=True,
+            image_data=images[0],
+            extra_images=images[1:],
+            model_used=self.model,
+            tokens_used=usage.total_tokens if usage else None,
+            usage=usage,
+            cost_usd=round(_COST_PER_IMAGE * len(images), 6),
+            billing_model=BillingModel.PER_IMAGE,
+            generation_time_ms=elapsed_ms,
+            retries=retries,
+        )
+        return self._note_failed_variants(result, errors)
+
+    async def _sdk_request(
+        self, contents: list[ContentPart], config: GenerationConfig
+    ) -> Callable[[], Awaitable[ImageReply]]:
+        """One generate_content call through the google-genai SDK.
+
+        Large image parts go by cached Files API handle, and the prompt prefix by
+        cached-content handle when ``prompt_cache`` is on. If the provider rejects a
+        handle (expired or deleted early), it is dropped from the cache and the call
+        is repeated with that content inline.
+        """
+        client = self._get_client()
+        inline_contents, gen_config = self._sdk_payload(contents, config)
+        remote_contents, digests = await self._remote_contents(contents)
+        cached, cached_digest = await self._cached_prefix(config)
+        namespace = asset_namespace("gemini", self.api_key)
+
+        async def send(
+            sdk_contents: list[Any], sdk_config: genai_types.GenerateContentConfig
+        ) -> ImageReply:
+            response = await client.aio.models.generate_content(
+                model=self.model,
+                contents=sdk_contents,
+                config=sdk_config,
             )
+            return _first_image(response), _sdk_usage(response)
 
-        except Exception as e:
-            elapsed_ms = int((time.monotonic() - start) * 1000)
-            return self._make_error_result(str(e), elapsed_ms)
+        async def call() -> ImageReply:
+            nonlocal digests, cached
+            while True:
+                sdk_contents = remote_contents if digests else inline_contents
+                try:
+                    if cached is None:
+                        return await send(sdk_contents, gen_config)
+                    return await send(
+                        _without_prefix(sdk_contents, config),
+                        gen_config.model_copy(update={"cached_content": cached.handle}),
+                    )
+                except Exception as exc:
+                    if (
+                        cached is not None
+                        and cached_digest is not None
+                        and _is_missing_cache_error(exc)
+                    ):
+                        logger.info(
+                            "Gemini cached content rejected (%s); resending prefix inline", exc
+                        )
+                        self._assets.invalidate(self._prompt_cache_namespace(), cached_digest)
+                        cached = None
+                    elif digests and _is_missing_file_error(exc):
+                        logger.info("Gemini file handle rejected (%s); resending inline", exc)
+                        for digest in digests:
+                            self._assets.invalidate(namespace, digest)
+                        digests = []
+                    else:
+                        raise
+
+        return call
+
+    def _prompt_cache_namespace(self) -> str:
+        # Cached content is bound to the model it was created for.
+        return f"{asset_namespace('gemini', self.api_key)}:{self.model}"
+
+    async def _cached_prefix(
+        self, config: GenerationConfig
+    ) -> tuple[RemoteAsset | None, str | None]:
+        """Cached-content handle for ``config.prompt_prefix``, creating it on first use.
+
+        Returns ``(None, None)`` when prompt caching is off, the prompt has no
+        separate prefix, or the API declined to cache it.
+        """
+        prefix = config.prompt_prefix
+        if (
+            not self.use_prompt_cache
+            or not prefix
+            or len(config.prompt) <= len(prefix)
+            or not config.prompt.startswith(prefix)
+        ):
+            return None, None
+        data = prefix.encode()
+        if content_digest(data) in self._uncacheable_prefixes:
+            return None, None
+        from google.genai import errors, types
+
+        client = self._get_client()
+
+        async def create(data: bytes, mime_type: str, digest: str) -> RemoteAsset:
+            prefix_contents: list[Any] = [prefix]
+            cached = await client.aio.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    contents=prefix_contents,
+                    ttl=f"{self.prompt_cache_ttl_s}s",
+                    display_name=f"diagram-forge-prefix-{digest[:16]}",
+                ),
+            )
+            if not cached.name:
+                raise ValueError("Gemini created cached content without a name")
+            expires = cached.expire_time.timestamp() if cached.expire_time else None
+            return RemoteAsset(handle=cached.name, mime_type=mime_type, expires_at=expires)
 
-    async def edit(self, input_image: bytes, config: GenerationConfig) -> GenerationResult:
-        start = time.monotonic()
         try:
-            from google import genai
-            from google.genai import types
+            return await self._assets.get_or_upload(
+                self._prompt_cache_namespace(), data, "text/plain", create
+            )
+        except (errors.APIError, httpx.HTTPError, ValueError) as exc:
+            logger.info("Gemini declined to cache the prompt prefix (%s); sending it inline", exc)
+            self._uncacheable_prefixes.add(content_digest(data))
+            return None, None
+
+    async def _remote_contents(self, contents: list[ContentPart]) -> tuple[list[Any], list[str]]:
+        """SDK contents with large images swapped for cached file handles.
+
+        Returns the contents and the digests of the handles used (empty when nothing
+        went by handle, in which case the caller sends inline). An upload failure
+        leaves that part inline.
+        """
+        if not self.use_asset_cache:
+            return [], []
+        from google.genai import errors, types
 
-            client = genai.Client(api_key=self.api_key)
+        client = self._get_client()
+        namespace = asset_namespace("gemini", self.api_key)
 
-            gen_config = types.GenerateContentConfig(
-                response_modalities=["IMAGE", "TEXT"],
-                temperature=config.temperature,
+        async def upload(data: bytes, mime_type: str, digest: str) -> RemoteAsset:
+            file = await client.aio.files.upload(
+                file=io.BytesIO(data),
+                config=types.UploadFileConfig(
+                    mime_type=mime_type, display_name=f"diagram-forge-{digest[:16]}"
+                ),
+            )
+            if not file.uri:
+                raise ValueError("Gemini accepted a file upload without returning its URI")
+            expires = file.expiration_time.timestamp() if file.expiration_time else None
+            return RemoteAsset(
+                handle=file.uri, mime_type=file.mime_type or mime_type, expires_at=expires
             )
 
-            # Build contents with input image + edit prompt
-            contents = [
-                types.Part.from_bytes(data=input_image, mime_type="image/png"),
-                config.prompt,
-            ]
+        sdk_contents: list[Any] = []
+        digests: list[str] = []
+        for part in contents:
+            if isinstance(part, str):
+                sdk_contents.append(part)
+                continue
+            data, mime_type = part
+            if len(data) >= self.asset_cache_min_bytes:
+                try:
+                    asset, digest = await self._assets.get_or_upload(
+                        namespace, data, mime_type, upload
+                    )
+                except (errors.APIError, httpx.HTTPError, ValueError) as exc:
+                    logger.info("Gemini file upload failed (%s); sending inline", exc)
+                else:
+                    sdk_contents.append(
+                        types.Part.from_uri(file_uri=asset.handle, mime_type=asset.mime_type)
+                    )
+                    digests.append(digest)
+                    continue
+            sdk_contents.append(types.Part.from_bytes(data=data, mime_type=mime_type))
+        return sdk_contents, digests
 
-            # Add reference images
-            for ref_path in config.reference_images:
-                if ref_path.exists():
-                    ref_bytes = ref_path.read_bytes()
-                    suffix = ref_path.suffix.lower()
-                    mime = {
-                        ".png": "image/png",
-                        ".jpg": "image/jpeg",
-                        ".jpeg": "image/jpeg",
-                        ".webp": "image/webp",
-                    }.get(suffix, "image/png")
-                    contents.insert(0, types.Part.from_bytes(data=ref_bytes, mime_type=mime))
-
-            response = client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=gen_config,
+    def _image_output(self, config: GenerationConfig) -> dict[str, str]:
+        """Requested aspect ratio and output size, as Gemini ``imageConfig`` fields.
+
+        Gemini 2.x image models only take an aspect ratio (their output is ~1K);
+        later models also take ``imageSize``, so a 1K draft really is a 1K image.
+        """
+        output = {"aspect_ratio": config.aspect_ratio.value}
+        if not self.model.startswith("gemini-2."):
+            output["image_size"] = config.resolution.value
+        return output
+
+    def _sdk_payload(
+        self, contents: list[ContentPart], config: GenerationConfig
+    ) -> tuple[list[Any], genai_types.GenerateContentConfig]:
+        """SDK ``contents`` and ``GenerateContentConfig`` for one request."""
+        from google.genai import types
+
+        sdk_contents = [
+            part
+            if isinstance(part, str)
+            else types.Part.from_bytes(data=part[0], mime_type=part[1])
+            for part in contents
+        ]
+        gen_config = types.GenerateContentConfig(
+            response_modalities=["IMAGE", "TEXT"],
+            temperature=config.temperature,
+            image_config=types.ImageConfig.model_validate(self._image_output(config)),
+        )
+        return sdk_contents, gen_config
+
+    def _http_request(
+        self, contents: list[ContentPart], config: GenerationConfig
+    ) -> Callable[[], Awaitable[ImageReply]]:
+        """One generateContent call over the raw REST API."""
+        client = self._get_client()
+        parts = [
+            {"text": part}
+            if isinstance(part, str)
+            else {"inlineData": {"mimeType": part[1], "data": base64.b64encode(part[0]).decode()}}
+            for part in contents
+        ]
+        output = self._image_output(config)
+        image_config = {"aspectRatio": output["aspect_ratio"]}
+        if "image_size" in output:
+            image_config["imageSize"] = output["image_size"]
+        body = {
+            "contents": [{"role": "user", "parts": parts}],
+            "generationConfig": {
+                "responseModalities": ["IMAGE", "TEXT"],
+                "temperature": config.temperature,
+                "imageConfig": image_config,
+            },
+        }
+
+        async def call() -> ImageReply:
+            payload = await client.post_json(f"models/{self.model}:generateContent", body)
+            return _first_image_json(payload), _usage_from(payload.get("usageMetadata"))
+
+        return call
+
+    # --- Batch mode ---
+
+    def _batch_client(self) -> Any:
+        if self.transport == "http":
+            raise NotImplementedError("Gemini batch mode uses the SDK transport")
+        return self._get_client()
+
+    async def submit_batch(self, requests: list[BatchRequest]) -> BatchJob:
+        """Create an inline-request batch job; results come back in request order.
+
+        Gemini image models take one candidate per request, so a request asking for N
+        variants is submitted N times.
+        """
+        from google.genai import types
+
+        client = self._batch_client()
+        inlined = []
+        custom_ids = []
+        for request in requests:
+            sdk_contents, gen_config = self._sdk_payload(
+                self._generation_contents(request.config), request.config
             )
+            for _ in range(request.config.variants):
+                inlined.append(types.InlinedRequest(contents=sdk_contents, config=gen_config))
+                custom_ids.append(request.custom_id)
 
-            elapsed_ms = int((time.monotonic() - start) * 1000)
+        batch = await client.aio.batches.create(model=self.model, src=inlined)
+        job = BatchJob(
+            batch_id=batch.name,
+            status=BatchStatus.SUBMITTED,
+            request_count=len(requests),
+            provider_data={"custom_ids": custom_ids},
+        )
+        return self._apply_batch_state(job, batch)
 
-            if response.candidates:
-                for part in response.candidates[0].content.parts:
-                    if part.inline_data and part.inline_data.mime_type.startswith("image/"):
-                        return GenerationResult(
-                            success=True,
-                            image_data=part.inline_data.data,
-                            model_used=self.model,
-                            cost_usd=0.039,
-                            billing_model=BillingModel.PER_IMAGE,
-                            generation_time_ms=elapsed_ms,
-                        )
+    async def poll_batch(self, job: BatchJob) -> BatchJob:
+        batch = await self._batch_client().aio.batches.get(name=job.batch_id)
+        return self._apply_batch_state(job, batch)
 
-            return self._make_error_result("No image in Gemini edit response", elapsed_ms)
+    @staticmethod
+    def _apply_batch_state(job: BatchJob, batch: Any) -> BatchJob:
+        state = getattr(batch.state, "name", str(batch.state))
+        job.status = _BATCH_STATUS.get(state, BatchStatus.RUNNING)
+        stats = getattr(batch, "completion_stats", None)
+        if stats is not None:
+            job.completed_count = stats.successful_count or 0
+            job.failed_count = stats.failed_count or 0
+        return job
 
-        except Exception as e:
-            elapsed_ms = int((time.monotonic() - start) * 1000)
-            return self._make_error_result(str(e), elapsed_ms)
+    async def fetch_batch(self, job: BatchJob) -> dict[str, GenerationResult]:
+        batch = await self._batch_client().aio.batches.get(name=job.batch_id)
+        responses = (batch.dest.inlined_responses if batch.dest else None) or []
+        images: dict[str, list[bytes]] = {}
+        usages: dict[str, TokenUsage] = {}
+        errors: dict[str, str] = {}
+        for custom_id, inlined in zip(job.provider_data["custom_ids"], responses):
+            image = _first_image(inlined.response) if inlined.response else None
+            usage = _sdk_usage(inlined.response) if inlined.response else None
+            if usage is not None:
+                usages[custom_id] = usages.get(custom_id, TokenUsage()) + usage
+            if image:
+                images.setdefault(custom_id, []).append(image)
+            else:
+                errors[custom_id] = (
+                    getattr(inlined.error, "message", None) or "No image in batch response"
+                )
+
+        results: dict[str, GenerationResult] = {}
+        for custom_id in dict.fromkeys(job.provider_data["custom_ids"]):
+            found = images.get(custom_id)
+            if not found:
+                reason = errors.get(custom_id, f"missing from batch output ({job.status.value})")
+                results[custom_id] = self._make_error_result(f"Batch request failed: {reason}")
+                continue
+            results[custom_id] = GenerationResult(
+                success=True,
+                image_data=found[0],
+                extra_images=found[1:],
+                model_used=self.model,
+                tokens_used=usages[custom_id].total_tokens if custom_id in usages else None,
+                usage=usages.get(custom_id),
+                cost_usd=round(_COST_PER_IMAGE * _BATCH_DISCOUNT * len(found), 6),
+                billing_model=BillingModel.PER_IMAGE,
+                metadata={"batch_id": job.batch_id},
+            )
+        return results
 
     async def health_check(self) -> ProviderHealth:
         start = time.monotonic()
         try:
-            from google import genai
-
-            client = genai.Client(api_key=self.api_key)
+            client = self._get_client()
             # Simple model list check
-            models = client.models.list()
-            _ = next(iter(models), None)
+            if self.transport == "http":
+                _ = await client.get_json("models")
+            else:
+                _ = await client.aio.models.list()
             elapsed = int((time.monotonic() - start) * 1000)
             return ProviderHealth(
                 available=True,
@@ -181,9 +626,9 @@ class GeminiProvider(BaseImageProvider):
             provider="gemini",
             model=self.model,
             billing_model=BillingModel.PER_IMAGE,
-            cost_per_unit=0.039,
+            cost_per_unit=_COST_PER_IMAGE,
             unit_description="per image generation",
         )
 
     def supported_features(self) -> set[str]:
-        return {"generate", "edit", "style_reference", "multi_image"}
+        return {"generate", "edit", "style_reference", "multi_image", "batch"}
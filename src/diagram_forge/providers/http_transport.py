@@ -0,0 +1,91 @@
+"""Raw-HTTP transport for providers, built directly on ``httpx.AsyncClient``.
+
+The Gemini and OpenAI providers only need a handful of REST endpoints. Selecting
+``transport: http`` in a provider's ``extra`` config skips importing (and paying the
+per-request overhead of) ``google.genai`` / ``openai`` and talks to the API with one
+long-lived ``httpx.AsyncClient`` per provider instance. Connections are kept alive
+between calls, and HTTP/2 is negotiated when the optional ``h2`` package is
+installed (``pip install 'diagram-forge[http2]'``).
+
+Errors are raised as ``HttpTransportError`` carrying ``status_code`` and the
+``response``, so ``BaseImageProvider`` classifies them and reads Retry-After exactly
+as it does for SDK exceptions.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from typing import Any
+
+import httpx
+
+TRANSPORTS = ("sdk", "http")
+
+OPENAI_BASE_URL = "https://api.openai.com/v1/"
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/"
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Image generation routinely takes a minute or more; connecting should not.
+_TIMEOUT = httpx.Timeout(300.0, connect=10.0)
+_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=300.0)
+
+
+class HttpTransportError(Exception):
+    """Non-2xx response from a provider API."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"Error code: {response.status_code} - {response.text[:500]}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+class RawHttpClient:
+    """Thin JSON/multipart client over one pooled ``httpx.AsyncClient``."""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str],
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            http2=HTTP2_AVAILABLE,
+            timeout=_TIMEOUT,
+            limits=_LIMITS,
+            transport=transport,
+        )
+
+    async def get_json(self, path: str) -> dict[str, Any]:
+        return self._checked(await self._client.get(path))
+
+    async def post_json(self, path: str, body: dict[str, Any]) -> dict[str, Any]:
+        return self._checked(await self._client.post(path, json=body))
+
+    async def post_multipart(
+        self,
+        path: str,
+        data: dict[str, str],
+        files: dict[str, tuple[str, bytes, str]],
+    ) -> dict[str, Any]:
+        return self._checked(await self._client.post(path, data=data, files=files))
+
+    @staticmethod
+    def _checked(response: httpx.Response) -> dict[str, Any]:
+        if response.status_code >= 400:
+            raise HttpTransportError(response)
+        payload: dict[str, Any] = response.json()
+        return payload
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def openai_client(api_key: str, base_url: str | None = None) -> RawHttpClient:
+    return RawHttpClient(base_url or OPENAI_BASE_URL, {"Authorization": f"Bearer {api_key}"})
+
+
+def gemini_client(api_key: str, base_url: str | None = None) -> RawHttpClient:
+    return RawHttpClient(base_url or GEMINI_BASE_URL, {"x-goog-api-key": api_key})
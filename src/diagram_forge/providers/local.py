@@ -0,0 +1,269 @@
+"""Offline provider that renders deterministic placeholder PNGs.
+
+Needs no API key and makes no network calls, so the server, web API and eval runner
+can be load-tested anywhere. The image is a function of the prompt and requested
+size only: a background colour derived from the prompt's SHA-256 with the hash and
+dimensions stamped on it. Latency and failures are simulated from ``extra`` config:
+
+    local:
+      model: local-placeholder
+      extra:
+        latency: {distribution: lognormal, median_ms: 8000, sigma: 0.5}
+        failure_rate: 0.05      # transient 503s, retried like a real outage
+        rate_limit_rate: 0.02   # 429s carrying a Retry-After hint
+        retry_after_s: 1.0
+        seed: 42                # reproducible latency/failure sequence
+        batch_delay_s: 30       # stand-in batch endpoint: time until a batch completes
+
+Latency distributions: ``fixed`` (``ms``), ``uniform`` (``min_ms``, ``max_ms``),
+``normal`` (``mean_ms``, ``stddev_ms``) and ``lognormal`` (``median_ms``, ``sigma``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import random
+import time
+import uuid
+from functools import lru_cache, partial
+from io import BytesIO
+from typing import Any
+
+import httpx
+from PIL import Image, ImageDraw
+
+from diagram_forge.models import (
+    AspectRatio,
+    BatchJob,
+    BatchRequest,
+    BatchStatus,
+    BillingModel,
+    GenerationConfig,
+    GenerationResult,
+    OutputFormat,
+    PricingInfo,
+    ProviderHealth,
+    Resolution,
+)
+from diagram_forge.providers.base import BaseImageProvider
+
+_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+class LocalProviderError(Exception):
+    """Simulated HTTP failure, shaped like an SDK status error for classification."""
+
+    def __init__(self, status_code: int, message: str, headers: dict[str, str] | None = None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        self.response = httpx.Response(status_code, headers=headers or {})
+
+
+def _dimensions(config: GenerationConfig) -> tuple[int, int]:
+    """(width, height) for the requested resolution, long edge first for landscape."""
+    long_edge = config.resolution.dimensions[0]
+    w, h = (int(part) for part in config.aspect_ratio.value.split(":"))
+    if w >= h:
+        return long_edge, round(long_edge * h / w)
+    return round(long_edge * w / h), long_edge
+
+
+@lru_cache(maxsize=32)
+def _render(
+    digest: str, width: int, height: int, fmt: str = "png", compression: int | None = None
+) -> bytes:
+    """Render the placeholder image; cached since output depends only on its arguments.
+
+    ``compression`` follows the OpenAI convention (0-100, higher is smaller), so it is
+    inverted into Pillow's ``quality`` for lossy formats.
+    """
+    rgb = bytes.fromhex(digest[:6])
+    background = tuple(64 + c // 2 for c in rgb)
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    margin = max(8, width // 64)
+    draw.rectangle(
+        [(margin, margin), (width - margin, height - margin)], outline=(255, 255, 255), width=2
+    )
+    draw.text(
+        (margin * 2, margin * 2), f"diagram-forge local {width}x{height}", fill=(255, 255, 255)
+    )
+    draw.text((margin * 2, margin * 2 + 16), f"sha256:{digest[:16]}", fill=(255, 255, 255))
+    out = BytesIO()
+    if fmt == "png":
+        image.save(out, format="PNG")
+    else:
+        quality = {} if compression is None else {"quality": 100 - compression}
+        image.save(out, format=fmt.upper(), **quality)
+    return out.getvalue()
+
+
+class LocalProvider(BaseImageProvider):
+    """Deterministic, offline image provider for load and latency testing."""
+
+    def __init__(self, api_key: str = "", model: str | None = None, **kwargs: Any):
+        latency = dict(kwargs.pop("latency", None) or {})
+        self.failure_rate = float(kwargs.pop("failure_rate", 0.0))
+        self.rate_limit_rate = float(kwargs.pop("rate_limit_rate", 0.0))
+        self.retry_after_s = float(kwargs.pop("retry_after_s", 1.0))
+        self.batch_delay_s = float(kwargs.pop("batch_delay_s", 0.0))
+        self._rng = random.Random(kwargs.pop("seed", None))
+        super().__init__(api_key=api_key, model=model, **kwargs)
+
+        self.distribution = latency.pop("distribution", "fixed")
+        if self.distribution not in _DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {self.distribution}. Available: {list(_DISTRIBUTIONS)}"
+            )
+        self.latency = latency
+
+    def default_model(self) -> str:
+        return "local-placeholder"
+
+    def _sample_latency_s(self) -> float:
+        """Draw one simulated service time from the configured distribution."""
+        p = self.latency
+        if self.distribution == "uniform":
+            ms = self._rng.uniform(p.get("min_ms", 0), p.get("max_ms", 0))
+        elif self.distribution == "normal":
+            ms = self._rng.gauss(p.get("mean_ms", 0), p.get("stddev_ms", 0))
+        elif self.distribution == "lognormal":
+            median = p.get("median_ms", 0)
+            ms = self._rng.lognormvariate(math.log(median), p.get("sigma", 0.5)) if median else 0
+        else:
+            ms = p.get("ms", 0)
+        return max(0.0, ms) / 1000
+
+    async def _simulated_call(self, config: GenerationConfig, variant: int) -> bytes:
+        """One simulated round-trip: wait, maybe fail, otherwise render."""
+        await asyncio.sleep(self._sample_latency_s())
+        roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            raise LocalProviderError(
+                429, "rate_limit_exceeded (simulated)", {"retry-after": str(self.retry_after_s)}
+            )
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise LocalProviderError(503, "service unavailable (simulated)")
+        return await self._render_variant(config, variant)
+
+    @staticmethod
+    async def _render_variant(config: GenerationConfig, variant: int) -> bytes:
+        seed_text = config.prompt if variant == 0 else f"{config.prompt}#{variant}"
+        digest = hashlib.sha256(seed_text.encode()).hexdigest()
+        width, height = _dimensions(config)
+        return await asyncio.to_thread(
+            _render, digest, width, height, config.output_format.value, config.output_compression
+        )
+
+    async def generate(self, config: GenerationConfig) -> GenerationResult:
+        start = time.monotonic()
+        try:
+            # Variants are independent concurrent round-trips, as with Gemini.
+            outcomes, errors = await self._gather_variants(
+                self._call_with_retries(partial(self._simulated_call, config, i))
+                for i in range(config.variants)
+            )
+            images = [image for image, _ in outcomes]
+            retries = sum(used for _, used in outcomes)
+            result = GenerationResult(
+                success=True,
+                image_data=images[0],
+                extra_images=images[1:],
+                model_used=self.model,
+                cost_usd=0.0,
+                billing_model=BillingModel.PER_IMAGE,
+                generation_time_ms=int((time.monotonic() - start) * 1000),
+                retries=retries,
+            )
+            return self._note_failed_variants(result, errors)
+        except Exception as e:  # noqa: BLE001 - reported as a failed result
+            elapsed_ms = int((time.monotonic() - start) * 1000)
+            return self._error_from_exception(e, elapsed_ms)
+
+    async def edit(self, input_image: bytes, config: GenerationConfig) -> GenerationResult:
+        # The input image is ignored; an edit costs the same simulated round-trip.
+        return await self.generate(config)
+
+    # --- Stand-in batch endpoint ---
+    # The job is self-describing (requests and due time live in provider_data), so a
+    # persisted job can be collected after a server restart, as with a real provider.
+
+    async def submit_batch(self, requests: list[BatchRequest]) -> BatchJob:
+        return BatchJob(
+            batch_id=f"localbatch_{uuid.uuid4().hex[:12]}",
+            status=BatchStatus.SUBMITTED,
+            request_count=len(requests),
+            provider_data={
+                "ready_at": time.time() + self.batch_delay_s,
+                "requests": [
+                    {
+                        "custom_id": r.custom_id,
+                        "prompt": r.config.prompt,
+                        "resolution": r.config.resolution.value,
+                        "aspect_ratio": r.config.aspect_ratio.value,
+                        "variants": r.config.variants,
+                        "output_format": r.config.output_format.value,
+                        "output_compression": r.config.output_compression,
+                    }
+                    for r in requests
+                ],
+            },
+        )
+
+    async def poll_batch(self, job: BatchJob) -> BatchJob:
+        if time.time() >= job.provider_data["ready_at"]:
+            job.status = BatchStatus.COMPLETED
+            job.completed_count = job.request_count
+        else:
+            job.status = BatchStatus.RUNNING
+        return job
+
+    async def fetch_batch(self, job: BatchJob) -> dict[str, GenerationResult]:
+        results: dict[str, GenerationResult] = {}
+        for item in job.provider_data["requests"]:
+            if self._rng.random() < self.failure_rate:
+                results[item["custom_id"]] = self._make_error_result(
+                    "Batch request failed: simulated failure"
+                )
+                continue
+            config = GenerationConfig(
+                prompt=item["prompt"],
+                resolution=Resolution(item["resolution"]),
+                aspect_ratio=AspectRatio(item["aspect_ratio"]),
+                variants=item["variants"],
+                output_format=OutputFormat(item.get("output_format", OutputFormat.PNG.value)),
+                output_compression=item.get("output_compression"),
+            )
+            images = [await self._render_variant(config, i) for i in range(config.variants)]
+            results[item["custom_id"]] = GenerationResult(
+                success=True,
+                image_data=images[0],
+                extra_images=images[1:],
+                model_used=self.model,
+                billing_model=BillingModel.PER_IMAGE,
+                metadata={"batch_id": job.batch_id},
+            )
+        return results
+
+    async def health_check(self) -> ProviderHealth:
+        return ProviderHealth(
+            available=True,
+            provider="local",
+            model=self.model,
+            message="Offline placeholder renderer (no network)",
+            latency_ms=0,
+        )
+
+    def get_pricing(self) -> PricingInfo:
+        return PricingInfo(
+            provider="local",
+            model=self.model,
+            billing_model=BillingModel.PER_IMAGE,
+            cost_per_unit=0.0,
+            unit_description="per image (offline placeholder, free)",
+        )
+
+    def supported_features(self) -> set[str]:
+        return {"generate", "edit", "batch", "output_format"}
@@ -2,18 +2,26 @@
 
 from __future__ import annotations
 
-import base64
+import json
 import time
+from typing import Any
 
 from diagram_forge.models import (
+    BatchJob,
+    BatchRequest,
+    BatchStatus,
     BillingModel,
     GenerationConfig,
+    GenerationEvent,
     GenerationResult,
+    OutputFormat,
     PricingInfo,
     ProviderHealth,
+    TokenUsage,
 )
-from diagram_forge.providers.base import BaseImageProvider
-
+from diagram_forge.payloads import decode_base64
+from diagram_forge.providers.base import BaseImageProvider, EventCallback
+from diagram_forge.providers.http_transport import openai_client
 
 # Per-image cost in USD, keyed by (size, quality).
 # Source: https://developers.openai.com/api/docs/guides/image-generation (2026-04-21).
@@ -44,6 +52,61 @@ _GPT_IMAGE_1_MINI_COSTS: dict[tuple[str, str], float] = {
 # gpt-image-1.5 pre-tiered flat rates (legacy fallback).
 _GPT_IMAGE_15_FLAT = {"1024x1024": 0.009, "1536x1024": 0.013, "1024x1536": 0.013}
 
+# Per-token rates in USD per 1M tokens: (text input, cached input, image input, output).
+# gpt-image models bill by token; when a response reports usage for a model listed here,
+# its cost is computed from the actual counts instead of the per-image tables above.
+# Cached input is billed at the cached text rate. Checked in substring order.
+# gpt-image-2 publishes a single input rate (config/pricing.yaml), so image input
+# tokens are billed at it too.
+_TOKEN_RATES: dict[str, tuple[float, float, float, float]] = {
+    "gpt-image-2": (8.00, 2.00, 8.00, 30.00),
+    "gpt-image-1-mini": (2.00, 0.20, 2.50, 8.00),
+    "gpt-image-1.5": (5.00, 1.25, 8.00, 32.00),
+    "gpt-image-1": (5.00, 1.25, 10.00, 40.00),
+}
+
+# Batch API: 50% of the interactive price, results within the 24h completion window.
+_BATCH_DISCOUNT = 0.5
+_BATCH_ENDPOINT = "/v1/images/generations"
+_BATCH_STATUS = {
+    "validating": BatchStatus.SUBMITTED,
+    "in_progress": BatchStatus.RUNNING,
+    "finalizing": BatchStatus.RUNNING,
+    "cancelling": BatchStatus.RUNNING,
+    "completed": BatchStatus.COMPLETED,
+    "failed": BatchStatus.FAILED,
+    "expired": BatchStatus.EXPIRED,
+    "cancelled": BatchStatus.CANCELLED,
+}
+
+
+def _usage_from(usage: dict[str, Any] | None) -> TokenUsage | None:
+    """Parse an images API ``usage`` object (as a dict) into a TokenUsage."""
+    if not isinstance(usage, dict) or not usage:
+        return None
+    input_details = usage.get("input_tokens_details") or {}
+    output_details = usage.get("output_tokens_details") or {}
+    output_tokens = usage.get("output_tokens") or 0
+    return TokenUsage(
+        input_tokens=usage.get("input_tokens") or 0,
+        cached_input_tokens=input_details.get("cached_tokens") or 0,
+        output_tokens=output_tokens,
+        image_input_tokens=input_details.get("image_tokens") or 0,
+        # Image generation output is all image tokens unless broken down otherwise.
+        image_output_tokens=output_details.get("image_tokens", output_tokens) or 0,
+    )
+
+
+def _upload_file(image: bytes) -> tuple[str, bytes, str]:
+    """(filename, bytes, MIME type) for an input image, labelled by its actual format."""
+    fmt = OutputFormat.detect(image) or OutputFormat.PNG
+    return f"image{fmt.extension}", image, fmt.mime_type
+
+
+def _sdk_usage(response: Any) -> TokenUsage | None:
+    usage = getattr(response, "usage", None)
+    return _usage_from(usage.model_dump()) if usage is not None else None
+
 
 class OpenAIProvider(BaseImageProvider):
     """Provider for OpenAI image generation (GPT Image 2 / DALL-E 3)."""
@@ -51,6 +114,28 @@ class OpenAIProvider(BaseImageProvider):
     def default_model(self) -> str:
         return "gpt-image-2-2026-04-21"
 
+    def _get_client(self) -> Any:
+        """Return this instance's long-lived client (AsyncOpenAI or raw HTTP), created on first use."""
+        if self._client is None:
+            if self.transport == "http":
+                self._client = openai_client(self.api_key, self.base_url)
+            else:
+                from openai import AsyncOpenAI
+
+                # SDK-level retries are off: _call_with_retries owns retry policy, so a
+                # transient error isn't retried twice over.
+                self._client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is None:
+            return
+        if self.transport == "http":
+            await client.aclose()
+        else:
+            await client.close()
+
     def _resolve_size(self, config: GenerationConfig) -> str:
         """Map resolution + aspect ratio to OpenAI size string."""
         ar = config.aspect_ratio.value
@@ -73,44 +158,207 @@ class OpenAIProvider(BaseImageProvider):
 
         start = time.monotonic()
         try:
-            from openai import AsyncOpenAI
-
-            client = AsyncOpenAI(api_key=self.api_key)
             size = self._resolve_size(config)
             quality = config.quality.value
+            kwargs = self._request_kwargs(config)
 
-            # Only pass quality to models that accept it (gpt-image-2, gpt-image-1-mini).
-            # dall-e-3 uses a different quality vocabulary; gpt-image-1.5 ignored it.
-            kwargs: dict = {
-                "model": self.model,
-                "prompt": config.prompt,
-                "n": 1,
-                "size": size,
-            }
-            if self._supports_quality():
-                kwargs["quality"] = quality
+            (images_b64, usage), retries = await self._call_with_retries(
+                lambda: self._request_images(kwargs)
+            )
 
-            response = await client.images.generate(**kwargs)
+            return self._image_result(
+                images_b64, usage, size, quality, start, retries, "OpenAI response"
+            )
 
+        except Exception as e:
             elapsed_ms = int((time.monotonic() - start) * 1000)
+            return self._error_from_exception(e, elapsed_ms)
+
+    async def generate_with_progress(
+        self,
+        config: GenerationConfig,
+        on_event: EventCallback,
+    ) -> GenerationResult:
+        """Stream partial frames when asked for; otherwise behave like ``generate``.
+
+        Streaming returns a single image, so multi-variant requests, models without
+        streaming support (dall-e) and the raw-HTTP transport take the regular path.
+        """
+        if (
+            config.partial_images <= 0
+            or config.variants > 1
+            or "dall-e" in self.model
+            or self.transport == "http"
+        ):
+            return await super().generate_with_progress(config, on_event)
+
+        start = time.monotonic()
+        try:
+            client = self._get_client()
+            size = self._resolve_size(config)
+            quality = config.quality.value
+            kwargs = self._request_kwargs(config)
+            del kwargs["n"]
+            kwargs.update(stream=True, partial_images=config.partial_images)
+
+            if config.style_reference_path and config.style_reference_path.exists():
+                kwargs["image"] = _upload_file(config.style_reference_path.read_bytes())
+                request = client.images.edit
+            else:
+                request = client.images.generate
+
+            # Only opening the stream is retried; a failure mid-stream is reported as-is.
+            stream, retries = await self._call_with_retries(lambda: request(**kwargs))
+            await on_event(GenerationEvent(stage="request_sent"))
+
+            image_data = None
+            usage = None
+            decode_s = 0.0
+            async for event in stream:
+                if event.type.endswith(".partial_image"):
+                    decode_start = time.monotonic()
+                    preview = decode_base64(event.b64_json)
+                    decode_s += time.monotonic() - decode_start
+                    await on_event(
+                        GenerationEvent(
+                            stage="partial_image",
+                            index=event.partial_image_index,
+                            image_data=preview,
+                        )
+                    )
+                elif event.type.endswith(".completed"):
+                    decode_start = time.monotonic()
+                    image_data = decode_base64(event.b64_json)
+                    decode_s += time.monotonic() - decode_start
+                    usage = _sdk_usage(event)
 
-            if response.data and response.data[0].b64_json:
-                image_data = base64.b64decode(response.data[0].b64_json)
-                cost = self._estimate_cost(size, quality)
-                return GenerationResult(
+            elapsed_ms = int((time.monotonic() - start) * 1000)
+            if image_data is None:
+                return self._make_error_result("No image in OpenAI stream", elapsed_ms)
+            return self._priced(
+                GenerationResult(
                     success=True,
                     image_data=image_data,
                     model_used=self.model,
-                    cost_usd=cost,
+                    cost_usd=self._estimate_cost(size, quality),
                     billing_model=BillingModel.PER_IMAGE,
                     generation_time_ms=elapsed_ms,
-                )
-
-            return self._make_error_result("No image in OpenAI response", elapsed_ms)
+                    retries=retries,
+                    decode_ms=int(decode_s * 1000),
+                ),
+                usage,
+            )
 
-        except Exception as e:
+        except Exception as e:  # noqa: BLE001 - reported as a failed result
             elapsed_ms = int((time.monotonic() - start) * 1000)
-            return self._make_error_result(str(e), elapsed_ms)
+            return self._error_from_exception(e, elapsed_ms)
+
+    def _request_kwargs(self, config: GenerationConfig) -> dict[str, Any]:
+        """Images API request body shared by generate, edit, streaming and batch."""
+        kwargs: dict[str, Any] = {
+            "model": self.model,
+            "prompt": config.prompt,
+            "n": config.variants,
+            "size": self._resolve_size(config),
+        }
+        # Only pass quality to models that accept it (gpt-image-2, gpt-image-1-mini).
+        # dall-e-3 uses a different quality vocabulary; gpt-image-1.5 ignored it.
+        if self._supports_quality():
+            kwargs["quality"] = config.quality.value
+        # gpt-image models encode webp/jpeg server-side; dall-e always returns PNG.
+        if "dall-e" not in self.model and config.output_format != OutputFormat.PNG:
+            kwargs["output_format"] = config.output_format.value
+            if config.output_compression is not None:
+                kwargs["output_compression"] = config.output_compression
+        return kwargs
+
+    async def _request_images(
+        self, kwargs: dict[str, Any], image: bytes | None = None
+    ) -> tuple[list[str], TokenUsage | None]:
+        """One images request on the configured transport.
+
+        Returns the base64 payloads and the reported token usage. ``image`` routes to
+        the edits endpoint.
+        """
+        client = self._get_client()
+        if self.transport == "http":
+            if image is None:
+                payload = await client.post_json("images/generations", kwargs)
+            else:
+                payload = await client.post_multipart(
+                    "images/edits",
+                    {key: str(value) for key, value in kwargs.items()},
+                    {"image": _upload_file(image)},
+                )
+            images = [d["b64_json"] for d in payload.get("data") or [] if d.get("b64_json")]
+            return images, _usage_from(payload.get("usage"))
+        if image is None:
+            response = await client.images.generate(**kwargs)
+        else:
+            response = await client.images.edit(image=_upload_file(image), **kwargs)
+        return [d.b64_json for d in (response.data or []) if d.b64_json], _sdk_usage(response)
+
+    def _image_result(
+        self,
+        images_b64: list[str],
+        usage: TokenUsage | None,
+        size: str,
+        quality: str,
+        start: float,
+        retries: int,
+        label: str,
+    ) -> GenerationResult:
+        """Decode every returned image into a GenerationResult (one per requested variant)."""
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        decode_start = time.monotonic()
+        images = [decode_base64(b64) for b64 in images_b64]
+        decode_ms = int((time.monotonic() - decode_start) * 1000)
+        if not images:
+            return self._make_error_result(f"No image in {label}", elapsed_ms)
+
+        return self._priced(
+            GenerationResult(
+                success=True,
+                image_data=images[0],
+                extra_images=images[1:],
+                model_used=self.model,
+                cost_usd=round(self._estimate_cost(size, quality) * len(images), 6),
+                billing_model=BillingModel.PER_IMAGE,
+                generation_time_ms=elapsed_ms,
+                retries=retries,
+                decode_ms=decode_ms,
+            ),
+            usage,
+        )
+
+    def _priced(self, result: GenerationResult, usage: TokenUsage | None) -> GenerationResult:
+        """Attach reported usage and, where the model's token rates are known, bill by it."""
+        if usage is None:
+            return result
+        result.usage = usage
+        result.tokens_used = usage.total_tokens
+        cost = self._token_cost(usage)
+        if cost is not None:
+            result.cost_usd = cost
+            result.billing_model = BillingModel.PER_TOKEN
+        return result
+
+    def _token_cost(self, usage: TokenUsage) -> float | None:
+        """USD cost of ``usage`` at this model's per-token rates, or None if unknown."""
+        rates = next((r for key, r in _TOKEN_RATES.items() if key in self.model), None)
+        if rates is None:
+            return None
+        text_rate, cached_rate, image_rate, output_rate = rates
+        uncached_text = max(
+            0, usage.input_tokens - usage.cached_input_tokens - usage.image_input_tokens
+        )
+        cost = (
+            uncached_text * text_rate
+            + usage.cached_input_tokens * cached_rate
+            + usage.image_input_tokens * image_rate
+            + usage.output_tokens * output_rate
+        ) / 1_000_000
+        return round(cost, 6)
 
     def _supports_quality(self) -> bool:
         """True if model accepts low|medium|high|auto quality param."""
@@ -139,51 +387,136 @@ class OpenAIProvider(BaseImageProvider):
     async def edit(self, input_image: bytes, config: GenerationConfig) -> GenerationResult:
         start = time.monotonic()
         try:
-            from openai import AsyncOpenAI
-
-            client = AsyncOpenAI(api_key=self.api_key)
             size = self._resolve_size(config)
             quality = config.quality.value
+            kwargs = self._request_kwargs(config)
 
-            kwargs: dict = {
-                "model": self.model,
-                "image": input_image,
-                "prompt": config.prompt,
-                "n": 1,
-                "size": size,
-            }
-            if self._supports_quality():
-                kwargs["quality"] = quality
+            (images_b64, usage), retries = await self._call_with_retries(
+                lambda: self._request_images(kwargs, image=input_image)
+            )
 
-            response = await client.images.edit(**kwargs)
+            return self._image_result(
+                images_b64, usage, size, quality, start, retries, "OpenAI edit response"
+            )
 
+        except Exception as e:
             elapsed_ms = int((time.monotonic() - start) * 1000)
-
-            if response.data and response.data[0].b64_json:
-                image_data = base64.b64decode(response.data[0].b64_json)
-                cost = self._estimate_cost(size, quality)
-                return GenerationResult(
-                    success=True,
-                    image_data=image_data,
-                    model_used=self.model,
-                    cost_usd=cost,
-                    billing_model=BillingModel.PER_IMAGE,
-                    generation_time_ms=elapsed_ms,
+            return self._error_from_exception(e, elapsed_ms)
+
+    # --- Batch API ---
+
+    def _batch_client(self) -> Any:
+        if self.transport == "http":
+            raise NotImplementedError("OpenAI batch mode uses the SDK transport")
+        return self._get_client()
+
+    async def submit_batch(self, requests: list[BatchRequest]) -> BatchJob:
+        """Upload the requests as a JSONL file and create an images Batch API job."""
+        client = self._batch_client()
+        lines = []
+        costs: dict[str, float] = {}
+        for request in requests:
+            body = self._request_kwargs(request.config)
+            lines.append(
+                json.dumps(
+                    {
+                        "custom_id": request.custom_id,
+                        "method": "POST",
+                        "url": _BATCH_ENDPOINT,
+                        "body": body,
+                    }
                 )
+            )
+            unit = self._estimate_cost(body["size"], request.config.quality.value)
+            costs[request.custom_id] = round(unit * _BATCH_DISCOUNT * request.config.variants, 6)
 
-            return self._make_error_result("No image in OpenAI edit response", elapsed_ms)
-
-        except Exception as e:
-            elapsed_ms = int((time.monotonic() - start) * 1000)
-            return self._make_error_result(str(e), elapsed_ms)
+        upload = await client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode(), "application/jsonl"),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=upload.id,
+            endpoint=_BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        job = BatchJob(
+            batch_id=batch.id,
+            status=BatchStatus.SUBMITTED,
+            request_count=len(requests),
+            provider_data={"input_file_id": upload.id, "costs": costs},
+        )
+        return self._apply_batch_state(job, batch)
+
+    async def poll_batch(self, job: BatchJob) -> BatchJob:
+        batch = await self._batch_client().batches.retrieve(job.batch_id)
+        return self._apply_batch_state(job, batch)
+
+    @staticmethod
+    def _apply_batch_state(job: BatchJob, batch: Any) -> BatchJob:
+        job.status = _BATCH_STATUS.get(batch.status, BatchStatus.RUNNING)
+        counts = getattr(batch, "request_counts", None)
+        if counts is not None:
+            job.completed_count = counts.completed
+            job.failed_count = counts.failed
+        for key in ("output_file_id", "error_file_id"):
+            if getattr(batch, key, None):
+                job.provider_data[key] = getattr(batch, key)
+        return job
+
+    async def fetch_batch(self, job: BatchJob) -> dict[str, GenerationResult]:
+        """Download the output (and error) files and decode one result per request."""
+        client = self._batch_client()
+        results: dict[str, GenerationResult] = {}
+        for key in ("output_file_id", "error_file_id"):
+            file_id = job.provider_data.get(key)
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    results[entry["custom_id"]] = self._batch_entry_result(entry, job)
+        for custom_id in job.provider_data.get("costs", {}):
+            if custom_id not in results:
+                results[custom_id] = self._make_error_result(
+                    f"No result for {custom_id} in batch {job.batch_id} ({job.status.value})"
+                )
+        return results
+
+    def _batch_entry_result(self, entry: dict[str, Any], job: BatchJob) -> GenerationResult:
+        response = entry.get("response") or {}
+        body = response.get("body") or {}
+        if entry.get("error") or response.get("status_code") != 200:
+            error = entry.get("error") or body.get("error") or {}
+            message = error.get("message") or f"status {response.get('status_code')}"
+            return self._make_error_result(f"Batch request failed: {message}")
+        images = [decode_base64(d["b64_json"]) for d in body.get("data") or [] if d.get("b64_json")]
+        if not images:
+            return self._make_error_result("No image in OpenAI batch response")
+        result = self._priced(
+            GenerationResult(
+                success=True,
+                image_data=images[0],
+                extra_images=images[1:],
+                model_used=self.model,
+                cost_usd=job.provider_data.get("costs", {}).get(entry["custom_id"], 0.0),
+                billing_model=BillingModel.PER_IMAGE,
+                metadata={"batch_id": job.batch_id},
+            ),
+            _usage_from(body.get("usage")),
+        )
+        if result.billing_model == BillingModel.PER_TOKEN:
+            result.cost_usd = round(result.cost_usd * _BATCH_DISCOUNT, 6)
+        return result
 
     async def health_check(self) -> ProviderHealth:
         start = time.monotonic()
         try:
-            from openai import AsyncOpenAI
-
-            client = AsyncOpenAI(api_key=self.api_key)
-            _ = await client.models.list()
+            client = self._get_client()
+            if self.transport == "http":
+                _ = await client.get_json("models")
+            else:
+                _ = await client.models.list()
             elapsed = int((time.monotonic() - start) * 1000)
             return ProviderHealth(
                 available=True,
@@ -202,6 +535,11 @@ class OpenAIProvider(BaseImageProvider):
                 latency_ms=elapsed,
             )
 
+    def estimate_cost(self, config: GenerationConfig) -> float:
+        """Per-image estimate at the size and quality ``config`` resolves to."""
+        unit = self._estimate_cost(self._resolve_size(config), config.quality.value)
+        return round(unit * config.variants, 6)
+
     def get_pricing(self) -> PricingInfo:
         """Return representative pricing — medium quality at 1536x1024."""
         unit_cost = self._estimate_cost("1536x1024", "medium")
@@ -214,4 +552,7 @@ class OpenAIProvider(BaseImageProvider):
         )
 
     def supported_features(self) -> set[str]:
-        return {"generate", "edit"}
+        features = {"generate", "edit", "batch"}
+        if "dall-e" not in self.model:
+            features.update({"partial_images", "output_format"})
+        return features
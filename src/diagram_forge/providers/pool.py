@@ -0,0 +1,180 @@
+"""Long-lived, shared provider instances keyed by (provider, model, hashed API key).
+
+Building a provider per call also built a fresh SDK client per call — a new TLS
+handshake and connection pool for every generation and every fallback candidate.
+``ProviderPool`` hands out one provider instance per (provider, model, API key)
+so its SDK client and keep-alive connections are reused across requests.
+
+API keys are never stored as pool keys; only a SHA-256 digest is. Idle entries are
+evicted after ``max_idle_s``, and the least recently used entry is evicted once
+``max_size`` is reached — the web API sees one key per user. Callers that await
+on a provider take a ``lease()``; an evicted provider's client is closed only
+once its last lease is released, so eviction never cuts off a request in flight.
+Call ``aclose()`` on shutdown to release every pooled connection.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from diagram_forge.providers.base import BaseImageProvider
+
+logger = logging.getLogger(__name__)
+
+PoolKey = tuple[str, str | None, str, str]
+
+
+def _hash_api_key(api_key: str) -> str:
+    """Return a short, stable digest of an API key for use in pool keys."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+class ProviderPool:
+    """Cache of provider instances shared by the MCP server, web API and eval runner."""
+
+    def __init__(
+        self,
+        factory: Callable[..., BaseImageProvider] | None = None,
+        max_idle_s: float = 300.0,
+        max_size: int = 64,
+    ):
+        self._factory = factory
+        self.max_idle_s = max_idle_s
+        self.max_size = max_size
+        self._entries: OrderedDict[PoolKey, tuple[BaseImageProvider, float]] = OrderedDict()
+        self._closing: set[asyncio.Task[None]] = set()
+        # Outstanding leases per provider, and evicted providers waiting for theirs to end.
+        self._leases: dict[BaseImageProvider, int] = {}
+        self._retired: set[BaseImageProvider] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        provider_name: str,
+        api_key: str,
+        model: str | None = None,
+        **kwargs: Any,
+    ) -> BaseImageProvider:
+        """Return the pooled provider for this (provider, model, key), creating it if needed.
+
+        The reference is only guaranteed open until the caller next awaits; anything
+        that awaits on the provider should hold a ``lease()`` instead.
+        """
+        now = time.monotonic()
+        self.evict_idle(now)
+
+        extra = json.dumps(kwargs, sort_keys=True, default=str) if kwargs else ""
+        key: PoolKey = (provider_name, model, _hash_api_key(api_key), extra)
+        entry = self._entries.get(key)
+        if entry is not None:
+            provider = entry[0]
+            self._entries[key] = (provider, now)
+            self._entries.move_to_end(key)
+            return provider
+
+        factory = self._factory
+        if factory is None:
+            from diagram_forge.providers import get_provider
+
+            factory = get_provider
+        if model is not None:
+            kwargs["model"] = model
+        provider = factory(provider_name, api_key, **kwargs)
+
+        self._entries[key] = (provider, now)
+        while len(self._entries) > self.max_size:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._retire(evicted)
+        return provider
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        provider_name: str,
+        api_key: str,
+        model: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[BaseImageProvider]:
+        """Like ``get``, but keeps the provider open until the ``async with`` block exits.
+
+        If the provider is evicted meanwhile, its client is closed when the last
+        lease on it is released rather than under the running request.
+        """
+        provider = self.get(provider_name, api_key, model, **kwargs)
+        self._leases[provider] = self._leases.get(provider, 0) + 1
+        try:
+            yield provider
+        finally:
+            remaining = self._leases.pop(provider) - 1
+            if remaining:
+                self._leases[provider] = remaining
+            elif provider in self._retired:
+                self._retired.discard(provider)
+                self._schedule_close(provider)
+
+    def evict_idle(self, now: float | None = None) -> int:
+        """Drop entries unused for longer than ``max_idle_s``; returns how many were evicted."""
+        now = time.monotonic() if now is None else now
+        stale = [
+            k for k, (_, last_used) in self._entries.items() if now - last_used > self.max_idle_s
+        ]
+        for key in stale:
+            provider, _ = self._entries.pop(key)
+            self._retire(provider)
+        return len(stale)
+
+    async def aclose(self) -> None:
+        """Close every pooled provider's client, leased or not. Safe to call more than once."""
+        providers = [p for p, _ in self._entries.values()] + list(self._retired)
+        self._entries.clear()
+        self._retired.clear()
+        for provider in providers:
+            await _close_quietly(provider)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def _retire(self, provider: BaseImageProvider) -> None:
+        """Close an evicted provider now, or once its outstanding leases are released."""
+        if self._leases.get(provider):
+            self._retired.add(provider)
+        else:
+            self._schedule_close(provider)
+
+    def _schedule_close(self, provider: BaseImageProvider) -> None:
+        """Close an evicted provider in the background when a loop is running.
+
+        Without a running loop there is nothing to await the close on; dropping the
+        reference lets the client's connection pool be garbage-collected instead.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(_close_quietly(provider))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+
+async def _close_quietly(provider: Any) -> None:
+    """Close a provider, tolerating stand-ins without ``aclose`` and close-time errors."""
+    aclose = getattr(provider, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception:
+        logger.debug("Closing %s failed", type(provider).__name__, exc_info=True)
+
+
+# Process-wide pool for callers without their own lifecycle (web API, eval runner).
+default_pool = ProviderPool()
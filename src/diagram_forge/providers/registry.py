@@ -0,0 +1,162 @@
+"""Lazy provider registry: names map to ``module:Class`` targets imported on first use.
+
+Built-in providers are listed here; other packages add providers by declaring an
+entry point in the ``diagram_forge.providers`` group, e.g. in their pyproject::
+
+    [project.entry-points."diagram_forge.providers"]
+    acme = "acme_diagrams.provider:AcmeProvider"
+
+Listing names or testing membership never imports a provider module, so startup
+cost does not grow with the number of installed providers. The first lookup of a
+name imports its module (and, through it, the provider's SDK) and records how long
+that took in ``import_times``.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import time
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+
+from diagram_forge.providers.base import BaseImageProvider
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "diagram_forge.providers"
+
+_BUILTIN_PROVIDERS: dict[str, str] = {
+    "gemini": "diagram_forge.providers.gemini:GeminiProvider",
+    "gemini_flash": "diagram_forge.providers.gemini:GeminiProvider",  # legacy alias
+    # gemini-3.1-flash-image (current default)
+    "gemini_flash_31": "diagram_forge.providers.gemini:GeminiProvider",
+    # gemini-2.5-flash-image (deprecated, shut down Jan 2026)
+    "gemini_flash_25": "diagram_forge.providers.gemini:GeminiProvider",
+    # default: gpt-image-2-2026-04-21
+    "openai": "diagram_forge.providers.openai_provider:OpenAIProvider",
+    # gpt-image-1-mini (cheap tier, opt-in)
+    "openai_mini": "diagram_forge.providers.openai_provider:OpenAIProvider",
+    # offline placeholder renderer for load testing
+    "local": "diagram_forge.providers.local:LocalProvider",
+}
+
+
+@dataclass
+class ProviderSpec:
+    """Where a provider name points, and what loading it cost."""
+
+    name: str
+    target: str
+    # "builtin", or the distribution that declared the entry point.
+    source: str = "builtin"
+    import_ms: float | None = None
+
+
+class ProviderRegistry(Mapping[str, type[BaseImageProvider]]):
+    """Read-only mapping of provider name → provider class, loaded lazily.
+
+    Entry points are scanned on the first access that needs the full name list.
+    A plugin cannot shadow a built-in name; the conflict is logged and skipped.
+    """
+
+    def __init__(self, builtins: Mapping[str, str] | None = None, group: str = ENTRY_POINT_GROUP):
+        self.group = group
+        self._specs: dict[str, ProviderSpec] = {
+            name: ProviderSpec(name, target)
+            for name, target in (_BUILTIN_PROVIDERS if builtins is None else builtins).items()
+        }
+        self._classes: dict[str, type[BaseImageProvider]] = {}
+        # target → (class, import ms), so aliases of one module share a single load.
+        self._loaded: dict[str, tuple[type[BaseImageProvider], float]] = {}
+        self._discovered = False
+
+    def _discover(self) -> None:
+        if self._discovered:
+            return
+        self._discovered = True
+        for ep in entry_points(group=self.group):
+            source = ep.dist.name if ep.dist is not None else "unknown"
+            existing = self._specs.get(ep.name)
+            if existing is not None:
+                if existing.target != ep.value:
+                    logger.warning(
+                        "Ignoring provider entry point %r from %s: name already registered by %s",
+                        ep.name,
+                        source,
+                        existing.source,
+                    )
+                continue
+            self._specs[ep.name] = ProviderSpec(ep.name, ep.value, source=source)
+
+    def register(self, name: str, target: str) -> None:
+        """Add (or replace) a provider at runtime, e.g. for tests or embedding."""
+        loaded = self._loaded.get(target)
+        self._specs[name] = ProviderSpec(
+            name, target, source="runtime", import_ms=loaded[1] if loaded else None
+        )
+        self._classes.pop(name, None)
+
+    def _spec(self, name: str) -> ProviderSpec | None:
+        spec = self._specs.get(name)
+        if spec is None and not self._discovered:
+            self._discover()
+            spec = self._specs.get(name)
+        return spec
+
+    def __getitem__(self, name: str) -> type[BaseImageProvider]:
+        cls = self._classes.get(name)
+        if cls is not None:
+            return cls
+        spec = self._spec(name)
+        if spec is None:
+            raise KeyError(name)
+        if spec.target not in self._loaded:
+            module_name, _, attr = spec.target.partition(":")
+            started = time.perf_counter()
+            module = importlib.import_module(module_name)
+            import_ms = round((time.perf_counter() - started) * 1000, 3)
+            cls = getattr(module, attr)
+            if not (isinstance(cls, type) and issubclass(cls, BaseImageProvider)):
+                raise TypeError(
+                    f"Provider {name!r} ({spec.target}) is not a BaseImageProvider subclass"
+                )
+            self._loaded[spec.target] = (cls, import_ms)
+            for other in self._specs.values():
+                if other.target == spec.target:
+                    other.import_ms = import_ms
+        cls, _ = self._loaded[spec.target]
+        self._classes[name] = cls
+        return cls
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._spec(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        self._discover()
+        return iter(list(self._specs))
+
+    def __len__(self) -> int:
+        self._discover()
+        return len(self._specs)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._classes
+
+    def specs(self) -> list[ProviderSpec]:
+        self._discover()
+        return list(self._specs.values())
+
+    def import_times(self) -> dict[str, float | None]:
+        """Milliseconds each provider's module took to import; None if not used yet.
+
+        Aliases of one class report the same load. A module that something else
+        had already imported reports close to zero.
+        """
+        self._discover()
+        return {name: spec.import_ms for name, spec in self._specs.items()}
+
+
+# Process-wide registry behind ``PROVIDER_MAP`` and ``get_provider``.
+default_registry = ProviderRegistry()
@@ -2,39 +2,105 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import re
 import time
-from dataclasses import asdict
+from collections.abc import AsyncIterator, Callable, Coroutine
+from contextlib import asynccontextmanager
+from dataclasses import asdict, fields, is_dataclass
+from datetime import UTC, datetime
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, NamedTuple
 from uuid import UUID
 
+from PIL import Image
 from pydantic import BaseModel
 
+from diagram_forge.batch_store import BatchItem, BatchStore, StoredBatch
+from diagram_forge.circuit_breaker import BreakerRegistry
 from diagram_forge.config import ensure_directories, load_config, resolve_api_key
 from diagram_forge.cost_tracker import CostTracker
+from diagram_forge.imaging import contact_sheet, grid_columns
+from diagram_forge.job_queue import JobRunner, reuse_cutoff
+from diagram_forge.job_store import JobStore, StoredJob
+from diagram_forge.limiter import LimiterRegistry, run_limited
 from diagram_forge.models import (
+    MAX_PARTIAL_IMAGES,
+    MAX_VARIANTS,
     AspectRatio,
+    BatchRequest,
+    DiagramTemplate,
     DiagramType,
+    ErrorKind,
     GenerationConfig,
+    GenerationEvent,
     GenerationRecord,
+    GenerationResult,
+    JobStatus,
+    LatencyTier,
+    OutputFormat,
     Quality,
     Resolution,
     Theme,
+    TierPlan,
+    TokenUsage,
 )
-from diagram_forge.providers import PROVIDER_MAP, get_provider
+from diagram_forge.output_writer import output_stamp, save_image
+from diagram_forge.providers import PROVIDER_MAP, BaseImageProvider, ProviderPool, get_provider
 from diagram_forge.style_manager import StyleManager
-from diagram_forge.template_engine import build_prompt, load_all_templates, load_template
+from diagram_forge.template_engine import (
+    build_prompt,
+    build_prompt_parts,
+    load_all_templates,
+    load_template,
+)
+from diagram_forge.timings import StageTimer
+
+if TYPE_CHECKING:
+    from mcp.server.fastmcp import Context as _Context
+
+    Context = _Context[Any, Any, Any]
+else:
+    try:
+        # Module level so FastMCP can resolve the ``ctx: Context`` annotation on tools;
+        # it looks for the bare class, so the annotation cannot be parametrised.
+        from mcp.server.fastmcp import Context
+    except ImportError:  # pragma: no cover - create_server reports the missing dependency
+        Context = Any
+
+logger = logging.getLogger(__name__)
+
+
+class ChainOutcome(NamedTuple):
+    """The last attempt of a fallback chain and the (provider, model) that made it."""
+
+    result: GenerationResult | None
+    provider: str | None
+    model: str | None
+
+
+# Dataclass fields holding image bytes; never part of a JSON response.
+_PAYLOAD_FIELDS = frozenset({"image_data", "extra_images"})
 
 
 def _serialize(value: Any) -> Any:
-    """Convert Pydantic models, dataclasses, UUIDs to JSON-serializable types."""
+    """Convert Pydantic models, dataclasses, UUIDs to JSON-serializable types.
+
+    Image payload fields are skipped rather than converted and dropped, so a
+    response never walks the image buffers it does not return.
+    """
     if isinstance(value, BaseModel):
         return value.model_dump(mode="json")
-    if hasattr(value, "__dataclass_fields__"):
-        d = asdict(value)
-        # Remove bytes fields
-        d.pop("image_data", None)
-        return d
+    if is_dataclass(value) and not isinstance(value, type):
+        return {
+            f.name: _serialize(getattr(value, f.name))
+            for f in fields(value)
+            if f.name not in _PAYLOAD_FIELDS
+        }
     if isinstance(value, list):
         return [_serialize(item) for item in value]
     if isinstance(value, dict):
@@ -48,6 +114,78 @@ def _serialize(value: Any) -> Any:
     return value
 
 
+def _usage_columns(usage: TokenUsage | None, parts: int = 1) -> dict[str, Any]:
+    """GenerationRecord token fields for an even ``parts``-way share of ``usage``."""
+    if usage is None:
+        return {}
+    share = usage.divided(parts)
+    return {"tokens_used": share.total_tokens, **asdict(share)}
+
+
+def _image_dimensions(data: bytes) -> dict[str, int] | None:
+    """Pixel size of an encoded image (reads only the header), or None if unreadable."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return {"width": width, "height": height}
+
+
+def _with_format_suffix(path: Path, data: bytes) -> Path:
+    """``path`` with its extension corrected to the format the image is encoded in."""
+    actual = OutputFormat.detect(data)
+    if actual is None:
+        return path
+    suffix = path.suffix.lower()
+    if suffix == actual.extension or (actual is OutputFormat.JPEG and suffix == ".jpeg"):
+        return path
+    return path.with_suffix(actual.extension)
+
+
+# generate_diagram arguments a batch_generate_diagrams item (or its defaults) may set.
+_BATCH_ITEM_FIELDS = frozenset(
+    {
+        "prompt",
+        "diagram_type",
+        "provider",
+        "model",
+        "resolution",
+        "aspect_ratio",
+        "style_reference",
+        "output_path",
+        "temperature",
+        "quality",
+        "theme",
+        "latency_tier",
+        "hedge",
+        "variants",
+        "output_format",
+        "output_compression",
+        "deadline_ms",
+    }
+)
+
+
+async def _report_progress(ctx: Context | None, progress: int, total: int, message: str) -> None:
+    """Send an MCP progress notification; a no-op if the client did not ask for progress.
+
+    Outside a live request (e.g. ``app.call_tool`` in tests) there is no session to
+    notify, and a dropped notification must never fail the generation itself.
+    """
+    if ctx is None:
+        return
+    try:
+        await ctx.report_progress(progress, total, message)
+    except Exception:
+        logger.debug("Dropped progress notification %d/%d", progress, total, exc_info=True)
+
+
+def _make_provider(name: str, api_key: str, **kwargs: Any) -> BaseImageProvider:
+    """ProviderPool factory; resolves ``get_provider`` at call time so tests can patch it."""
+    return get_provider(name, api_key, **kwargs)
+
+
 def _reject_relative_output_path(output_path: str | None) -> dict | None:
     """Return an error response dict if output_path is a relative path, else None.
 
@@ -88,10 +226,47 @@ def create_server(config_path: str | None = None) -> Any:
 
     # Initialize components
     cost_tracker = CostTracker(config.database_path)
+    batch_store = BatchStore(config.database_path)
     style_manager = StyleManager(config.styles_directory)
+    # One provider instance (and SDK connection pool) per provider/model/key for the
+    # server's lifetime, instead of a new client and TLS handshake per call.
+    provider_pool = ProviderPool(factory=_make_provider)
+    # Adaptive per-provider/model concurrency caps; calls queue here rather than
+    # stampeding a provider that is already answering 429.
+    limiters = LimiterRegistry(config.concurrency)
+    # Providers that keep failing are skipped outright until a probe succeeds.
+    breakers = BreakerRegistry(config.circuit_breaker)
+
+    def _circuit_open(provider_name: str, provider_model: str) -> bool:
+        return (
+            config.circuit_breaker.enabled
+            and not breakers.get(provider_name, provider_model).allow_request()
+        )
+
+    def _resolve_tier_plan(
+        tier: LatencyTier, diagram_type: str, template: DiagramTemplate | None
+    ) -> tuple[TierPlan, list[str]]:
+        """The config's plan for ``tier`` with the (already loaded) template's overrides applied."""
+        plan = config.latency_tiers.get(tier, TierPlan())
+        sources = ["config"] if tier in config.latency_tiers else []
+        override = template.latency_tiers.get(tier) if template is not None else None
+        if override is not None:
+            plan = plan.merged(override)
+            sources.append(f"template:{diagram_type}")
+        return plan, sources
+
+    @asynccontextmanager
+    async def _lifespan(_app: FastMCP) -> AsyncIterator[dict[str, Any]]:
+        # Resume jobs that were still queued when the server last stopped.
+        job_runner.start()
+        try:
+            yield {}
+        finally:
+            await job_runner.aclose()
+            await provider_pool.aclose()
 
     # Create FastMCP instance
-    app = FastMCP("diagram-forge")
+    app = FastMCP("diagram-forge", lifespan=_lifespan)
 
     def _run_tool(func, *args, _tool_name: str = "unknown", **kwargs):
         """Wrapper for timing and error handling."""
@@ -123,6 +298,109 @@ def create_server(config_path: str | None = None) -> Any:
                 "elapsed_ms": elapsed,
             }
 
+    def _hedge_threshold_s(candidate: str, candidate_model: str) -> float:
+        """Seconds to let a candidate run before hedging: its p95 if known, else delay_ms."""
+        hedging = config.hedging
+        if hedging.use_p95:
+            p95 = cost_tracker.latency_percentile(
+                candidate,
+                candidate_model,
+                percentile=0.95,
+                days=hedging.lookback_days,
+                min_samples=hedging.min_samples,
+            )
+            if p95 is not None:
+                return p95 / 1000
+        return hedging.delay_ms / 1000
+
+    async def _run_hedged(
+        runnable: list[tuple[str, str, str]],
+        attempt: Callable[[str, str, str], Coroutine[Any, Any, GenerationResult]],
+        attempts: list[dict[str, Any]],
+        on_win: Callable[[], None] | None = None,
+    ) -> ChainOutcome:
+        """Walk the chain with hedging: start the next candidate once the newest in-flight
+        one passes its latency threshold, or as soon as it fails. First success wins; the
+        rest are cancelled and reported in ``attempts`` (their cost records are written
+        by ``attempt`` itself). ``on_win`` is called just before the losers are cancelled.
+        """
+        queue = list(runnable)
+        pending: dict[asyncio.Task[GenerationResult], tuple[str, str]] = {}
+        newest: tuple[float, float] = (0.0, 0.0)  # (launched_at, threshold_s)
+
+        def launch() -> None:
+            nonlocal newest
+            candidate, candidate_model, api_key = queue.pop(0)
+            task = asyncio.create_task(attempt(candidate, candidate_model, api_key))
+            pending[task] = (candidate, candidate_model)
+            newest = (time.monotonic(), _hedge_threshold_s(candidate, candidate_model))
+
+        launch()
+        last = ChainOutcome(None, None, None)
+        try:
+            while pending:
+                timeout = None
+                if queue:
+                    launched_at, threshold = newest
+                    timeout = max(0.0, threshold - (time.monotonic() - launched_at))
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()
+                    continue
+                winner = None
+                runners_up: list[ChainOutcome] = []
+                # Launch order, so of two successes finishing together the earlier
+                # candidate in the chain wins.
+                for task in [t for t in pending if t in done]:
+                    candidate, candidate_model = pending.pop(task)
+                    outcome = task.result()
+                    last = ChainOutcome(outcome, candidate, candidate_model)
+                    if outcome.success and winner is None:
+                        winner = last
+                    elif outcome.success:
+                        runners_up.append(last)
+                    else:
+                        attempts.append(
+                            {
+                                "provider": candidate,
+                                "model": candidate_model,
+                                "error": outcome.error_message,
+                                "error_kind": outcome.error_kind,
+                                "retries": outcome.retries,
+                            }
+                        )
+                if winner is not None:
+                    # Finished (and billed, and in the ledger) but not used.
+                    for runner_up in runners_up:
+                        attempts.append(
+                            {
+                                "provider": runner_up.provider,
+                                "model": runner_up.model,
+                                "discarded": f"hedged request won by '{winner.provider}'",
+                            }
+                        )
+                    if on_win is not None:
+                        on_win()
+                    for candidate, candidate_model in pending.values():
+                        attempts.append(
+                            {
+                                "provider": candidate,
+                                "model": candidate_model,
+                                "cancelled": f"hedged request won by '{winner.provider}'",
+                            }
+                        )
+                    return winner
+                if not pending and queue:
+                    launch()
+            return last
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
     # --- Tool: generate_diagram ---
 
     @app.tool()
@@ -131,13 +409,21 @@ def create_server(config_path: str | None = None) -> Any:
         diagram_type: str = "generic",
         provider: str = "auto",
         model: str | None = None,
-        resolution: str = "2K",
+        resolution: str | None = None,
         aspect_ratio: str = "16:9",
         style_reference: str | None = None,
         output_path: str | None = None,
         temperature: float = 1.0,
         quality: str = "auto",
         theme: str = "light",
+        latency_tier: str | None = None,
+        hedge: bool | None = None,
+        variants: int = 1,
+        partial_images: int = 0,
+        output_format: str = "png",
+        output_compression: int | None = None,
+        deadline_ms: int | None = None,
+        ctx: Context | None = None,
     ) -> dict:
         """Generate an architecture diagram from a text prompt.
 
@@ -150,7 +436,7 @@ def create_server(config_path: str | None = None) -> Any:
                 background; you do NOT need to describe a background color in `prompt`.
             provider: LEAVE AS DEFAULT ("auto"). The server is responsible for picking the right provider and model for the diagram type — callers should describe what to draw and let the server decide how. The current default chain is OpenAI gpt-image-2 (primary) → Gemini (fallback). Override only if you have a specific provider/model comparison need.
             model: LEAVE UNSET unless you're explicitly benchmarking models. Server picks the right model for the chosen provider.
-            resolution: Output resolution (1K|2K|4K)
+            resolution: Output resolution (1K|2K|4K). Default: the latency tier's, else 2K.
             aspect_ratio: Output aspect ratio (16:9|1:1|9:16|4:3)
             style_reference: Style name or path to reference image
             output_path: Where to save the image (auto-generated if not provided)
@@ -158,27 +444,95 @@ def create_server(config_path: str | None = None) -> Any:
             quality: Output quality tier for OpenAI gpt-image-2 / gpt-image-1-mini (low|medium|high|auto).
                 Cost scales dramatically: at 1536x1024 on gpt-image-2, low=$0.005, medium=$0.041, high=$0.165.
                 Ignored by Gemini and legacy gpt-image-1.5. Default: auto.
+            latency_tier: fast|balanced|best — the way to trade quality for speed without
+                naming providers or models. The server resolves it to a provider, model,
+                quality and resolution (configurable globally and per template) and echoes
+                the plan in `latency_tier`. Use "fast" for interactive sketching. Explicit
+                provider/model/quality/resolution arguments still win.
+            hedge: Hedge across the fallback chain — start the next provider once the current
+                one runs past its p95 latency, keep the first success, cancel the rest. Both
+                calls may be billed. Default: the server's `hedging.enabled` setting.
+            variants: Number of alternative images to generate in one provider request
+                (1-4). Every variant is saved and billed; paths are in `output_paths`.
+            partial_images: Stream up to 3 low-fidelity previews while the image renders
+                (OpenAI gpt-image models, single variant). Each is written next to the
+                output as `<name>.partial<N>.<ext>` (ext follows the output format) and
+                announced as an MCP progress notification; previews are removed once the
+                final image is saved.
+                Stage progress (prompt built, request sent, saving) is always reported
+                to clients that send a progress token.
+            output_format: Encoded format (png|webp|jpeg). webp/jpeg are much smaller than
+                PNG for diagram artwork; supported by OpenAI gpt-image models, others return
+                PNG. The saved file's extension always matches the bytes actually returned.
+            output_compression: 0-100 compression level for webp/jpeg (OpenAI). Default:
+                provider default.
+            deadline_ms: Total time budget for the whole call, fallbacks included. Each
+                fallback candidate only gets what is left; when the budget runs out the
+                in-flight provider call is cancelled (and still recorded in the cost ledger)
+                and the response has `deadline_exceeded: true`. Default: no deadline.
         """
         start = time.monotonic()
+        if deadline_ms is not None and deadline_ms <= 0:
+            return {
+                "status": "error",
+                "error": f"deadline_ms must be a positive number of milliseconds; got {deadline_ms}.",
+            }
 
         # What the caller actually asked for, captured before template resolution rewrites
         # `provider`. Reported back so a substitution is always visible in the response.
         requested_provider = provider
 
+        # Where the time goes, returned as `timings` and stored on the ledger row.
+        timer = StageTimer()
+        # Loaded once: tier overrides, auto-selection and the prompt all read it.
+        with timer.stage("template_load_ms"):
+            try:
+                template = load_template(diagram_type)
+            except FileNotFoundError:
+                template = None
+
+        # Resolve the latency tier to a concrete plan; it fills only what the caller left
+        # unset, and template recommendations below fill whatever the plan leaves open.
+        tier_echo = None
+        if latency_tier is not None:
+            try:
+                tier = LatencyTier(latency_tier.lower())
+            except ValueError:
+                return {
+                    "status": "error",
+                    "error": (
+                        f"Invalid latency_tier '{latency_tier}'. "
+                        f"Use one of: {', '.join(t.value for t in LatencyTier)}."
+                    ),
+                }
+            plan, sources = _resolve_tier_plan(tier, diagram_type, template)
+            if provider == "auto" and plan.provider:
+                provider = plan.provider
+                if not model and plan.model:
+                    model = plan.model
+            if quality == "auto" and plan.quality:
+                quality = plan.quality.value
+            if resolution is None and plan.resolution:
+                resolution = plan.resolution.value
+            tier_echo = {
+                "tier": tier.value,
+                "plan": plan.model_dump(mode="json", exclude_none=True),
+                "sources": sources,
+            }
+        resolution = resolution or "2K"
+
         # Auto-select provider / model / quality from template recommendation.
         # `quality="auto"` means "no caller override" — let the template decide.
         if provider == "auto" or quality == "auto":
-            try:
-                tmpl = load_template(diagram_type)
-                if provider == "auto":
-                    provider = tmpl.recommended_provider or config.default_provider.value
-                    if not model and tmpl.recommended_model:
-                        model = tmpl.recommended_model
-                if quality == "auto" and tmpl.recommended_quality:
-                    quality = tmpl.recommended_quality
-            except FileNotFoundError:
+            if template is not None:
                 if provider == "auto":
-                    provider = config.default_provider.value
+                    provider = template.recommended_provider or config.default_provider.value
+                    if not model and template.recommended_model:
+                        model = template.recommended_model
+                if quality == "auto" and template.recommended_quality:
+                    quality = template.recommended_quality
+            elif provider == "auto":
+                provider = config.default_provider.value
 
         # Build fallback chain: explicit provider first, then config chain, skip dupes
         if provider == "auto" or provider == config.default_provider.value:
@@ -197,50 +551,119 @@ def create_server(config_path: str | None = None) -> Any:
                 "error": f"Invalid theme '{theme}'. Use 'light' (default) or 'dark'.",
             }
 
+        if not 1 <= variants <= MAX_VARIANTS:
+            return {
+                "status": "error",
+                "error": f"variants must be between 1 and {MAX_VARIANTS}; got {variants}.",
+            }
+
+        if not 0 <= partial_images <= MAX_PARTIAL_IMAGES:
+            return {
+                "status": "error",
+                "error": (
+                    f"partial_images must be between 0 and {MAX_PARTIAL_IMAGES}; "
+                    f"got {partial_images}."
+                ),
+            }
+
+        try:
+            format_enum = OutputFormat(output_format.lower())
+        except ValueError:
+            return {
+                "status": "error",
+                "error": f"Invalid output_format '{output_format}'. Use png, webp or jpeg.",
+            }
+        if output_compression is not None and not 0 <= output_compression <= 100:
+            return {
+                "status": "error",
+                "error": f"output_compression must be between 0 and 100; got {output_compression}.",
+            }
+
         # Reject a relative output_path early — before any provider/API call — so a
         # misplaced-file failure is loud and cheap rather than silent and paid-for.
         err = _reject_relative_output_path(output_path)
         if err:
             return err
 
-        # Build the full prompt from template + user prompt (global tokens injected automatically)
-        full_prompt = build_prompt(
-            diagram_type=diagram_type,
-            user_prompt=prompt,
-            resolution=resolution,
-            aspect_ratio=aspect_ratio,
-            design_tokens=config.design_tokens,
-            theme=theme_enum,
-        )
+        # Resolved up front so streamed preview frames can be written next to it.
+        if output_path:
+            save_to = Path(output_path).expanduser()
+        else:
+            save_to = (
+                Path(config.output_directory).expanduser()
+                / f"{diagram_type}_{output_stamp()}{format_enum.extension}"
+            )
+
+        # Progress steps: prompt built, request sent, one per partial frame, saving.
+        progress_total = 3 + partial_images
+        progress_step = 0
+        previews: list[Path] = []
+
+        async def _progress(step: int, message: str) -> None:
+            # Hedged attempts report concurrently; keep the counter monotonic.
+            nonlocal progress_step
+            progress_step = max(progress_step, step)
+            await _report_progress(ctx, progress_step, progress_total, message)
+
+        async def _on_event(candidate: str, event: GenerationEvent) -> None:
+            if event.stage == "request_sent":
+                await _progress(2, f"request sent to {candidate}")
+            elif event.stage == "partial_image" and event.image_data:
+                index = len(previews) + 1
+                preview = save_to.with_name(f"{save_to.stem}.partial{index}{save_to.suffix}")
+                await save_image(preview, event.image_data)
+                previews.append(preview)
+                await _progress(
+                    2 + index, f"partial image {index}/{partial_images} from {candidate}: {preview}"
+                )
+
+        # Build the full prompt from template + user prompt (global tokens injected automatically).
+        # Everything call-specific goes after the template/theme prefix so it stays cacheable.
+        with timer.stage("prompt_build_ms"):
+            prompt_parts = build_prompt_parts(
+                diagram_type=diagram_type,
+                user_prompt=prompt,
+                resolution=resolution,
+                aspect_ratio=aspect_ratio,
+                design_tokens=config.design_tokens,
+                theme=theme_enum,
+                template=template,
+            )
 
         # Resolve style reference — inject description into prompt for text-only providers.
         # When a file path is given, the path is passed directly; the edit API uses it visually.
         style_path = None
         if style_reference:
-            style_path = style_manager.get_style_path(style_reference)
-            style_obj = style_manager.get_style(style_reference)
+            with timer.stage("style_scan_ms"):
+                style_path = style_manager.get_style_path(style_reference)
+                style_obj = style_manager.get_style(style_reference)
             if style_obj and style_obj.description:
-                full_prompt = (
-                    f"STYLE REFERENCE — match this style exactly:\n{style_obj.description}\n\n"
-                    f"{full_prompt}"
+                prompt_parts = prompt_parts.with_preamble(
+                    f"STYLE REFERENCE — match this style exactly:\n{style_obj.description}"
                 )
             elif style_path and not style_obj:
                 # Direct file path provided — no text description available,
                 # but prompt GPT to treat the input image as a visual style guide.
-                full_prompt = (
-                    f"STYLE REFERENCE — the input image shows the exact visual style to match. "
-                    f"Generate new content with the same layout, typography, colors, and design "
-                    f"language, but replace all content with the following:\n\n{full_prompt}"
+                prompt_parts = prompt_parts.with_preamble(
+                    "STYLE REFERENCE — the input image shows the exact visual style to match. "
+                    "Generate new content with the same layout, typography, colors, and design "
+                    "language, but replace all content with the following:"
                 )
 
         gen_config = GenerationConfig(
-            prompt=full_prompt,
+            prompt=prompt_parts.text,
+            prompt_prefix=prompt_parts.prefix,
             resolution=Resolution(resolution),
             aspect_ratio=AspectRatio(aspect_ratio),
             temperature=temperature,
             quality=Quality(quality),
+            variants=variants,
+            partial_images=partial_images,
+            output_format=format_enum,
+            output_compression=output_compression,
             style_reference_path=style_path,
         )
+        await _progress(1, "prompt built")
 
         # Try each provider in the fallback chain.
         # Every candidate that does not produce the image is recorded, so a caller can never
@@ -251,91 +674,703 @@ def create_server(config_path: str | None = None) -> Any:
         effective_provider = None
         effective_model = None
         attempts: list[dict] = []
+        runnable: list[tuple[str, str, str]] = []
         for candidate in candidates:
             provider_config = config.providers.get(candidate)
             if not provider_config or not provider_config.enabled:
                 attempts.append({"provider": candidate, "skipped": "disabled or not configured"})
                 continue
             api_key = resolve_api_key(provider_config)
-            if not api_key:
+            if api_key is None:
                 attempts.append({"provider": candidate, "skipped": "no API key resolved"})
                 continue
             candidate_model = model if (candidate == candidates[0] and model) else provider_config.model
-            img_provider = get_provider(candidate, api_key, model=candidate_model)
-            result = await img_provider.generate(gen_config)
-            effective_provider = candidate
-            effective_model = candidate_model
-            cost_tracker.record(
+            if _circuit_open(candidate, candidate_model):
+                attempts.append(
+                    {"provider": candidate, "model": candidate_model, "skipped": "circuit open"}
+                )
+                continue
+            runnable.append((candidate, candidate_model, api_key))
+
+        async def _attempt(candidate: str, candidate_model: str, api_key: str) -> GenerationResult:
+            """Run one provider call and record it — including when it is cancelled."""
+            started.add((candidate, candidate_model))
+            lease = provider_pool.lease(
+                candidate, api_key, model=candidate_model, **config.providers[candidate].extra
+            )
+            breaker = breakers.get(candidate, candidate_model)
+            attempt_start = time.monotonic()
+            outcome = None
+            sent_to: Any = None  # the provider, once the call has left the limiter queue
+
+            try:
+                async with lease as img_provider:
+
+                    async def _call() -> GenerationResult:
+                        nonlocal sent_to
+                        sent_to = img_provider
+                        with_progress = getattr(img_provider, "generate_with_progress", None)
+                        if with_progress is None:
+                            return await img_provider.generate(gen_config)
+                        streamed: GenerationResult = await with_progress(
+                            gen_config, lambda event: _on_event(candidate, event)
+                        )
+                        return streamed
+
+                    outcome = await run_limited(limiters.get(candidate, candidate_model), _call)
+            except asyncio.CancelledError:
+                # A call cancelled after it was sent has usually been billed already; keep
+                # it in the ledger at its estimated cost so hedging and deadlines are not
+                # free in cost reports. Still queued for a slot means it never went out.
+                estimate = getattr(sent_to, "estimate_cost", None)
+                cost = estimate(gen_config) if estimate is not None else 0.0
+                billed = "; possibly billed (estimated cost)" if sent_to is not None else ""
+                if cancel_reason == "deadline exceeded":
+                    attempts.append(
+                        {
+                            "provider": candidate,
+                            "model": candidate_model,
+                            "cancelled": f"deadline of {deadline_ms} ms exceeded",
+                        }
+                    )
+                    # A provider that cannot answer within the deadline counts against
+                    # its breaker like a timeout; other cancellations stay neutral.
+                    outcome = GenerationResult(
+                        success=False,
+                        error_message=f"no response within the {deadline_ms} ms deadline",
+                        error_kind=ErrorKind.TRANSIENT,
+                    )
+                cost_tracker.record(
+                    GenerationRecord(
+                        provider=candidate,
+                        model=candidate_model,
+                        diagram_type=diagram_type,
+                        resolution=resolution,
+                        aspect_ratio=aspect_ratio,
+                        cost_usd=cost,
+                        billing_model="per_image",
+                        generation_time_ms=int((time.monotonic() - attempt_start) * 1000),
+                        success=False,
+                        template_used=diagram_type,
+                        style_used=style_reference,
+                        error_message=f"cancelled: {cancel_reason}{billed}",
+                    )
+                )
+                raise
+            finally:
+                # None (cancelled by the caller, or raised) is neutral for the breaker.
+                breaker.record(outcome)
+            # One ledger row per image, so variant requests show their per-image cost.
+            image_count = max(1, len(outcome.images))
+            wall_ms = int((time.monotonic() - attempt_start) * 1000)
+            attempt_ms = wall_ms - outcome.queue_wait_ms
+            attempt_timings = {
+                "queue_wait_ms": outcome.queue_wait_ms,
+                "network_ms": max(0, attempt_ms - outcome.decode_ms),
+                "decode_ms": outcome.decode_ms,
+            }
+            records = [
                 GenerationRecord(
                     provider=candidate,
                     model=candidate_model,
                     diagram_type=diagram_type,
                     resolution=resolution,
                     aspect_ratio=aspect_ratio,
-                    tokens_used=result.tokens_used,
-                    cost_usd=result.cost_usd,
-                    billing_model=result.billing_model.value,
-                    generation_time_ms=int((time.monotonic() - start) * 1000),
-                    success=result.success,
+                    **_usage_columns(outcome.usage, image_count),
+                    cost_usd=outcome.cost_usd / image_count,
+                    billing_model=outcome.billing_model.value,
+                    generation_time_ms=attempt_ms,
+                    success=outcome.success,
                     output_path=None,
                     template_used=diagram_type,
                     style_used=style_reference,
-                    error_message=result.error_message,
+                    error_message=outcome.error_message,
+                    timings=attempt_timings,
                 )
-            )
-            if result.success:
-                break
-            attempts.append(
-                {
-                    "provider": candidate,
-                    "model": candidate_model,
-                    "error": result.error_message,
-                }
-            )
-
-        if result is None:
+                for _ in range(image_count)
+            ]
+            with timer.stage("ledger_write_ms"):
+                for record in records:
+                    cost_tracker.record(record)
+            ledger_rows[(candidate, candidate_model)] = (wall_ms, [r.id for r in records])
+            return outcome
+
+        async def _run_chain() -> ChainOutcome:
+            use_hedging = config.hedging.enabled if hedge is None else hedge
+            if use_hedging and len(runnable) > 1:
+                return await _run_hedged(runnable, _attempt, attempts, on_win=_hedge_won)
+            outcome = ChainOutcome(None, None, None)
+            for candidate, candidate_model, api_key in runnable:
+                attempt_result = await _attempt(candidate, candidate_model, api_key)
+                outcome = ChainOutcome(attempt_result, candidate, candidate_model)
+                if attempt_result.success:
+                    break
+                attempts.append(
+                    {
+                        "provider": candidate,
+                        "model": candidate_model,
+                        "error": attempt_result.error_message,
+                        "error_kind": attempt_result.error_kind,
+                        "retries": attempt_result.retries,
+                    }
+                )
+            return outcome
+
+        # Why in-flight attempts are being cancelled; whoever cancels sets it first.
+        # MCP cancellation and client disconnects arrive as a plain task cancellation.
+        cancel_reason = "request cancelled by client"
+        started: set[tuple[str, str]] = set()
+        # (provider, model) -> (attempt wall time ms, its ledger row ids).
+        ledger_rows: dict[tuple[str, str], tuple[int, list[UUID]]] = {}
+        chain_start = time.monotonic()
+
+        def _hedge_won() -> None:
+            nonlocal cancel_reason
+            cancel_reason = "superseded by a hedged request"
+
+        chain_task = asyncio.ensure_future(_run_chain())
+        deadline_handle = None
+        if deadline_ms is not None:
+            # One timer for the whole chain, so a fallback only gets the remaining budget.
+            remaining = deadline_ms / 1000 - (time.monotonic() - start)
+
+            def _expire() -> None:
+                nonlocal cancel_reason
+                if not chain_task.done():
+                    cancel_reason = "deadline exceeded"
+                    chain_task.cancel()
+
+            deadline_handle = asyncio.get_running_loop().call_later(max(0.0, remaining), _expire)
+        try:
+            result, effective_provider, effective_model = await chain_task
+        except asyncio.CancelledError:
+            for preview in previews:
+                preview.unlink(missing_ok=True)
+            current = asyncio.current_task()
+            if cancel_reason != "deadline exceeded" or (current and current.cancelling()):
+                raise
+            for candidate, candidate_model, _ in runnable:
+                if (candidate, candidate_model) not in started:
+                    attempts.append(
+                        {
+                            "provider": candidate,
+                            "model": candidate_model,
+                            "skipped": "deadline exceeded",
+                        }
+                    )
+            return {
+                "status": "error",
+                "error": (
+                    f"Deadline of {deadline_ms} ms exceeded before any provider produced an "
+                    "image. The in-flight call was cancelled; see attempts."
+                ),
+                "deadline_exceeded": True,
+                "requested_provider": requested_provider,
+                "generation_time_ms": int((time.monotonic() - start) * 1000),
+                "attempts": attempts,
+                "timings": timer.as_dict(),
+            }
+        finally:
+            if deadline_handle is not None:
+                deadline_handle.cancel()
+            if config.circuit_breaker.enabled:
+                # Hand back half-open probe slots claimed for candidates never tried.
+                for candidate, candidate_model, _ in runnable:
+                    if (candidate, candidate_model) not in started:
+                        breakers.get(candidate, candidate_model).release()
+
+        if result is None or effective_provider is None or effective_model is None:
             return {
                 "status": "error",
-                "error": "No providers configured or API keys missing",
+                "error": (
+                    "No provider could be attempted: every candidate is disabled, "
+                    "missing an API key, or has an open circuit. See attempts."
+                ),
                 "requested_provider": requested_provider,
                 "attempts": attempts,
             }
 
-        elapsed_ms = int((time.monotonic() - start) * 1000)
+        # Split the final attempt into queue wait, network and decode; earlier attempts
+        # (failed, or hedged and overlapping) count as fallback time.
+        chain_ms = (time.monotonic() - chain_start) * 1000
+        final_wall_ms, final_rows = ledger_rows.get((effective_provider, effective_model), (0, []))
+        timer.add("queue_wait_ms", result.queue_wait_ms)
+        timer.add("network_ms", final_wall_ms - result.queue_wait_ms - result.decode_ms)
+        timer.add("decode_ms", result.decode_ms)
+        timer.add("fallback_ms", chain_ms - final_wall_ms)
 
-        # Save image
+        # Save image(s). Variant 1 goes to output_path; further variants get a _v<N> suffix.
         saved_path = None
+        saved_paths: list[str] = []
         if result.success and result.image_data:
-            if output_path:
-                save_to = Path(output_path).expanduser()
-            else:
-                output_dir = Path(config.output_directory).expanduser()
-                output_dir.mkdir(parents=True, exist_ok=True)
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                save_to = output_dir / f"{diagram_type}_{timestamp}.png"
-
-            save_to.parent.mkdir(parents=True, exist_ok=True)
-            save_to.write_bytes(result.image_data)
-            saved_path = str(save_to)
+            # A fallback provider may not honour output_format; name the file for its bytes.
+            save_to = _with_format_suffix(save_to, result.image_data)
+            await _progress(progress_total, f"saving {save_to}")
+            with timer.stage("disk_write_ms"):
+                for index, image in enumerate(result.images, start=1):
+                    target = (
+                        save_to if index == 1 else save_to.with_stem(f"{save_to.stem}_v{index}")
+                    )
+                    await save_image(target, image, fsync=config.fsync_output)
+                    saved_paths.append(str(target))
+            saved_path = saved_paths[0]
             result.output_path = saved_path
+        # Previews only stand in until the final image exists (or the request failed).
+        for preview in previews:
+            preview.unlink(missing_ok=True)
+
+        timings = timer.as_dict()
+        cost_tracker.update_timings(final_rows, timings)
 
         response = _serialize(result)
         response["status"] = "success" if result.success else "error"
+        response["timings"] = timings
         response["provider_used"] = effective_provider
         response["requested_provider"] = requested_provider
+        if tier_echo:
+            tier_echo["resolved"] = {
+                "provider": effective_provider,
+                "model": effective_model,
+                "quality": quality,
+                "resolution": resolution,
+            }
+            response["latency_tier"] = tier_echo
+        # Input tokens the provider served from its prompt cache for this call.
+        response["cache_hit_tokens"] = result.usage.cached_input_tokens if result.usage else None
         # A fallback that hides the substitution is worse than one that fails: the caller
         # believes it got what it asked for. Say so in the payload, not only in the log.
         if attempts:
             response["fell_back_from"] = attempts
-            if result.success and effective_provider != attempts[0].get("provider"):
+            # Compare with the head of the chain, not attempts[0]: a hedge the primary
+            # won leaves the cancelled secondary first in attempts.
+            if result.success and effective_provider != candidates[0]:
                 response["warning"] = (
                     f"Requested provider '{requested_provider}' did not produce this image. "
                     f"Generated with '{effective_provider}' instead. See fell_back_from."
                 )
-        if saved_path:
+        if saved_path and result.image_data:
             response["output_path"] = saved_path
+            response["output_paths"] = saved_paths
+            # What the provider actually produced, which may differ from the request.
+            response["dimensions"] = _image_dimensions(result.image_data)
+            produced = OutputFormat.detect(result.image_data)
+            response["output_format"] = produced.value if produced else None
+            response["image_bytes"] = len(result.image_data)
         return response
 
+    # --- Tool: batch_generate_diagrams ---
+
+    @app.tool()
+    async def batch_generate_diagrams(
+        # Not list[dict]: a malformed item gets its own error entry instead of
+        # failing validation for the whole batch.
+        items: list[Any],
+        defaults: dict[str, Any] | None = None,
+        max_concurrency: int = 4,
+        output_dir: str | None = None,
+        ctx: Context | None = None,
+    ) -> dict[str, Any]:
+        """Generate several diagrams concurrently in one call (e.g. every figure for a doc).
+
+        Items run in parallel, up to max_concurrency at once and within each provider's
+        concurrency limit. A failed item is reported in its own entry and does not stop
+        the others. Each finished item is announced as a progress notification. The
+        response status is success, partial (some items failed) or error (all failed).
+
+        Args:
+            items: Diagram specs; each takes generate_diagram's arguments, e.g. {"prompt":
+                str, "diagram_type": str, "theme": str, "output_path": absolute path}.
+            defaults: Arguments applied to every item unless the item sets them.
+            max_concurrency: Most items generating at the same time (1-16).
+            output_dir: Directory for items without an output_path (default: configured
+                output directory); files are named batch_<timestamp>_<n>.
+        """
+        start = time.monotonic()
+        if not items:
+            return {"status": "error", "error": "items must contain at least one diagram"}
+        if not 1 <= max_concurrency <= 16:
+            return {
+                "status": "error",
+                "error": f"max_concurrency must be between 1 and 16; got {max_concurrency}.",
+            }
+        err = _reject_relative_output_path(output_dir)
+        if err:
+            return err
+        defaults = dict(defaults or {})
+        unknown = sorted(set(defaults) - _BATCH_ITEM_FIELDS)
+        if unknown:
+            return {"status": "error", "error": f"Unknown defaults: {', '.join(unknown)}"}
+
+        default_dir = Path(output_dir or config.output_directory).expanduser()
+        stamp = output_stamp()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        completion_order: list[int] = []
+
+        async def run_item(index: int, item: Any) -> dict[str, Any]:
+            item_start = time.monotonic()
+            args = {**defaults, **item} if isinstance(item, dict) else {}
+            unknown = sorted(set(args) - _BATCH_ITEM_FIELDS)
+            if not isinstance(item, dict):
+                response = {
+                    "status": "error",
+                    "error": f"item must be an object; got {type(item).__name__}",
+                }
+            elif unknown:
+                response = {
+                    "status": "error",
+                    "error": f"Unknown item fields: {', '.join(unknown)}",
+                }
+            elif not args.get("prompt"):
+                response = {"status": "error", "error": "item needs a non-empty 'prompt'"}
+            else:
+                # Distinct default names: items finishing in the same second must not collide.
+                args.setdefault("output_path", str(default_dir / f"batch_{stamp}_{index + 1}.png"))
+                try:
+                    async with semaphore:
+                        response = await generate_diagram(**args)
+                except Exception as exc:  # noqa: BLE001 - one item must not sink the batch
+                    response = {"status": "error", "error": str(exc)}
+            result = {
+                "index": index,
+                **response,
+                "elapsed_ms": int((time.monotonic() - item_start) * 1000),
+            }
+            completion_order.append(index)
+            await _report_progress(
+                ctx,
+                len(completion_order),
+                len(items),
+                f"item {index + 1}/{len(items)} {response.get('status')}: "
+                f"{response.get('output_path') or response.get('error') or response.get('error_message')}",
+            )
+            return result
+
+        # gather keeps input order, so results[i] is always items[i].
+        results = await asyncio.gather(*(run_item(index, item) for index, item in enumerate(items)))
+
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        return {
+            "status": "success"
+            if succeeded == len(items)
+            else ("partial" if succeeded else "error"),
+            "succeeded": succeeded,
+            "failed": len(items) - succeeded,
+            "total_cost_usd": round(sum(r.get("cost_usd") or 0.0 for r in results), 6),
+            "wall_time_ms": int((time.monotonic() - start) * 1000),
+            # Sum of per-item times; compare with wall_time_ms for the parallel speed-up.
+            "item_time_ms": sum(r["elapsed_ms"] for r in results),
+            "completion_order": completion_order,
+            "results": results,
+        }
+
+    # --- Tool: compare_providers ---
+
+    @app.tool()
+    async def compare_providers(
+        prompt: str,
+        diagram_type: str = "generic",
+        candidates: list[str] | None = None,
+        resolution: str = "2K",
+        aspect_ratio: str = "16:9",
+        quality: str = "auto",
+        theme: str = "light",
+        output_dir: str | None = None,
+        make_contact_sheet: bool = True,
+    ) -> dict[str, Any]:
+        """Run one prompt against several providers/models at once to compare them.
+
+        The prompt is rendered once and sent to every candidate in parallel, with no
+        fallback: each candidate either produces its image or reports why not. Every
+        call is billed and recorded in the usage log.
+
+        Args:
+            prompt: Description of what to generate
+            diagram_type: Template to render the prompt with
+            candidates: Provider names from the config, optionally "provider:model"
+                (e.g. ["gemini", "gemini_flash_31", "openai", "openai_mini"]). Default:
+                every enabled provider with an API key.
+            resolution: Output resolution (1K|2K|4K)
+            aspect_ratio: Output aspect ratio (16:9|1:1|9:16|4:3)
+            quality: OpenAI quality tier (low|medium|high|auto)
+            theme: Background theme (light|dark)
+            output_dir: Where to save the images (default: configured output directory)
+            make_contact_sheet: Also save one labelled grid of all results
+        """
+        start = time.monotonic()
+        try:
+            theme_enum = Theme(theme.lower())
+            gen_resolution = Resolution(resolution)
+            gen_aspect = AspectRatio(aspect_ratio)
+            gen_quality = Quality(quality)
+        except ValueError as exc:
+            return {"status": "error", "error": str(exc)}
+        err = _reject_relative_output_path(output_dir)
+        if err:
+            return err
+
+        if candidates is None:
+            candidates = [
+                name
+                for name, pconfig in config.providers.items()
+                if pconfig.enabled and resolve_api_key(pconfig) is not None
+            ]
+        if not candidates:
+            return {
+                "status": "error",
+                "error": "No candidates: configure a provider or pass candidates.",
+            }
+
+        # Rendered once; every candidate gets byte-identical input.
+        prompt_parts = build_prompt_parts(
+            diagram_type=diagram_type,
+            user_prompt=prompt,
+            resolution=resolution,
+            aspect_ratio=aspect_ratio,
+            design_tokens=config.design_tokens,
+            theme=theme_enum,
+        )
+        gen_config = GenerationConfig(
+            prompt=prompt_parts.text,
+            prompt_prefix=prompt_parts.prefix,
+            resolution=gen_resolution,
+            aspect_ratio=gen_aspect,
+            quality=gen_quality,
+        )
+        out_dir = Path(output_dir or config.output_directory).expanduser()
+        stamp = output_stamp()
+
+        async def run_candidate(index: int, spec: str) -> tuple[dict[str, Any], bytes | None]:
+            name, _, model_override = spec.partition(":")
+            entry: dict[str, Any] = {"candidate": spec, "provider": name}
+            pconfig = config.providers.get(name)
+            if pconfig is None or not pconfig.enabled:
+                return {**entry, "status": "skipped", "error": "disabled or not configured"}, None
+            api_key = resolve_api_key(pconfig)
+            if api_key is None:
+                return {**entry, "status": "skipped", "error": "no API key resolved"}, None
+            candidate_model = model_override or pconfig.model
+            entry["model"] = candidate_model
+            if _circuit_open(name, candidate_model):
+                return {**entry, "status": "skipped", "error": "circuit open"}, None
+
+            call_start = time.monotonic()
+            try:
+                async with provider_pool.lease(
+                    name, api_key, model=candidate_model, **pconfig.extra
+                ) as img_provider:
+                    breaker = breakers.get(name, candidate_model)
+                    outcome = None
+                    try:
+                        outcome = await run_limited(
+                            limiters.get(name, candidate_model),
+                            lambda: img_provider.generate(gen_config),
+                        )
+                    finally:
+                        breaker.record(outcome)
+            except Exception as exc:  # noqa: BLE001 - reported on the candidate
+                return {**entry, "status": "error", "error": str(exc)}, None
+            latency_ms = int((time.monotonic() - call_start) * 1000)
+
+            cost_tracker.record(
+                GenerationRecord(
+                    provider=name,
+                    model=candidate_model,
+                    diagram_type=diagram_type,
+                    resolution=resolution,
+                    aspect_ratio=aspect_ratio,
+                    **_usage_columns(outcome.usage),
+                    cost_usd=outcome.cost_usd,
+                    billing_model=outcome.billing_model.value,
+                    generation_time_ms=latency_ms - outcome.queue_wait_ms,
+                    success=outcome.success,
+                    template_used=diagram_type,
+                    error_message=outcome.error_message,
+                )
+            )
+            entry.update(
+                latency_ms=latency_ms,
+                queue_wait_ms=outcome.queue_wait_ms,
+                cost_usd=outcome.cost_usd,
+                billing_model=outcome.billing_model.value,
+            )
+            if not (outcome.success and outcome.image_data):
+                return {**entry, "status": "error", "error": outcome.error_message}, None
+
+            # The index keeps a candidate listed twice from overwriting its own image.
+            label = re.sub(r"[^a-zA-Z0-9._-]+", "-", f"{index + 1}_{name}__{candidate_model}")
+            target = _with_format_suffix(
+                out_dir / f"compare_{stamp}_{label}.png", outcome.image_data
+            )
+            await save_image(target, outcome.image_data, fsync=config.fsync_output)
+            entry.update(
+                status="success",
+                output_path=str(target),
+                dimensions=_image_dimensions(outcome.image_data),
+            )
+            return entry, outcome.image_data
+
+        outcomes = await asyncio.gather(
+            *(run_candidate(index, spec) for index, spec in enumerate(candidates))
+        )
+        results = [entry for entry, _ in outcomes]
+
+        response = {
+            "status": "success" if any(r["status"] == "success" for r in results) else "error",
+            "diagram_type": diagram_type,
+            "results": results,
+            "total_cost_usd": round(sum(r.get("cost_usd") or 0.0 for r in results), 6),
+            "wall_time_ms": int((time.monotonic() - start) * 1000),
+        }
+        tiles = [
+            (image, f"{entry['provider']}/{entry['model']}")
+            for entry, image in outcomes
+            if image is not None
+        ]
+        if make_contact_sheet and tiles:
+            sheet_path = out_dir / f"compare_{stamp}_sheet.png"
+            sheet = await asyncio.to_thread(contact_sheet, tiles, columns=grid_columns(len(tiles)))
+            await save_image(sheet_path, sheet, fsync=config.fsync_output)
+            response["contact_sheet"] = str(sheet_path)
+        return response
+
+    # --- Tools: diagram jobs ---
+
+    async def _run_job(params: dict[str, Any]) -> dict[str, Any]:
+        result: dict[str, Any] = await generate_diagram(**params)
+        return result
+
+    job_runner = JobRunner(JobStore(config.database_path), _run_job, workers=config.jobs.workers)
+
+    def _job_summary(job: StoredJob) -> dict[str, Any]:
+        summary: dict[str, Any] = {
+            "job_id": job.id,
+            "job_status": job.status.value,
+            "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if job.status == JobStatus.QUEUED:
+            summary["queue_position"] = job_runner.store.queue_position(job.id)
+        if job.status.terminal:
+            summary["result"] = job.result
+            summary["error"] = job.error_message
+        return summary
+
+    @app.tool()
+    async def submit_diagram_job(
+        prompt: str,
+        diagram_type: str = "generic",
+        provider: str = "auto",
+        model: str | None = None,
+        resolution: str | None = None,
+        aspect_ratio: str = "16:9",
+        style_reference: str | None = None,
+        output_path: str | None = None,
+        temperature: float = 1.0,
+        quality: str = "auto",
+        theme: str = "light",
+        latency_tier: str | None = None,
+        hedge: bool | None = None,
+        variants: int = 1,
+        output_format: str = "png",
+        output_compression: int | None = None,
+        deadline_ms: int | None = None,
+        idempotency_key: str | None = None,
+    ) -> dict[str, Any]:
+        """Queue a generate_diagram call and return a job id immediately.
+
+        Use this instead of generate_diagram when your tool calls may time out: the
+        generation runs in the background and survives a server restart while queued.
+        Follow up with wait_for_job (or get_job_status); the finished job's `result`
+        is exactly what generate_diagram would have returned.
+
+        Arguments are those of generate_diagram, plus:
+            idempotency_key: Any string unique to this diagram request. Resubmitting with
+                the same key returns the existing job (unless it failed or was cancelled)
+                instead of paying again. Without a key every submission queues a new job,
+                unless the server is configured with a dedupe window for identical ones.
+        """
+        err = _reject_relative_output_path(output_path)
+        if err:
+            return err
+        params = {
+            "prompt": prompt,
+            "diagram_type": diagram_type,
+            "provider": provider,
+            "model": model,
+            "resolution": resolution,
+            "aspect_ratio": aspect_ratio,
+            "style_reference": style_reference,
+            "output_path": output_path,
+            "temperature": temperature,
+            "quality": quality,
+            "theme": theme,
+            "latency_tier": latency_tier,
+            "hedge": hedge,
+            "variants": variants,
+            "output_format": output_format,
+            "output_compression": output_compression,
+            "deadline_ms": deadline_ms,
+        }
+        if idempotency_key:
+            job, created = job_runner.submit(params, f"key:{idempotency_key}")
+        else:
+            digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+            job, created = job_runner.submit(
+                params,
+                f"params:{digest}",
+                reuse_since=reuse_cutoff(config.jobs.dedupe_window_s),
+                reuse=config.jobs.dedupe_window_s > 0,
+            )
+        return {"status": "success", "deduplicated": not created, **_job_summary(job)}
+
+    @app.tool()
+    async def get_job_status(job_id: str) -> dict[str, Any]:
+        """Current state of a job from submit_diagram_job (queued|running|succeeded|failed|cancelled).
+
+        Args:
+            job_id: Id returned by submit_diagram_job
+        """
+        job = job_runner.store.get(job_id)
+        if job is None:
+            return {"status": "error", "error": f"Unknown job_id '{job_id}'"}
+        return {"status": "success", **_job_summary(job)}
+
+    @app.tool()
+    async def wait_for_job(job_id: str, timeout_s: float = 25.0) -> dict[str, Any]:
+        """Wait until a job finishes, or until timeout_s passes, and return its state.
+
+        Safe to call repeatedly: waiting never re-runs or re-bills the job. Keep
+        timeout_s below your client's tool-call timeout; it is capped by the server.
+
+        Args:
+            job_id: Id returned by submit_diagram_job
+            timeout_s: Seconds to wait before returning the still-running job
+        """
+        timeout_s = max(0.0, min(timeout_s, config.jobs.max_wait_s))
+        job = await job_runner.wait(job_id, timeout_s)
+        if job is None:
+            return {"status": "error", "error": f"Unknown job_id '{job_id}'"}
+        return {"status": "success", "timed_out": not job.status.terminal, **_job_summary(job)}
+
+    @app.tool()
+    async def cancel_job(job_id: str) -> dict[str, Any]:
+        """Cancel a queued or running job. A provider call already in flight may still be billed.
+
+        Args:
+            job_id: Id returned by submit_diagram_job
+        """
+        job = job_runner.cancel(job_id)
+        if job is None:
+            return {"status": "error", "error": f"Unknown job_id '{job_id}'"}
+        if job.status != JobStatus.CANCELLED:
+            return {
+                "status": "error",
+                "error": f"Job already finished ({job.status.value}); nothing to cancel.",
+                **_job_summary(job),
+            }
+        return {"status": "success", **_job_summary(job)}
+
     # --- Tool: edit_diagram ---
 
     @app.tool()
@@ -350,14 +1385,17 @@ def create_server(config_path: str | None = None) -> Any:
         """Edit an existing diagram based on instructions.
 
         Args:
-            image_path: Path to the existing diagram image
+            image_path: Path to the existing diagram image (png, webp or jpeg; sent to the
+                provider with the MIME type of its actual format)
             prompt: Edit instructions
             provider: Image generation provider (gemini|openai)
             resolution: Output resolution (auto-detect if not specified)
             reference_images: Additional reference image paths
-            output_path: Where to save the result
+            output_path: Where to save the result; the suffix is corrected to the format
+                the provider returned
         """
         start = time.monotonic()
+        timer = StageTimer()
 
         # Reject a relative output_path early — before any provider/API call — so a
         # misplaced-file failure is loud and cheap rather than silent and paid-for.
@@ -377,7 +1415,7 @@ def create_server(config_path: str | None = None) -> Any:
             return {"status": "error", "error": f"Provider '{provider}' not configured"}
 
         api_key = resolve_api_key(provider_config)
-        if not api_key:
+        if api_key is None:
             return {
                 "status": "error",
                 "error": f"No API key for provider '{provider}'. "
@@ -385,8 +1423,10 @@ def create_server(config_path: str | None = None) -> Any:
             }
 
         # Check provider supports editing
-        img_provider = get_provider(provider, api_key, model=provider_config.model)
-        if "edit" not in img_provider.supported_features():
+        features = provider_pool.get(
+            provider, api_key, model=provider_config.model, **provider_config.extra
+        ).supported_features()
+        if "edit" not in features:
             return {
                 "status": "error",
                 "error": f"Provider '{provider}' does not support image editing",
@@ -400,8 +1440,32 @@ def create_server(config_path: str | None = None) -> Any:
             reference_images=ref_paths,
         )
 
-        result = await img_provider.edit(input_image, gen_config)
+        if _circuit_open(provider, provider_config.model):
+            return {
+                "status": "error",
+                "error": f"Provider '{provider}' is temporarily unavailable (circuit open)",
+                "circuit": breakers.get(provider, provider_config.model).snapshot(),
+            }
+        breaker = breakers.get(provider, provider_config.model)
+        result = None
+        call_start = time.monotonic()
+        try:
+            async with provider_pool.lease(
+                provider, api_key, model=provider_config.model, **provider_config.extra
+            ) as img_provider:
+                result = await run_limited(
+                    limiters.get(provider, provider_config.model),
+                    lambda: img_provider.edit(input_image, gen_config),
+                )
+        finally:
+            breaker.record(result)
         elapsed_ms = int((time.monotonic() - start) * 1000)
+        timer.add("queue_wait_ms", result.queue_wait_ms)
+        timer.add(
+            "network_ms",
+            (time.monotonic() - call_start) * 1000 - result.queue_wait_ms - result.decode_ms,
+        )
+        timer.add("decode_ms", result.decode_ms)
 
         # Save result
         saved_path = None
@@ -409,35 +1473,38 @@ def create_server(config_path: str | None = None) -> Any:
             if output_path:
                 save_to = Path(output_path).expanduser()
             else:
-                output_dir = Path(config.output_directory).expanduser()
-                output_dir.mkdir(parents=True, exist_ok=True)
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                save_to = output_dir / f"edit_{timestamp}.png"
+                save_to = Path(config.output_directory).expanduser() / f"edit_{output_stamp()}.png"
 
-            save_to.parent.mkdir(parents=True, exist_ok=True)
-            save_to.write_bytes(result.image_data)
+            save_to = _with_format_suffix(save_to, result.image_data)
+            with timer.stage("disk_write_ms"):
+                await save_image(save_to, result.image_data, fsync=config.fsync_output)
             saved_path = str(save_to)
 
         # Track cost
-        cost_tracker.record(
-            GenerationRecord(
-                provider=provider,
-                model=provider_config.model,
-                diagram_type="edit",
-                resolution=resolution or "2K",
-                cost_usd=result.cost_usd,
-                billing_model=result.billing_model.value,
-                generation_time_ms=elapsed_ms,
-                success=result.success,
-                output_path=saved_path,
-                error_message=result.error_message,
-            )
+        record = GenerationRecord(
+            provider=provider,
+            model=provider_config.model,
+            diagram_type="edit",
+            resolution=resolution or "2K",
+            **_usage_columns(result.usage),
+            cost_usd=result.cost_usd,
+            billing_model=result.billing_model.value,
+            generation_time_ms=elapsed_ms,
+            success=result.success,
+            output_path=saved_path,
+            error_message=result.error_message,
         )
+        with timer.stage("ledger_write_ms"):
+            cost_tracker.record(record)
+        timings = timer.as_dict()
+        cost_tracker.update_timings([record.id], timings)
 
         response = _serialize(result)
         response["status"] = "success" if result.success else "error"
-        if saved_path:
+        response["timings"] = timings
+        if saved_path and result.image_data:
             response["output_path"] = saved_path
+            response["dimensions"] = _image_dimensions(result.image_data)
         return response
 
     # --- Tool: list_templates ---
@@ -463,6 +1530,246 @@ def create_server(config_path: str | None = None) -> Any:
             "count": len(templates),
         }
 
+    # --- Tools: submit_batch / collect_batch ---
+
+    def _unknown_batch(batch_id: str) -> dict[str, Any]:
+        return {"status": "error", "error": f"Unknown batch: {batch_id}"}
+
+    def _batch_summary(stored: StoredBatch) -> dict[str, Any]:
+        return {
+            "batch_id": stored.id,
+            "provider": stored.provider,
+            "model": stored.model,
+            "provider_batch_id": stored.job.batch_id,
+            "batch_status": stored.job.status.value,
+            "request_count": stored.job.request_count,
+            "completed_count": stored.job.completed_count,
+            "failed_count": stored.job.failed_count,
+            "submitted_at": stored.created_at.isoformat(),
+        }
+
+    def _batch_being_collected(stored: StoredBatch) -> dict[str, Any]:
+        return {
+            "status": "pending",
+            **_batch_summary(stored),
+            "message": "Another call is saving this batch's results; call again shortly.",
+        }
+
+    @app.tool()
+    async def submit_batch(
+        items: list[dict[str, Any]],
+        provider: str = "openai",
+        model: str | None = None,
+        resolution: str = "2K",
+        aspect_ratio: str = "16:9",
+        quality: str = "auto",
+        theme: str = "light",
+        output_dir: str | None = None,
+    ) -> dict[str, Any]:
+        """Submit many diagrams as one provider batch job — about half price, not interactive.
+
+        Batches complete within 24 hours and do not count against interactive rate
+        limits. Use for bulk regeneration; call collect_batch with the returned
+        batch_id to check progress and save the images once it completes.
+
+        Args:
+            items: Diagrams to generate, each {"prompt": str, "diagram_type": str (default
+                generic), "output_path": absolute path (default <output_dir>/<batch>_<n>.png)}
+            provider: Batch-capable provider (openai|gemini|local)
+            model: Model override (default: the provider's configured model)
+            resolution: Output resolution (1K|2K|4K)
+            aspect_ratio: Output aspect ratio (16:9|1:1|9:16|4:3)
+            quality: OpenAI quality tier (low|medium|high|auto)
+            theme: Background theme (light|dark)
+            output_dir: Directory for items without an output_path (default: configured output directory)
+        """
+        if not items:
+            return {"status": "error", "error": "items must contain at least one diagram"}
+        try:
+            theme_enum = Theme(theme.lower())
+        except ValueError:
+            return {
+                "status": "error",
+                "error": f"Invalid theme '{theme}'. Use 'light' (default) or 'dark'.",
+            }
+        err = _reject_relative_output_path(output_dir)
+        if err:
+            return err
+        for item in items:
+            if not item.get("prompt"):
+                return {"status": "error", "error": "every item needs a non-empty 'prompt'"}
+            err = _reject_relative_output_path(item.get("output_path"))
+            if err:
+                return err
+
+        provider_config = config.providers.get(provider)
+        if not provider_config or not provider_config.enabled:
+            return {
+                "status": "error",
+                "error": f"Provider '{provider}' is disabled or not configured",
+            }
+        api_key = resolve_api_key(provider_config)
+        if api_key is None:
+            return {
+                "status": "error",
+                "error": f"No API key for provider '{provider}'. "
+                f"Set {provider_config.api_key_env} environment variable.",
+            }
+        batch_model = model or provider_config.model
+        features = provider_pool.get(
+            provider, api_key, model=batch_model, **provider_config.extra
+        ).supported_features()
+        if "batch" not in features:
+            return {
+                "status": "error",
+                "error": f"Provider '{provider}' does not support batch mode",
+            }
+
+        default_dir = Path(output_dir or config.output_directory).expanduser()
+        stamp = output_stamp()
+        requests: list[BatchRequest] = []
+        batch_items: list[BatchItem] = []
+        for index, item in enumerate(items, start=1):
+            diagram_type = item.get("diagram_type", "generic")
+            full_prompt = build_prompt(
+                diagram_type=diagram_type,
+                user_prompt=item["prompt"],
+                resolution=resolution,
+                aspect_ratio=aspect_ratio,
+                design_tokens=config.design_tokens,
+                theme=theme_enum,
+            )
+            custom_id = f"item-{index}"
+            requests.append(
+                BatchRequest(
+                    custom_id=custom_id,
+                    config=GenerationConfig(
+                        prompt=full_prompt,
+                        resolution=Resolution(resolution),
+                        aspect_ratio=AspectRatio(aspect_ratio),
+                        quality=Quality(quality),
+                    ),
+                )
+            )
+            target = item.get("output_path") or default_dir / f"batch_{stamp}_{index}.png"
+            batch_items.append(
+                BatchItem(
+                    custom_id=custom_id,
+                    output_path=str(Path(target).expanduser()),
+                    diagram_type=diagram_type,
+                    resolution=resolution,
+                    aspect_ratio=aspect_ratio,
+                )
+            )
+
+        try:
+            async with provider_pool.lease(
+                provider, api_key, model=batch_model, **provider_config.extra
+            ) as img_provider:
+                job = await img_provider.submit_batch(requests)
+        except Exception as e:  # noqa: BLE001 - reported to the caller
+            return {"status": "error", "error": f"Batch submission to '{provider}' failed: {e}"}
+
+        batch_id = batch_store.create(provider, batch_model, job, batch_items)
+        created = batch_store.get(batch_id)
+        if created is None:
+            return _unknown_batch(batch_id)
+        return {
+            "status": "success",
+            **_batch_summary(created),
+            "output_paths": [item.output_path for item in batch_items],
+        }
+
+    @app.tool()
+    async def collect_batch(batch_id: str) -> dict[str, Any]:
+        """Check a submitted batch and, once complete, save its images and record their cost.
+
+        Returns status "pending" while the provider is still working; call again later.
+        Collecting an already-collected batch returns the stored outcome.
+
+        Args:
+            batch_id: The batch_id returned by submit_batch
+        """
+        stored = batch_store.get(batch_id)
+        if stored is None:
+            return _unknown_batch(batch_id)
+        if stored.collected_at is None:
+            provider_config = config.providers.get(stored.provider)
+            api_key = resolve_api_key(provider_config) if provider_config else None
+            if provider_config is None or api_key is None:
+                return {
+                    "status": "error",
+                    "error": f"No API key available for provider '{stored.provider}'",
+                }
+            try:
+                async with provider_pool.lease(
+                    stored.provider, api_key, model=stored.model, **provider_config.extra
+                ) as img_provider:
+                    job = await img_provider.poll_batch(stored.job)
+                    batch_store.update_job(batch_id, job)
+                    if not job.status.terminal:
+                        stored.job = job
+                        return {"status": "pending", **_batch_summary(stored)}
+                    if not batch_store.claim(batch_id):
+                        return _batch_being_collected(stored)
+                    try:
+                        results = await img_provider.fetch_batch(job)
+                    except Exception:
+                        batch_store.release(batch_id)
+                        raise
+            except Exception as e:  # noqa: BLE001 - reported to the caller
+                return {"status": "error", "error": f"Could not collect batch {batch_id}: {e}"}
+
+            turnaround_ms = int((datetime.now(UTC) - stored.created_at).total_seconds() * 1000)
+            for item in stored.items:
+                result = results.get(item.custom_id)
+                if result is not None and result.success and result.image_data:
+                    await save_image(item.output_path, result.image_data, fsync=config.fsync_output)
+                    item.success, item.cost_usd = True, result.cost_usd
+                else:
+                    item.success, item.cost_usd = False, 0.0
+                    item.error_message = (
+                        result.error_message if result else f"batch {job.status.value}"
+                    )
+                batch_store.record_item(batch_id, item)
+                cost_tracker.record(
+                    GenerationRecord(
+                        provider=stored.provider,
+                        model=stored.model,
+                        diagram_type=item.diagram_type,
+                        resolution=item.resolution,
+                        aspect_ratio=item.aspect_ratio,
+                        **_usage_columns(result.usage if result and result.success else None),
+                        cost_usd=item.cost_usd,
+                        billing_model=result.billing_model.value if result else "per_image",
+                        generation_time_ms=turnaround_ms,
+                        success=item.success,
+                        output_path=item.output_path if item.success else None,
+                        template_used=item.diagram_type,
+                        error_message=item.error_message,
+                    )
+                )
+            stored = batch_store.get(batch_id)
+            if stored is None:
+                return _unknown_batch(batch_id)
+        elif any(item.success is None for item in stored.items):
+            return _batch_being_collected(stored)
+
+        return {
+            "status": "success",
+            **_batch_summary(stored),
+            "collected_at": stored.collected_at.isoformat() if stored.collected_at else None,
+            "total_cost_usd": round(sum(i.cost_usd or 0.0 for i in stored.items), 6),
+            "items": [
+                {
+                    "output_path": item.output_path if item.success else None,
+                    "success": item.success,
+                    "error": item.error_message,
+                }
+                for item in stored.items
+            ],
+        }
+
     # --- Tool: list_providers ---
 
     @app.tool()
@@ -471,11 +1778,11 @@ def create_server(config_path: str | None = None) -> Any:
         providers_info = []
         for name, pconfig in config.providers.items():
             api_key = resolve_api_key(pconfig)
-            has_key = bool(api_key)
+            has_key = api_key is not None
             features = []
-            if has_key and name in PROVIDER_MAP:
+            if api_key is not None and name in PROVIDER_MAP:
                 try:
-                    p = get_provider(name, api_key, model=pconfig.model)
+                    p = provider_pool.get(name, api_key, model=pconfig.model, **pconfig.extra)
                     features = sorted(p.supported_features())
                     pricing = _serialize(p.get_pricing())
                 except Exception:
@@ -491,12 +1798,20 @@ def create_server(config_path: str | None = None) -> Any:
                 "api_key_env": pconfig.api_key_env,
                 "features": features,
                 "pricing": pricing,
+                "concurrency": limiters.get(name, pconfig.model).snapshot(),
+                "circuit": breakers.get(name, pconfig.model).snapshot(),
             })
 
         return {
             "status": "success",
             "providers": providers_info,
             "default_provider": config.default_provider.value,
+            # Everything installed (built-in or via entry points), whether configured or not.
+            # import_ms is None until a provider's module is first used.
+            "registered": {
+                spec.name: {"source": spec.source, "import_ms": spec.import_ms}
+                for spec in PROVIDER_MAP.specs()
+            },
         }
 
     # --- Tool: list_styles ---
@@ -531,7 +1846,9 @@ def create_server(config_path: str | None = None) -> Any:
 
         Args:
             days: Number of days to report on (default: 30)
-            group_by: Group results by 'provider', 'diagram_type', or 'day'
+            group_by: Group results by 'provider', 'diagram_type', or 'day'. Each group
+                includes average input, cached-input and output tokens; the report also
+                buckets latency by input-token count.
         """
         report = cost_tracker.get_usage_report(days=days, group_by=group_by)
         return {
@@ -557,14 +1874,18 @@ def create_server(config_path: str | None = None) -> Any:
         provider_config = config.providers.get(provider)
         if not provider_config:
             return {"status": "error", "error": f"Unknown provider: {provider}"}
+        if provider_config.api_key_env is None:
+            return {"status": "error", "error": f"Provider '{provider}' does not use an API key"}
 
         # Set the environment variable
         os.environ[provider_config.api_key_env] = api_key
 
         # Verify connectivity
         try:
-            img_provider = get_provider(provider, api_key, model=provider_config.model)
-            health = await img_provider.health_check()
+            async with provider_pool.lease(
+                provider, api_key, model=provider_config.model, **provider_config.extra
+            ) as img_provider:
+                health = await img_provider.health_check()
             return {
                 "status": "success" if health.available else "warning",
                 "message": f"API key set for {provider} ({provider_config.api_key_env})",
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import re
+from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -16,6 +18,38 @@ TEMPLATES_DIR = Path(__file__).parent / "templates"
 
 _cached_tokens: GlobalDesignTokens | None = None
 
+# Placeholders whose value depends only on the template and the theme. Paragraphs
+# that use nothing else go into the cacheable prompt prefix.
+_STATIC_PLACEHOLDERS = frozenset(
+    {"global_style_block", "style_defaults_block", "color_system_block"}
+)
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+@dataclass(frozen=True)
+class PromptParts:
+    """A prompt as a byte-stable ``prefix`` plus the call-specific ``dynamic`` tail.
+
+    Prompt caches (OpenAI automatic caching, Gemini cached content) match on the
+    leading bytes of a request, so anything that varies per call must come after
+    ``prefix``.
+    """
+
+    prefix: str
+    dynamic: str
+
+    @property
+    def text(self) -> str:
+        if not self.dynamic:
+            return self.prefix
+        return f"{self.prefix}\n\n{self.dynamic}"
+
+    def with_preamble(self, preamble: str) -> PromptParts:
+        """Insert call-specific text at the start of the dynamic part."""
+        dynamic = f"{preamble}\n\n{self.dynamic}" if self.dynamic else preamble
+        return PromptParts(prefix=self.prefix, dynamic=dynamic)
+
 
 def _get_default_tokens() -> GlobalDesignTokens:
     """Load and cache the default design tokens."""
@@ -108,18 +142,12 @@ def load_all_templates() -> dict[str, DiagramTemplate]:
     return templates
 
 
-def render_prompt(
+def _template_variables(
     template: DiagramTemplate,
-    user_variables: dict[str, str] | None = None,
-    extra_instructions: str = "",
-    design_tokens: GlobalDesignTokens | None = None,
-) -> str:
-    """Render a template's prompt with user-provided variables.
-
-    Substitutes {variable_name} placeholders in the prompt_template
-    with values from user_variables, template defaults, and style defaults.
-    """
-    tokens = design_tokens or _get_default_tokens()
+    user_variables: dict[str, str] | None,
+    tokens: GlobalDesignTokens,
+) -> dict[str, str]:
+    """Placeholder values for a template: user values over template and style defaults."""
     variables = dict(template.variables)
     if user_variables:
         variables.update(user_variables)
@@ -163,10 +191,32 @@ def render_prompt(
         ]
         variables["legend_block"] = "\n".join(legend_lines)
 
-    # Render template
-    prompt = template.prompt_template
+    return variables
+
+
+def _substitute(text: str, variables: dict[str, str]) -> str:
     for key, value in variables.items():
-        prompt = prompt.replace(f"{{{key}}}", str(value))
+        text = text.replace(f"{{{key}}}", str(value))
+    return text
+
+
+def render_prompt(
+    template: DiagramTemplate,
+    user_variables: dict[str, str] | None = None,
+    extra_instructions: str = "",
+    design_tokens: GlobalDesignTokens | None = None,
+) -> str:
+    """Render a template's prompt with user-provided variables.
+
+    Substitutes {variable_name} placeholders in the prompt_template
+    with values from user_variables, template defaults, and style defaults.
+    Paragraphs keep their template order; see ``render_prompt_parts`` for the
+    cache-friendly ordering used when building provider prompts.
+    """
+    tokens = design_tokens or _get_default_tokens()
+    prompt = _substitute(
+        template.prompt_template, _template_variables(template, user_variables, tokens)
+    )
 
     # Append extra instructions
     if extra_instructions:
@@ -175,7 +225,33 @@ def render_prompt(
     return prompt
 
 
-def build_prompt(
+def render_prompt_parts(
+    template: DiagramTemplate,
+    user_variables: dict[str, str] | None = None,
+    extra_instructions: str = "",
+    design_tokens: GlobalDesignTokens | None = None,
+) -> PromptParts:
+    """Render a template as a static prefix followed by the per-call paragraphs.
+
+    A paragraph (blank-line separated) belongs to the prefix when every placeholder
+    in it is one of ``_STATIC_PLACEHOLDERS``; all other paragraphs, in template order,
+    and then ``extra_instructions`` form the dynamic part.
+    """
+    tokens = design_tokens or _get_default_tokens()
+    variables = _template_variables(template, user_variables, tokens)
+
+    static: list[str] = []
+    dynamic: list[str] = []
+    for paragraph in _PARAGRAPH_BREAK.split(template.prompt_template.strip()):
+        names = set(_PLACEHOLDER.findall(paragraph))
+        target = static if names <= _STATIC_PLACEHOLDERS else dynamic
+        target.append(_substitute(paragraph, variables))
+    if extra_instructions:
+        dynamic.append(extra_instructions)
+    return PromptParts(prefix="\n\n".join(static), dynamic="\n\n".join(dynamic))
+
+
+def build_prompt_parts(
     diagram_type: str,
     user_prompt: str,
     user_variables: dict[str, str] | None = None,
@@ -183,16 +259,14 @@ def build_prompt(
     aspect_ratio: str = "16:9",
     design_tokens: GlobalDesignTokens | None = None,
     theme: Theme | str | None = None,
-) -> str:
-    """High-level prompt builder: loads template, merges user content, returns final prompt.
-
-    Global design tokens are injected as a preamble on all prompts.
-    Templates that include {global_style_block} control placement; others get it prepended.
-    If the diagram_type template doesn't exist or is 'generic', uses user_prompt directly.
-
-    `theme` (light|dark) selects the background theme for this call, overriding the
-    configured default. When None, the design_tokens' configured theme is used
-    (which itself defaults to light).
+    template: DiagramTemplate | None = None,
+) -> PromptParts:
+    """``build_prompt``, split into the template/theme prefix and the per-call rest.
+
+    The prefix depends only on ``diagram_type`` and the resolved design tokens, so
+    it is byte-identical across calls and can be served from a provider's prompt
+    cache. Resolution, aspect ratio, user variables and ``user_prompt`` are all in
+    ``dynamic``. Pass ``template`` when the caller has already loaded it.
     """
     tokens = design_tokens or _get_default_tokens()
     # Resolve tokens for the requested (or configured) theme — light is the default.
@@ -200,14 +274,15 @@ def build_prompt(
     global_block = build_global_style_block(tokens)
 
     try:
-        template = load_template(diagram_type)
+        template = template or load_template(diagram_type)
     except FileNotFoundError:
         # Fall back to generic formatting with global tokens prepended
-        return (
-            f"{global_block}\n\n"
-            f"{user_prompt}\n\n"
-            f"All text crystal clear and perfectly legible. Enterprise presentation quality.\n"
-            f"{aspect_ratio} aspect ratio. {resolution} resolution."
+        return PromptParts(
+            prefix=(
+                f"{global_block}\n\n"
+                f"All text crystal clear and perfectly legible. Enterprise presentation quality."
+            ),
+            dynamic=f"{user_prompt}\n\n{aspect_ratio} aspect ratio. {resolution} resolution.",
         )
 
     # Merge user variables
@@ -215,7 +290,7 @@ def build_prompt(
     vars_dict.setdefault("resolution", resolution)
     vars_dict.setdefault("aspect_ratio", aspect_ratio)
 
-    rendered = render_prompt(
+    parts = render_prompt_parts(
         template,
         vars_dict,
         extra_instructions=user_prompt if user_prompt else "",
@@ -225,5 +300,39 @@ def build_prompt(
     # If the template already consumed {global_style_block}, it's embedded inline.
     # Otherwise prepend it so every prompt gets the global standards.
     if "{global_style_block}" in template.prompt_template:
-        return rendered
-    return f"{global_block}\n\n{rendered}"
+        return parts
+    prefix = f"{global_block}\n\n{parts.prefix}" if parts.prefix else global_block
+    return PromptParts(prefix=prefix, dynamic=parts.dynamic)
+
+
+def build_prompt(
+    diagram_type: str,
+    user_prompt: str,
+    user_variables: dict[str, str] | None = None,
+    resolution: str = "2K",
+    aspect_ratio: str = "16:9",
+    design_tokens: GlobalDesignTokens | None = None,
+    theme: Theme | str | None = None,
+) -> str:
+    """High-level prompt builder: loads template, merges user content, returns final prompt.
+
+    Global design tokens are injected as a preamble on all prompts.
+    Templates that include {global_style_block} control placement; others get it prepended.
+    If the diagram_type template doesn't exist or is 'generic', uses user_prompt directly.
+
+    Static template paragraphs come first and everything call-specific last (see
+    ``build_prompt_parts``), so providers can reuse the cached prefix.
+
+    `theme` (light|dark) selects the background theme for this call, overriding the
+    configured default. When None, the design_tokens' configured theme is used
+    (which itself defaults to light).
+    """
+    return build_prompt_parts(
+        diagram_type,
+        user_prompt,
+        user_variables=user_variables,
+        resolution=resolution,
+        aspect_ratio=aspect_ratio,
+        design_tokens=design_tokens,
+        theme=theme,
+    ).text
@@ -0,0 +1,52 @@
+"""Per-stage wall-clock timing for one generation request.
+
+``generation_time_ms`` says how long a call took, not where the time went. A
+``StageTimer`` accumulates named stages (template load, prompt build, network,
+disk write, ...) and reports them as whole milliseconds; the same dict is
+returned to the caller as ``timings`` and stored on the cost-ledger row.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# Stages in the order a request passes through them; used to order reports.
+STAGES = (
+    "template_load_ms",
+    "style_scan_ms",
+    "prompt_build_ms",
+    "queue_wait_ms",
+    "network_ms",
+    "decode_ms",
+    "fallback_ms",
+    "disk_write_ms",
+    "ledger_write_ms",
+    "total_ms",
+)
+
+
+class StageTimer:
+    """Accumulates elapsed time per stage; a stage timed twice is summed."""
+
+    def __init__(self) -> None:
+        self._start = time.monotonic()
+        self._elapsed: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, (time.monotonic() - started) * 1000)
+
+    def add(self, name: str, ms: float) -> None:
+        self._elapsed[name] = self._elapsed.get(name, 0.0) + max(0.0, ms)
+
+    def as_dict(self) -> dict[str, int]:
+        """Every stage seen so far plus ``total_ms`` since the timer was created."""
+        result = {name: round(ms) for name, ms in self._elapsed.items()}
+        result["total_ms"] = round((time.monotonic() - self._start) * 1000)
+        return result
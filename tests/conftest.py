@@ -2,21 +2,29 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import tempfile
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from pathlib import Path
-from unittest.mock import AsyncMock
+from typing import Any
+from unittest.mock import patch
 
 import pytest
+import yaml
 
+from diagram_forge.cost_tracker import CostTracker
 from diagram_forge.models import (
     BillingModel,
     GenerationConfig,
     GenerationResult,
-    ProviderHealth,
     PricingInfo,
+    ProviderHealth,
     Resolution,
 )
 from diagram_forge.providers.base import BaseImageProvider
+from diagram_forge.server import create_server
 
 
 class MockProvider(BaseImageProvider):
@@ -152,3 +160,149 @@ def generation_config():
 def tiny_png():
     """Return a minimal valid PNG image."""
     return TINY_PNG
+
+
+# PNG signature plus filler: enough for format detection, not a decodable image.
+STUB_PNG = b"\x89PNG\r\n\x1a\n-stub"
+
+# Environment variable every provider in a ``make_server`` config reads its key from.
+STUB_API_KEY_ENV = "DIAGRAM_FORGE_TEST_KEY"
+
+
+def unwrap(raw):
+    """FastMCP returns content blocks; normalize to the tool's dict payload."""
+    if isinstance(raw, tuple):
+        raw = raw[-1]
+    if isinstance(raw, list) and raw and hasattr(raw[0], "text"):
+        raw = json.loads(raw[0].text)
+    return raw
+
+
+async def call_tool(app, name: str, args: dict, providers: Callable | None = None) -> dict:
+    """Call an MCP tool, with ``providers`` standing in for ``get_provider`` if given."""
+    if providers is None:
+        return unwrap(await app.call_tool(name, args))
+    with patch("diagram_forge.server.get_provider", providers):
+        return unwrap(await app.call_tool(name, args))
+
+
+@dataclass
+class StubCall:
+    """One ``generate`` call made to a stub provider."""
+
+    provider: str
+    model: str | None
+    config: GenerationConfig
+
+
+Respond = Callable[[str, str | None, GenerationConfig], Awaitable[GenerationResult]]
+
+
+class StubProviderFactory:
+    """Stands in for ``get_provider`` in server tests.
+
+    Every provider it hands out sleeps ``delays[name]`` seconds, then returns
+    ``respond(name, model, config)`` if given, a failure with ``failing[name]`` as its
+    message, or a one-image success costing ``cost_usd``. ``estimate_cost`` is what
+    the server charges for a call cancelled after it was sent. Calls, cancellations
+    and peak concurrency are recorded for assertions.
+    """
+
+    def __init__(
+        self,
+        *,
+        delays: dict[str, float] | None = None,
+        failing: dict[str, str] | None = None,
+        respond: Respond | None = None,
+        cost_usd: float = 0.01,
+        estimate_cost: float = 0.0,
+    ):
+        self.delays = delays or {}
+        self.failing = failing or {}
+        self.respond = respond
+        self.cost_usd = cost_usd
+        self.estimate = estimate_cost
+        self.calls: list[StubCall] = []
+        self.cancelled: list[str] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    def __call__(self, name: str, api_key: str, model: str | None = None, **_extra: Any):
+        return _StubProvider(self, name, model)
+
+
+class _StubProvider:
+    def __init__(self, factory: StubProviderFactory, name: str, model: str | None):
+        self.factory = factory
+        self.name = name
+        self.model = model
+
+    async def generate(self, config: GenerationConfig) -> GenerationResult:
+        factory = self.factory
+        factory.calls.append(StubCall(self.name, self.model, config))
+        factory.in_flight += 1
+        factory.peak = max(factory.peak, factory.in_flight)
+        try:
+            await asyncio.sleep(factory.delays.get(self.name, 0.0))
+        except asyncio.CancelledError:
+            factory.cancelled.append(self.name)
+            raise
+        finally:
+            factory.in_flight -= 1
+        if factory.respond is not None:
+            return await factory.respond(self.name, self.model, config)
+        if self.name in factory.failing:
+            return GenerationResult(
+                success=False, error_message=factory.failing[self.name], model_used=self.model
+            )
+        return GenerationResult(
+            success=True,
+            image_data=STUB_PNG,
+            model_used=self.model,
+            cost_usd=factory.cost_usd,
+            billing_model=BillingModel.PER_IMAGE,
+        )
+
+    def estimate_cost(self, _config: GenerationConfig) -> float:
+        return self.factory.estimate
+
+
+@pytest.fixture
+def stub_factory():
+    """Build a ``StubProviderFactory``: ``stub_factory(delays=..., failing=...)``."""
+    return StubProviderFactory
+
+
+@pytest.fixture
+def make_server(tmp_path, monkeypatch):
+    """Build the MCP server from a config in ``tmp_path``; returns ``(app, tracker)``.
+
+    ``providers`` maps provider name to model, the fallback chain defaults to their
+    order, and any other config key can be passed through. CostTracker is redirected
+    at tmp_path: the generation path records every attempt, so without this a test
+    run writes fabricated rows (successes, and costs that were never charged) into the
+    real usage ledger at ~/.diagram-forge/usage.db.
+    """
+    monkeypatch.setenv(STUB_API_KEY_ENV, "test-key")
+
+    def build(providers: dict[str, str] | None = None, **settings: Any):
+        providers = providers or {"openai": "gpt-image-2"}
+        cfg = {
+            "default_provider": next(iter(providers)),
+            "provider_fallback_chain": list(providers),
+            "output_directory": str(tmp_path / "out"),
+            "styles_directory": str(tmp_path / "styles"),
+            "database_path": str(tmp_path / "usage.db"),
+            "providers": {
+                name: {"model": model, "api_key_env": STUB_API_KEY_ENV}
+                for name, model in providers.items()
+            },
+            **settings,
+        }
+        path = tmp_path / "config.yaml"
+        path.write_text(yaml.dump(cfg))
+        tracker = CostTracker(tmp_path / "usage.db")
+        with patch("diagram_forge.server.CostTracker", return_value=tracker):
+            return create_server(str(path)), tracker
+
+    return build
@@ -0,0 +1,260 @@
+"""Provider batch mode and the submit_batch / collect_batch server workflow."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import yaml
+
+from diagram_forge.batch_store import BatchStore
+from diagram_forge.cost_tracker import CostTracker
+from diagram_forge.models import BatchRequest, BatchStatus, GenerationConfig
+from diagram_forge.providers.local import LocalProvider
+from diagram_forge.providers.openai_provider import OpenAIProvider
+from diagram_forge.server import create_server
+from tests.conftest import unwrap
+
+
+def _requests(n: int) -> list[BatchRequest]:
+    return [
+        BatchRequest(custom_id=f"item-{i}", config=GenerationConfig(prompt=f"diagram {i}"))
+        for i in range(n)
+    ]
+
+
+class TestLocalBatch:
+    @pytest.mark.asyncio
+    async def test_submit_poll_fetch(self):
+        p = LocalProvider()
+        job = await p.submit_batch(_requests(3))
+        assert job.status == BatchStatus.SUBMITTED
+        job = await p.poll_batch(job)
+        assert job.status == BatchStatus.COMPLETED
+        results = await p.fetch_batch(job)
+        assert sorted(results) == ["item-0", "item-1", "item-2"]
+        assert all(r.success for r in results.values())
+        # Same prompt renders the same image as the interactive path.
+        direct = await p.generate(GenerationConfig(prompt="diagram 0"))
+        assert results["item-0"].image_data == direct.image_data
+
+    @pytest.mark.asyncio
+    async def test_running_until_delay_elapses(self):
+        p = LocalProvider(batch_delay_s=3600)
+        job = await p.poll_batch(await p.submit_batch(_requests(1)))
+        assert job.status == BatchStatus.RUNNING
+        assert not job.status.terminal
+
+
+class TestOpenAIBatch:
+    @pytest.mark.asyncio
+    async def test_submit_uploads_jsonl_for_images_endpoint(self):
+        p = OpenAIProvider(api_key="t")
+        client = MagicMock()
+        client.files.create = AsyncMock(return_value=SimpleNamespace(id="file-in"))
+        client.batches.create = AsyncMock(
+            return_value=SimpleNamespace(id="batch_abc", status="validating", request_counts=None)
+        )
+        p._client = client
+
+        job = await p.submit_batch(_requests(2))
+
+        assert job.batch_id == "batch_abc"
+        assert job.status == BatchStatus.SUBMITTED
+        assert client.batches.create.await_args.kwargs["endpoint"] == "/v1/images/generations"
+        _, payload, _ = client.files.create.await_args.kwargs["file"]
+        lines = [json.loads(line) for line in payload.decode().splitlines()]
+        assert [line["custom_id"] for line in lines] == ["item-0", "item-1"]
+        assert lines[0]["body"]["prompt"] == "diagram 0"
+        # Batch pricing is half the interactive estimate.
+        interactive = p._estimate_cost(p._resolve_size(GenerationConfig(prompt="x")), "auto")
+        assert job.provider_data["costs"]["item-0"] == pytest.approx(interactive / 2)
+
+    @pytest.mark.asyncio
+    async def test_fetch_decodes_output_and_errors(self):
+        p = OpenAIProvider(api_key="t")
+        output = "\n".join(
+            [
+                json.dumps(
+                    {
+                        "custom_id": "item-0",
+                        "response": {
+                            "status_code": 200,
+                            "body": {"data": [{"b64_json": base64.b64encode(b"img").decode()}]},
+                        },
+                        "error": None,
+                    }
+                ),
+                json.dumps(
+                    {
+                        "custom_id": "item-1",
+                        "response": {
+                            "status_code": 400,
+                            "body": {"error": {"message": "content_policy_violation"}},
+                        },
+                        "error": None,
+                    }
+                ),
+            ]
+        )
+        client = MagicMock()
+        client.files.content = AsyncMock(return_value=SimpleNamespace(text=output))
+        p._client = client
+        job = p._apply_batch_state(
+            (await LocalProvider().submit_batch(_requests(2))),
+            SimpleNamespace(
+                status="completed",
+                request_counts=SimpleNamespace(completed=1, failed=1),
+                output_file_id="file-out",
+                error_file_id=None,
+            ),
+        )
+        job.provider_data["costs"] = {"item-0": 0.02, "item-1": 0.02}
+
+        results = await p.fetch_batch(job)
+
+        assert results["item-0"].success
+        assert results["item-0"].image_data == b"img"
+        assert results["item-0"].cost_usd == 0.02
+        assert not results["item-1"].success
+        assert "content_policy_violation" in results["item-1"].error_message
+
+
+def _server(tmp_path, batch_delay_s: float = 0.0):
+    cfg = {
+        "default_provider": "local",
+        "provider_fallback_chain": ["local"],
+        "output_directory": str(tmp_path / "out"),
+        "styles_directory": str(tmp_path / "styles"),
+        "database_path": str(tmp_path / "usage.db"),
+        "providers": {
+            "local": {"model": "local-placeholder", "extra": {"batch_delay_s": batch_delay_s}},
+        },
+    }
+    cfg_path = tmp_path / "config.yaml"
+    cfg_path.write_text(yaml.dump(cfg))
+    tracker = CostTracker(tmp_path / "usage.db")
+    with patch("diagram_forge.server.CostTracker", return_value=tracker):
+        return create_server(str(cfg_path)), tracker
+
+
+@pytest.mark.asyncio
+async def test_submit_and_collect_batch(tmp_path):
+    app, tracker = _server(tmp_path)
+    explicit = tmp_path / "named.png"
+
+    submitted = unwrap(
+        await app.call_tool(
+            "submit_batch",
+            {
+                "provider": "local",
+                "items": [
+                    {"prompt": "a box", "output_path": str(explicit)},
+                    {"prompt": "two boxes", "diagram_type": "architecture"},
+                ],
+            },
+        )
+    )
+    assert submitted["status"] == "success"
+    assert submitted["request_count"] == 2
+    assert submitted["output_paths"][0] == str(explicit)
+
+    collected = unwrap(await app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}))
+    assert collected["status"] == "success"
+    assert collected["batch_status"] == "completed"
+    assert [item["success"] for item in collected["items"]] == [True, True]
+    assert explicit.exists()
+    assert tracker.get_usage_report(days=1).total_generations == 2
+
+    # Collecting again returns the stored outcome without re-recording cost.
+    again = unwrap(await app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}))
+    assert again["collected_at"] == collected["collected_at"]
+    assert tracker.get_usage_report(days=1).total_generations == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_collections_save_and_record_once(tmp_path):
+    app, tracker = _server(tmp_path)
+    submitted = unwrap(
+        await app.call_tool("submit_batch", {"provider": "local", "items": [{"prompt": "a box"}]})
+    )
+    fetch = LocalProvider.fetch_batch
+    fetches = 0
+
+    async def slow_fetch(self, job):
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0.05)
+        return await fetch(self, job)
+
+    with patch.object(LocalProvider, "fetch_batch", slow_fetch):
+        first, second = await asyncio.gather(
+            app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}),
+            app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}),
+        )
+
+    statuses = sorted(unwrap(r)["status"] for r in (first, second))
+    assert statuses == ["pending", "success"]
+    assert fetches == 1
+    assert tracker.get_usage_report(days=1).total_generations == 1
+    again = unwrap(await app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}))
+    assert again["status"] == "success"
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_leaves_the_batch_collectable(tmp_path):
+    app, tracker = _server(tmp_path)
+    submitted = unwrap(
+        await app.call_tool("submit_batch", {"provider": "local", "items": [{"prompt": "a box"}]})
+    )
+
+    broken = AsyncMock(side_effect=RuntimeError("output file missing"))
+    with patch.object(LocalProvider, "fetch_batch", broken):
+        failed = unwrap(await app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}))
+    assert failed["status"] == "error"
+
+    collected = unwrap(await app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}))
+    assert collected["status"] == "success"
+    assert tracker.get_usage_report(days=1).total_generations == 1
+
+
+@pytest.mark.asyncio
+async def test_collect_reports_pending_and_survives_restart(tmp_path):
+    app, _ = _server(tmp_path, batch_delay_s=3600)
+    submitted = unwrap(
+        await app.call_tool("submit_batch", {"provider": "local", "items": [{"prompt": "a box"}]})
+    )
+
+    pending = unwrap(await app.call_tool("collect_batch", {"batch_id": submitted["batch_id"]}))
+    assert pending["status"] == "pending"
+    assert pending["batch_status"] == "running"
+
+    # A new server process sees the persisted batch.
+    stored = BatchStore(tmp_path / "usage.db").get(submitted["batch_id"])
+    assert stored is not None
+    assert stored.job.status == BatchStatus.RUNNING
+    assert stored.items[0].output_path == submitted["output_paths"][0]
+
+
+@pytest.mark.asyncio
+async def test_submit_batch_validates_items(tmp_path):
+    app, _ = _server(tmp_path)
+    response = unwrap(
+        await app.call_tool(
+            "submit_batch",
+            {"provider": "local", "items": [{"prompt": "x", "output_path": "relative.png"}]},
+        )
+    )
+    assert response["status"] == "error"
+    assert "absolute" in response["error"]
+
+
+@pytest.mark.asyncio
+async def test_collect_unknown_batch_is_an_error(tmp_path):
+    app, _ = _server(tmp_path)
+    response = unwrap(await app.call_tool("collect_batch", {"batch_id": "batch_missing"}))
+    assert response == {"status": "error", "error": "Unknown batch: batch_missing"}
@@ -0,0 +1,102 @@
+"""batch_generate_diagrams: concurrent items, per-item failures and aggregates."""
+
+from __future__ import annotations
+
+import pytest
+
+from diagram_forge.models import GenerationResult
+from tests.conftest import STUB_PNG, call_tool
+
+
+async def _fail_on_request(name, model, config) -> GenerationResult:
+    """Fails prompts containing "fail"; the rest succeed at $0.01."""
+    if "fail" in config.prompt:
+        return GenerationResult(success=False, error_message="content policy")
+    return GenerationResult(success=True, image_data=STUB_PNG, cost_usd=0.01)
+
+
+@pytest.fixture
+def slow_factory(stub_factory):
+    """Every call takes 50 ms."""
+    return lambda: stub_factory(delays={"openai": 0.05}, respond=_fail_on_request)
+
+
+@pytest.fixture
+def app(make_server):
+    return make_server()[0]
+
+
+@pytest.mark.asyncio
+async def test_items_run_concurrently_and_failures_stay_local(app, slow_factory):
+    factory = slow_factory()
+    response = await call_tool(
+        app,
+        "batch_generate_diagrams",
+        {
+            "items": [
+                {"prompt": "one"},
+                {"prompt": "please fail"},
+                {"prompt": "three"},
+                {"bogus": 1},
+            ],
+            "defaults": {"theme": "dark"},
+        },
+        factory,
+    )
+
+    assert response["status"] == "partial"
+    assert response["succeeded"] == 2
+    assert response["failed"] == 2
+    assert response["total_cost_usd"] == pytest.approx(0.02)
+    assert factory.peak == 3
+    assert response["wall_time_ms"] < response["item_time_ms"]
+    assert sorted(response["completion_order"]) == [0, 1, 2, 3]
+
+    results = response["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[1]["error_message"] == "content policy"
+    assert "bogus" in results[3]["error"]
+    saved = {r["output_path"] for r in results if r["status"] == "success"}
+    assert len(saved) == 2  # default names do not collide
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency_bounds_in_flight_items(app, slow_factory):
+    factory = slow_factory()
+    response = await call_tool(
+        app,
+        "batch_generate_diagrams",
+        {"items": [{"prompt": f"p{i}"} for i in range(5)], "max_concurrency": 2},
+        factory,
+    )
+    assert response["status"] == "success"
+    assert factory.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_rejects_empty_batch_and_unknown_defaults(app, slow_factory):
+    empty = await call_tool(app, "batch_generate_diagrams", {"items": []}, slow_factory())
+    assert empty["status"] == "error"
+    response = await call_tool(
+        app,
+        "batch_generate_diagrams",
+        {"items": [{"prompt": "x"}], "defaults": {"colour": "red"}},
+        slow_factory(),
+    )
+    assert response["status"] == "error"
+    assert "colour" in response["error"]
+
+
+@pytest.mark.asyncio
+async def test_non_object_item_is_a_per_item_error(app, slow_factory):
+    response = await call_tool(
+        app,
+        "batch_generate_diagrams",
+        {"items": ["a box", {"prompt": "two"}]},
+        slow_factory(),
+    )
+
+    assert response["status"] == "partial"
+    assert response["results"][0]["status"] == "error"
+    assert "got str" in response["results"][0]["error"]
+    assert response["results"][1]["status"] == "success"
@@ -0,0 +1,183 @@
+"""Tests for per-provider circuit breakers and their use in the fallback chain."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from diagram_forge.circuit_breaker import CircuitBreaker
+from diagram_forge.cost_tracker import CostTracker
+from diagram_forge.models import BillingModel, CircuitState, ErrorKind, GenerationResult
+from diagram_forge.server import create_server
+from tests.conftest import call_tool, unwrap
+
+
+def _result(success: bool, rate_limited: bool = False) -> GenerationResult:
+    return GenerationResult(
+        success=success,
+        image_data=b"\x89PNG-stub" if success else None,
+        error_message=None if success else "503 Service Unavailable",
+        billing_model=BillingModel.PER_IMAGE,
+        error_kind=ErrorKind.RATE_LIMITED if rate_limited else None,
+    )
+
+
+class TestCircuitBreaker:
+    def test_trips_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3)
+        for _ in range(2):
+            breaker.record(_result(False))
+        assert breaker.state == CircuitState.CLOSED
+        breaker.record(_result(False))
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow_request()
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record(_result(False))
+        breaker.record(_result(True))
+        breaker.record(_result(False))
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_rate_limits_and_cancellations_do_not_count(self):
+        """A throttled provider is up; a cancelled call tells us nothing."""
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record(_result(False, rate_limited=True))
+        breaker.record(None)
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_probe_closes_on_success(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0.01)
+        breaker.record(_result(False))
+        with patch("diagram_forge.circuit_breaker.time.monotonic", return_value=1e12):
+            assert breaker.state == CircuitState.HALF_OPEN
+            assert breaker.allow_request()
+            # Only one probe at a time.
+            assert not breaker.allow_request()
+            breaker.record(_result(True))
+            assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_probe_reopens_on_failure(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0.01)
+        breaker.record(_result(False))
+        with patch("diagram_forge.circuit_breaker.time.monotonic", return_value=1e12):
+            assert breaker.allow_request()
+            breaker.record(_result(False))
+            assert breaker.state == CircuitState.OPEN
+
+    def test_unused_probe_slot_can_be_released(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0.01)
+        breaker.record(_result(False))
+        with patch("diagram_forge.circuit_breaker.time.monotonic", return_value=1e12):
+            assert breaker.allow_request()
+            assert not breaker.allow_request()
+            breaker.release()
+            assert breaker.allow_request()
+
+
+class _CountingFactory:
+    """Stands in for `get_provider`; openai always fails, counting how often it is called."""
+
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+
+    def __call__(self, name: str, api_key: str, model: str | None = None):
+        factory = self
+
+        class _Provider:
+            async def generate(self, _config):
+                factory.calls[name] = factory.calls.get(name, 0) + 1
+                return _result(name != "openai")
+
+        return _Provider()
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_is_skipped_and_reported(tmp_path, monkeypatch):
+    """Once openai trips, generate_diagram stops calling it and says why."""
+    monkeypatch.setenv("CB_TEST_KEY", "k")
+    cfg = {
+        "default_provider": "openai",
+        "provider_fallback_chain": ["openai", "gemini"],
+        "output_directory": str(tmp_path / "out"),
+        "styles_directory": str(tmp_path / "styles"),
+        "database_path": str(tmp_path / "usage.db"),
+        "circuit_breaker": {"failure_threshold": 2, "reset_timeout_s": 600},
+        "providers": {
+            "openai": {"model": "o-model", "api_key_env": "CB_TEST_KEY"},
+            "gemini": {"model": "g-model", "api_key_env": "CB_TEST_KEY"},
+        },
+    }
+    cfg_path = tmp_path / "config.yaml"
+    cfg_path.write_text(yaml.dump(cfg))
+    with patch("diagram_forge.server.CostTracker", return_value=CostTracker(tmp_path / "u.db")):
+        app = create_server(str(cfg_path))
+
+    factory = _CountingFactory()
+    with patch("diagram_forge.server.get_provider", factory):
+        for _ in range(3):
+            response = unwrap(
+                await app.call_tool(
+                    "generate_diagram",
+                    {"prompt": "a box", "output_path": str(tmp_path / "out.png")},
+                )
+            )
+        providers = unwrap(await app.call_tool("list_providers", {}))
+
+    # Two real failures trip the breaker; the third request never calls openai.
+    assert factory.calls["openai"] == 2
+    assert response["status"] == "success"
+    assert response["provider_used"] == "gemini"
+    assert {"provider": "openai", "model": "o-model", "skipped": "circuit open"} in response[
+        "fell_back_from"
+    ]
+
+    by_name = {p["name"]: p for p in providers["providers"]}
+    assert by_name["openai"]["circuit"]["state"] == "open"
+    assert by_name["gemini"]["circuit"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancellation_counts_as_a_failure(make_server, stub_factory, tmp_path):
+    """A provider that hangs past the deadline trips its breaker like one that errors."""
+    app, _ = make_server(
+        {"openai": "o-model"}, circuit_breaker={"failure_threshold": 1, "reset_timeout_s": 600}
+    )
+    providers = stub_factory(delays={"openai": 5.0})
+    args = {"prompt": "a box", "output_path": str(tmp_path / "out.png"), "deadline_ms": 50}
+
+    first = await call_tool(app, "generate_diagram", args, providers)
+    second = await call_tool(app, "generate_diagram", args, providers)
+
+    assert first["deadline_exceeded"] is True
+    assert second["attempts"] == [
+        {"provider": "openai", "model": "o-model", "skipped": "circuit open"}
+    ]
+    assert len(providers.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_probe_slot_of_an_untried_candidate_is_handed_back(
+    make_server, stub_factory, tmp_path
+):
+    """A half-open fallback that the chain never reaches does not keep the probe slot."""
+    app, _ = make_server(
+        {"openai": "o-model", "gemini": "g-model"},
+        circuit_breaker={"failure_threshold": 1, "reset_timeout_s": 0.05},
+    )
+    providers = stub_factory(failing={"openai": "503 Service Unavailable"})
+    args = {"prompt": "a box", "output_path": str(tmp_path / "out.png")}
+
+    await call_tool(app, "generate_diagram", args, providers)  # trips openai
+    await asyncio.sleep(0.1)
+    # gemini first: openai is runnable (claiming the half-open probe) but never tried.
+    await call_tool(app, "generate_diagram", {**args, "provider": "gemini"}, providers)
+    response = await call_tool(app, "generate_diagram", args, providers)
+
+    assert [c.provider for c in providers.calls].count("openai") == 2
+    assert {"provider": "openai", "model": "o-model", "skipped": "circuit open"} not in response[
+        "fell_back_from"
+    ]
@@ -0,0 +1,134 @@
+"""compare_providers fan-out and the imaging helpers behind its contact sheet."""
+
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from diagram_forge.imaging import contact_sheet, grid_columns, stamp_label
+from diagram_forge.models import GenerationResult
+from diagram_forge.providers.local import LocalProvider
+from tests.conftest import call_tool
+
+
+def _png(width: int, height: int, color=(200, 200, 200)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class TestImaging:
+    def test_stamp_label_keeps_size(self):
+        stamped = stamp_label(_png(300, 200), "openai/gpt-image-2")
+        with Image.open(io.BytesIO(stamped)) as img:
+            assert img.size == (300, 200)
+            assert img.getpixel((20, 20)) != (200, 200, 200)
+
+    def test_contact_sheet_grid(self):
+        sheet = contact_sheet(
+            [(_png(400, 300), "a"), (_png(200, 200), "b"), (_png(400, 300), "c")],
+            columns=2,
+            tile_width=100,
+            gap=10,
+        )
+        with Image.open(io.BytesIO(sheet)) as img:
+            # Two columns; each row is as tall as its tallest tile (100 px square, 75 px 4:3).
+            assert img.size == (2 * 100 + 3 * 10, 100 + 75 + 3 * 10)
+
+    def test_grid_columns(self):
+        assert [grid_columns(n) for n in (1, 2, 4, 5, 9)] == [1, 2, 2, 3, 3]
+
+    def test_empty_sheet_rejected(self):
+        with pytest.raises(ValueError):
+            contact_sheet([])
+
+
+async def _render_locally(name, model, config) -> GenerationResult:
+    """A real local render at $0.02, except "openai_mini", which is out of quota."""
+    if name == "openai_mini":
+        return GenerationResult(success=False, error_message="quota exceeded")
+    result = await LocalProvider(model=model).generate(config)
+    result.cost_usd = 0.02
+    return result
+
+
+@pytest.fixture
+def factory(stub_factory):
+    """Every call takes 50 ms."""
+    delays = dict.fromkeys(("openai", "openai_mini", "gemini"), 0.05)
+    return stub_factory(delays=delays, respond=_render_locally)
+
+
+@pytest.fixture
+def server(make_server):
+    return make_server(
+        {
+            "openai": "gpt-image-2",
+            "openai_mini": "gpt-image-1-mini",
+            "gemini": "gemini-3-pro-image-preview",
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_compare_fans_out_in_parallel(server, factory, tmp_path):
+    app, tracker = server
+    response = await call_tool(
+        app,
+        "compare_providers",
+        {
+            "prompt": "three boxes",
+            "diagram_type": "architecture",
+            "candidates": ["gemini", "openai", "openai:gpt-image-1.5", "openai_mini", "nope"],
+            "resolution": "1K",
+        },
+        factory,
+    )
+
+    assert response["status"] == "success"
+    by_candidate = {r["candidate"]: r for r in response["results"]}
+    assert by_candidate["openai:gpt-image-1.5"]["model"] == "gpt-image-1.5"
+    assert by_candidate["openai_mini"]["status"] == "error"
+    assert by_candidate["openai_mini"]["error"] == "quota exceeded"
+    assert by_candidate["nope"]["status"] == "skipped"
+    for name in ("gemini", "openai", "openai:gpt-image-1.5"):
+        entry = by_candidate[name]
+        assert entry["status"] == "success"
+        assert entry["latency_ms"] >= 50
+        assert Path(entry["output_path"]).parent == tmp_path / "out"
+        assert Path(entry["output_path"]).exists()
+
+    # One rendered prompt, four calls, and they overlapped.
+    prompts = [call.config.prompt for call in factory.calls]
+    assert len(set(prompts)) == 1 and len(prompts) == 4
+    assert response["wall_time_ms"] < sum(r.get("latency_ms", 0) for r in response["results"])
+    assert response["total_cost_usd"] == pytest.approx(0.06)
+    assert Image.open(response["contact_sheet"]).size[0] > 0
+    assert tracker.get_usage_report().total_generations == 4
+
+
+@pytest.mark.asyncio
+async def test_default_candidates_and_no_sheet(server, factory):
+    app, _ = server
+    response = await call_tool(
+        app, "compare_providers", {"prompt": "a box", "make_contact_sheet": False}, factory
+    )
+    assert {r["candidate"] for r in response["results"]} == {"openai", "openai_mini", "gemini"}
+    assert "contact_sheet" not in response
+
+
+@pytest.mark.asyncio
+async def test_repeated_candidate_keeps_every_image(server, factory):
+    app, _ = server
+    response = await call_tool(
+        app,
+        "compare_providers",
+        {"prompt": "a box", "candidates": ["gemini", "gemini"], "make_contact_sheet": False},
+        factory,
+    )
+    paths = [r["output_path"] for r in response["results"]]
+    assert len(set(paths)) == 2
+    assert all(Path(p).exists() for p in paths)
@@ -77,3 +77,13 @@ class TestResolveApiKey:
         # Ensure env var doesn't exist
         os.environ.pop("NONEXISTENT_KEY_12345", None)
         assert resolve_api_key(pc) is None
+
+    def test_keyless_provider_resolves_to_empty_string(self):
+        """Providers without api_key_env need no key; "" is distinct from missing (None)."""
+        pc = ProviderConfig(model="local-placeholder")
+        assert resolve_api_key(pc) == ""
+
+    def test_empty_env_var_counts_as_missing(self, monkeypatch):
+        monkeypatch.setenv("EMPTY_KEY_12345", "")
+        pc = ProviderConfig(model="test", api_key_env="EMPTY_KEY_12345")
+        assert resolve_api_key(pc) is None
@@ -104,3 +104,95 @@ class TestCostTracker:
         assert report.total_generations == 0
         assert report.total_cost_usd == 0.0
         assert report.breakdown == []
+
+    def test_token_columns_and_latency_buckets(self, tmp_dir):
+        """Token usage is stored, totalled, averaged per group and bucketed for latency."""
+        tracker = CostTracker(tmp_dir / "test.db")
+        for input_tokens, cached, ms in [(300, 0, 1000), (400, 200, 1200), (1200, 0, 3000)]:
+            tracker.record(
+                GenerationRecord(
+                    provider="openai",
+                    model="gpt-image-1-mini",
+                    diagram_type="architecture",
+                    tokens_used=input_tokens + 4000,
+                    input_tokens=input_tokens,
+                    cached_input_tokens=cached,
+                    output_tokens=4000,
+                    image_output_tokens=4000,
+                    cost_usd=0.03,
+                    billing_model="per_token",
+                    generation_time_ms=ms,
+                )
+            )
+        # A provider that reports no usage leaves the token columns empty.
+        tracker.record(
+            GenerationRecord(
+                provider="local",
+                model="local",
+                cost_usd=0.0,
+                billing_model="per_image",
+            )
+        )
+
+        report = tracker.get_usage_report(days=1)
+        assert report.total_input_tokens == 1900
+        assert report.total_cached_input_tokens == 200
+        assert report.total_output_tokens == 12000
+        by_provider = {row["group"]: row for row in report.breakdown}
+        assert by_provider["openai"]["avg_input_tokens"] == 633
+        assert by_provider["local"]["avg_input_tokens"] is None
+        assert report.latency_by_input_tokens == [
+            {
+                "input_tokens_from": 0,
+                "input_tokens_to": 499,
+                "count": 2,
+                "avg_generation_time_ms": 1100,
+            },
+            {
+                "input_tokens_from": 1000,
+                "input_tokens_to": 1499,
+                "count": 1,
+                "avg_generation_time_ms": 3000,
+            },
+        ]
+
+    def test_migrates_database_without_token_columns(self, tmp_dir):
+        """An existing ledger gains the token columns and keeps its rows."""
+        import sqlite3
+
+        db_path = tmp_dir / "old.db"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                """
+                CREATE TABLE generations (
+                    id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, provider TEXT NOT NULL,
+                    model TEXT NOT NULL, diagram_type TEXT, resolution TEXT, aspect_ratio TEXT,
+                    tokens_used INTEGER, cost_usd REAL NOT NULL, billing_model TEXT NOT NULL,
+                    generation_time_ms INTEGER, success INTEGER NOT NULL, output_path TEXT,
+                    template_used TEXT, style_used TEXT, error_message TEXT
+                )
+                """
+            )
+            conn.execute(
+                "INSERT INTO generations (id, timestamp, provider, model, cost_usd, billing_model, success)"
+                " VALUES ('old', datetime('now'), 'gemini', 'm', 0.039, 'per_image', 1)"
+            )
+
+        tracker = CostTracker(db_path)
+        tracker.record(
+            GenerationRecord(
+                provider="gemini",
+                model="m",
+                input_tokens=50,
+                output_tokens=1290,
+                cost_usd=0.039,
+                billing_model="per_image",
+            )
+        )
+
+        with sqlite3.connect(db_path) as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(generations)")}
+            assert {"input_tokens", "cached_input_tokens", "image_output_tokens"} <= columns
+            assert conn.execute("SELECT COUNT(*) FROM generations").fetchone()[0] == 2
+        # Re-opening an already migrated database is a no-op.
+        assert CostTracker(db_path).get_usage_report(days=1).total_input_tokens == 50
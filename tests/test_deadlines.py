@@ -0,0 +1,166 @@
+"""deadline_ms: one time budget for the whole fallback chain.
+
+A candidate only gets what the earlier ones left; the call in flight when the budget
+runs out is cancelled and still lands in the cost ledger, marked with the reason.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from tests.conftest import call_tool
+
+_PROVIDERS = {"openai": "o-model", "gemini": "g-model", "local_b": "l-model"}
+
+
+@pytest.fixture
+def server(make_server):
+    def build(chain=tuple(_PROVIDERS), hedging=None):
+        return make_server(
+            _PROVIDERS,
+            provider_fallback_chain=list(chain),
+            hedging=hedging or {"enabled": False},
+        )
+
+    return build
+
+
+@pytest.fixture
+def stubs(stub_factory):
+    """Each provider sleeps its delay, then fails with "boom" or succeeds as configured."""
+
+    def build(delays, failing=()):
+        return stub_factory(
+            delays=delays, failing=dict.fromkeys(failing, "boom"), estimate_cost=0.02
+        )
+
+    return build
+
+
+_BILLED = "; possibly billed (estimated cost)"
+
+
+def _ledger_errors(tracker) -> list[tuple[str, str | None]]:
+    with sqlite3.connect(tracker.db_path) as conn:
+        return conn.execute(
+            "SELECT provider, error_message FROM generations ORDER BY rowid"
+        ).fetchall()
+
+
+async def _generate(app, providers, tmp_path, **args):
+    return await call_tool(
+        app,
+        "generate_diagram",
+        {"prompt": "a box", "output_path": str(tmp_path / "out.png"), **args},
+        providers,
+    )
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_in_flight_call_and_skips_the_rest(server, stubs, tmp_path):
+    app, tracker = server()
+    providers = stubs({"openai": 0.05, "gemini": 5.0}, failing={"openai"})
+
+    start = time.monotonic()
+    response = await _generate(app, providers, tmp_path, deadline_ms=300)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.0
+    assert response["status"] == "error"
+    assert response["deadline_exceeded"] is True
+    attempts = response["attempts"]
+    assert attempts[0]["provider"] == "openai" and attempts[0]["error"] == "boom"
+    assert attempts[1] == {
+        "provider": "gemini",
+        "model": "g-model",
+        "cancelled": "deadline of 300 ms exceeded",
+    }
+    assert attempts[2]["provider"] == "local_b" and attempts[2]["skipped"] == "deadline exceeded"
+    assert providers.cancelled == ["gemini"]
+    assert _ledger_errors(tracker) == [
+        ("openai", "boom"),
+        ("gemini", "cancelled: deadline exceeded" + _BILLED),
+    ]
+    assert not (tmp_path / "out.png").exists()
+
+
+@pytest.mark.asyncio
+async def test_call_abandoned_at_deadline_is_charged_its_estimate(server, stubs, tmp_path):
+    """The abandoned call was probably billed; the ledger must not record it as free."""
+    app, tracker = server(chain=("openai",))
+    await _generate(app, stubs({"openai": 5.0}), tmp_path, deadline_ms=100)
+
+    with sqlite3.connect(tracker.db_path) as conn:
+        cost, error = conn.execute("SELECT cost_usd, error_message FROM generations").fetchone()
+    assert cost == pytest.approx(0.02)
+    assert error == "cancelled: deadline exceeded" + _BILLED
+    assert tracker.get_usage_report(days=1).total_cost_usd > 0
+
+
+@pytest.mark.asyncio
+async def test_fallback_only_gets_the_remaining_budget(server, stubs, tmp_path):
+    """The primary used most of the budget, so a fallback that needs 200 ms is cut off."""
+    app, _ = server(chain=("openai", "gemini"))
+    providers = stubs({"openai": 0.25, "gemini": 0.2}, failing={"openai"})
+
+    start = time.monotonic()
+    response = await _generate(app, providers, tmp_path, deadline_ms=350)
+    elapsed = time.monotonic() - start
+
+    assert response["deadline_exceeded"] is True
+    assert providers.cancelled == ["gemini"]
+    assert elapsed < 0.45
+
+
+@pytest.mark.asyncio
+async def test_call_within_budget_succeeds(server, stubs, tmp_path):
+    app, tracker = server()
+    response = await _generate(app, stubs({"openai": 0.01}), tmp_path, deadline_ms=2000)
+    assert response["status"] == "success"
+    assert "deadline_exceeded" not in response
+    assert _ledger_errors(tracker) == [("openai", None)]
+
+
+@pytest.mark.asyncio
+async def test_hedged_chain_respects_deadline(server, stubs, tmp_path):
+    app, tracker = server(
+        chain=("openai", "gemini"),
+        hedging={"enabled": True, "delay_ms": 50, "use_p95": False},
+    )
+    providers = stubs({"openai": 5.0, "gemini": 5.0})
+    response = await _generate(app, providers, tmp_path, deadline_ms=200)
+    assert response["deadline_exceeded"] is True
+    assert sorted(providers.cancelled) == ["gemini", "openai"]
+    assert sorted(_ledger_errors(tracker)) == [
+        ("gemini", "cancelled: deadline exceeded" + _BILLED),
+        ("openai", "cancelled: deadline exceeded" + _BILLED),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_caller_cancellation_stops_the_provider_call(server, stubs, tmp_path):
+    """MCP cancellation / disconnect cancels the tool task; the attempt is still recorded."""
+    app, tracker = server()
+    providers = stubs({"openai": 5.0})
+    task = asyncio.create_task(_generate(app, providers, tmp_path))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert providers.cancelled == ["openai"]
+    assert _ledger_errors(tracker) == [
+        ("openai", "cancelled: request cancelled by client" + _BILLED)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rejects_non_positive_deadline(server, stubs, tmp_path):
+    app, _ = server()
+    response = await _generate(app, stubs({}), tmp_path, deadline_ms=0)
+    assert response["status"] == "error"
+    assert "deadline_ms" in response["error"]
@@ -0,0 +1,137 @@
+"""Hedged requests across the provider fallback chain.
+
+With hedging on, a slow primary no longer makes the caller wait out its full latency
+before the secondary even starts. Both calls must still be accounted for honestly:
+the cancelled loser appears in `fell_back_from` and in the cost ledger.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+
+import pytest
+
+from diagram_forge.cost_tracker import CostTracker
+from diagram_forge.models import GenerationRecord
+from tests.conftest import call_tool
+
+
+@pytest.fixture
+def server(make_server):
+    def build(hedging: dict):
+        return make_server({"openai": "o-model", "gemini": "g-model"}, hedging=hedging)
+
+    return build
+
+
+@pytest.fixture
+def generate(stub_factory, tmp_path):
+    """Each provider sleeps its delay, then succeeds; an abandoned call is estimated at $0.04."""
+
+    async def run(app, delays: dict[str, float], **args):
+        return await call_tool(
+            app,
+            "generate_diagram",
+            {"prompt": "a box", "output_path": str(tmp_path / "out.png"), **args},
+            stub_factory(delays=delays, estimate_cost=0.04),
+        )
+
+    return run
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(server, generate):
+    """POSITIVE CONTROL: a primary that beats the threshold runs alone."""
+    app, tracker = server({"enabled": True, "delay_ms": 200, "use_p95": False})
+    response = await generate(app, {"openai": 0.0, "gemini": 0.0})
+
+    assert response["status"] == "success"
+    assert response["provider_used"] == "openai"
+    assert response.get("fell_back_from") is None
+    assert tracker.get_usage_report(days=1).total_generations == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_loser_cancelled(server, generate):
+    """A primary past its threshold triggers the secondary; the first success wins."""
+    app, tracker = server({"enabled": True, "delay_ms": 50, "use_p95": False})
+
+    start = time.monotonic()
+    response = await generate(app, {"openai": 5.0, "gemini": 0.0})
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.0
+    assert response["status"] == "success"
+    assert response["provider_used"] == "gemini"
+    assert "warning" in response
+    cancelled = [a for a in response["fell_back_from"] if a.get("provider") == "openai"]
+    assert len(cancelled) == 1 and "cancelled" in cancelled[0]
+
+    # Both calls are in the ledger, the abandoned one as a failure at its estimated cost:
+    # the provider has usually billed it already, so hedging is not free.
+    report = tracker.get_usage_report(days=1)
+    assert report.total_generations == 2
+    assert report.failed_generations == 1
+    assert report.total_cost_usd == pytest.approx(0.01 + 0.04)
+    with sqlite3.connect(tracker.db_path) as conn:
+        loser = conn.execute(
+            "SELECT cost_usd, error_message FROM generations WHERE provider = 'openai'"
+        ).fetchone()
+    assert loser == (
+        0.04,
+        "cancelled: superseded by a hedged request; possibly billed (estimated cost)",
+    )
+
+
+@pytest.mark.asyncio
+async def test_primary_that_wins_after_the_hedge_fires_is_not_a_substitution(server, generate):
+    """The primary finishes first after all; the cancelled secondary is no fallback."""
+    app, tracker = server({"enabled": True, "delay_ms": 50, "use_p95": False})
+    response = await generate(app, {"openai": 0.15, "gemini": 5.0})
+
+    assert response["status"] == "success"
+    assert response["provider_used"] == "openai"
+    assert "warning" not in response
+    assert response["fell_back_from"] == [
+        {
+            "provider": "gemini",
+            "model": "g-model",
+            "cancelled": "hedged request won by 'openai'",
+        }
+    ]
+    assert tracker.get_usage_report(days=1).total_generations == 2
+
+
+@pytest.mark.asyncio
+async def test_hedging_off_waits_for_primary(server, generate):
+    """Without hedging the chain stays strictly sequential."""
+    app, _ = server({"enabled": False, "delay_ms": 10, "use_p95": False})
+    response = await generate(app, {"openai": 0.2, "gemini": 0.0})
+    assert response["provider_used"] == "openai"
+
+
+@pytest.mark.asyncio
+async def test_per_call_hedge_overrides_config(server, generate):
+    """hedge=True on the call enables hedging even when the config leaves it off."""
+    app, _ = server({"enabled": False, "delay_ms": 50, "use_p95": False})
+    response = await generate(app, {"openai": 5.0, "gemini": 0.0}, hedge=True)
+    assert response["provider_used"] == "gemini"
+
+
+def test_latency_percentile_needs_enough_history(tmp_path):
+    """p95 is only trusted once min_samples successes exist."""
+    tracker = CostTracker(tmp_path / "usage.db")
+    for ms in range(1, 11):
+        tracker.record(
+            GenerationRecord(
+                provider="openai",
+                model="m",
+                cost_usd=0.0,
+                billing_model="per_image",
+                generation_time_ms=ms * 100,
+            )
+        )
+    assert tracker.latency_percentile("openai", "m", min_samples=20) is None
+    assert tracker.latency_percentile("openai", "m", min_samples=10) == 1000
+    assert tracker.latency_percentile("openai", "m", percentile=0.5, min_samples=10) == 600
@@ -0,0 +1,232 @@
+"""Durable job queue: JobStore/JobRunner and the submit/wait/status/cancel tools."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from diagram_forge.job_queue import JobRunner, _process_owner
+from diagram_forge.job_store import JobStore
+from diagram_forge.models import JobStatus
+from tests.conftest import unwrap
+
+
+class TestJobRunner:
+    @pytest.mark.asyncio
+    async def test_runs_job_and_records_result(self, tmp_path):
+        async def execute(params):
+            return {"status": "success", "echo": params["n"]}
+
+        runner = JobRunner(JobStore(tmp_path / "jobs.db"), execute)
+        job, created = runner.submit({"n": 1}, "k1")
+        done = await runner.wait(job.id, timeout_s=2)
+        await runner.aclose()
+
+        assert created
+        assert done.status == JobStatus.SUCCEEDED
+        assert done.result == {"status": "success", "echo": 1}
+
+    @pytest.mark.asyncio
+    async def test_error_response_fails_the_job(self, tmp_path):
+        async def execute(params):
+            return {"status": "error", "error": "no provider"}
+
+        runner = JobRunner(JobStore(tmp_path / "jobs.db"), execute)
+        job, _ = runner.submit({}, "k1")
+        done = await runner.wait(job.id, timeout_s=2)
+        await runner.aclose()
+
+        assert done.status == JobStatus.FAILED
+        assert done.error_message == "no provider"
+
+    @pytest.mark.asyncio
+    async def test_same_key_reuses_live_or_succeeded_job_only(self, tmp_path):
+        outcomes = iter([{"status": "error", "error": "boom"}, {"status": "success"}])
+
+        async def execute(params):
+            return next(outcomes)
+
+        runner = JobRunner(JobStore(tmp_path / "jobs.db"), execute)
+        first, _ = runner.submit({}, "k")
+        await runner.wait(first.id, timeout_s=2)
+        # The failed job is not reused.
+        second, created = runner.submit({}, "k")
+        assert created and second.id != first.id
+        await runner.wait(second.id, timeout_s=2)
+        third, created = runner.submit({}, "k")
+        await runner.aclose()
+
+        assert not created and third.id == second.id
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_and_queued(self, tmp_path):
+        started = asyncio.Event()
+
+        async def execute(params):
+            started.set()
+            await asyncio.sleep(30)
+            return {"status": "success"}
+
+        runner = JobRunner(JobStore(tmp_path / "jobs.db"), execute, workers=1)
+        running, _ = runner.submit({"n": 1}, "a")
+        queued, _ = runner.submit({"n": 2}, "b")
+        await asyncio.wait_for(started.wait(), 2)
+
+        assert runner.store.queue_position(queued.id) == 1
+        assert runner.cancel(queued.id).status == JobStatus.CANCELLED
+        assert runner.cancel(running.id).status == JobStatus.CANCELLED
+        await asyncio.sleep(0)
+        assert (await runner.wait(running.id, timeout_s=1)).status == JobStatus.CANCELLED
+        await runner.aclose()
+
+    @pytest.mark.asyncio
+    async def test_restart_resumes_queued_and_fails_orphaned_running(self, tmp_path):
+        store = JobStore(tmp_path / "jobs.db")
+        queued = store.create({"n": 1}, "q")
+        orphan = store.create({"n": 2}, "o")
+        store.claim(orphan.id, "localhost-that-died:999999999")
+        ours = store.create({"n": 3}, "r")
+        store.claim(ours.id, _process_owner())
+
+        calls = []
+
+        async def execute(params):
+            calls.append(params["n"])
+            return {"status": "success"}
+
+        with patch(
+            "diagram_forge.job_queue.socket.gethostname", return_value="localhost-that-died"
+        ):
+            runner = JobRunner(store, execute)
+            runner.start()
+            done = await runner.wait(queued.id, timeout_s=2)
+        await runner.aclose()
+
+        assert done.status == JobStatus.SUCCEEDED
+        assert calls == [1]
+        orphaned = store.get(orphan.id)
+        assert orphaned.status == JobStatus.FAILED
+        assert "interrupted" in orphaned.error_message
+        # A job claimed by a live process is left alone.
+        assert store.get(ours.id).status == JobStatus.RUNNING
+
+    @pytest.mark.asyncio
+    async def test_wait_times_out_without_changing_the_job(self, tmp_path):
+        async def execute(params):
+            await asyncio.sleep(30)
+
+        runner = JobRunner(JobStore(tmp_path / "jobs.db"), execute)
+        job, _ = runner.submit({}, "k")
+        waited = await runner.wait(job.id, timeout_s=0.05)
+        await runner.aclose()
+        assert not waited.status.terminal
+
+    @pytest.mark.asyncio
+    async def test_wake_up_events_do_not_outlive_their_waiters(self, tmp_path):
+        """Waiting on a finished job, or timing out, leaves no event behind."""
+        release = asyncio.Event()
+
+        async def execute(params):
+            await release.wait()
+            return {"status": "success"}
+
+        runner = JobRunner(JobStore(tmp_path / "jobs.db"), execute)
+        job, _ = runner.submit({}, "k")
+        await runner.wait(job.id, timeout_s=0.05)
+        assert runner._finished == {} and runner._waiters == {}
+
+        waiters = [asyncio.create_task(runner.wait(job.id, timeout_s=2)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        release.set()
+        done = await asyncio.gather(*waiters)
+        assert all(j.status == JobStatus.SUCCEEDED for j in done)
+        await runner.wait(job.id, timeout_s=2)  # already finished
+        await runner.aclose()
+        assert runner._finished == {} and runner._waiters == {}
+
+
+@pytest.fixture
+def app(make_server):
+    return make_server()[0]
+
+
+@pytest.mark.asyncio
+async def test_tools_submit_wait_and_dedupe(app, stub_factory, tmp_path):
+    factory = stub_factory(delays={"openai": 0.01})
+    args = {"prompt": "a box", "output_path": str(tmp_path / "d.png"), "idempotency_key": "k1"}
+    with patch("diagram_forge.server.get_provider", factory):
+        submitted = unwrap(await app.call_tool("submit_diagram_job", args))
+        # A client retrying after a timeout gets the same job back.
+        retried = unwrap(await app.call_tool("submit_diagram_job", args))
+        done = unwrap(
+            await app.call_tool("wait_for_job", {"job_id": submitted["job_id"], "timeout_s": 5})
+        )
+        again = unwrap(await app.call_tool("submit_diagram_job", args))
+
+    assert submitted["job_status"] == "queued"
+    assert retried["job_id"] == submitted["job_id"] and retried["deduplicated"]
+    assert done["job_status"] == "succeeded" and not done["timed_out"]
+    assert done["result"]["output_path"] == str(tmp_path / "d.png")
+    assert again["job_id"] == submitted["job_id"]
+    assert len(factory.calls) == 1
+
+    status = unwrap(await app.call_tool("get_job_status", {"job_id": submitted["job_id"]}))
+    assert status["result"]["status"] == "success"
+
+
+@pytest.mark.asyncio
+async def test_identical_keyless_submissions_are_separate_jobs(app, stub_factory, tmp_path):
+    """Asking for the same diagram twice without a key is taken at its word."""
+    factory = stub_factory(delays={"openai": 0.01})
+    args = {"prompt": "a box", "output_path": str(tmp_path / "d.png")}
+    with patch("diagram_forge.server.get_provider", factory):
+        first = unwrap(await app.call_tool("submit_diagram_job", args))
+        second = unwrap(await app.call_tool("submit_diagram_job", args))
+        for job in (first, second):
+            await app.call_tool("wait_for_job", {"job_id": job["job_id"], "timeout_s": 5})
+
+    assert first["job_id"] != second["job_id"]
+    assert not second["deduplicated"]
+    assert len(factory.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_dedupe_window_matches_identical_keyless_submissions(
+    make_server, stub_factory, tmp_path
+):
+    app, _ = make_server(jobs={"dedupe_window_s": 3600})
+    args = {"prompt": "a box", "output_path": str(tmp_path / "d.png")}
+    with patch("diagram_forge.server.get_provider", stub_factory(delays={"openai": 0.01})):
+        first = unwrap(await app.call_tool("submit_diagram_job", args))
+        second = unwrap(await app.call_tool("submit_diagram_job", args))
+        await app.call_tool("wait_for_job", {"job_id": first["job_id"], "timeout_s": 5})
+
+    assert second["job_id"] == first["job_id"] and second["deduplicated"]
+
+
+@pytest.mark.asyncio
+async def test_tools_reject_unknown_job_and_finished_cancel(app, stub_factory, tmp_path):
+    missing = unwrap(await app.call_tool("get_job_status", {"job_id": "job_nope"}))
+    assert missing["status"] == "error"
+
+    with patch("diagram_forge.server.get_provider", stub_factory(delays={"openai": 0.01})):
+        job = unwrap(
+            await app.call_tool(
+                "submit_diagram_job",
+                {"prompt": "a box", "output_path": str(tmp_path / "d.png"), "idempotency_key": "x"},
+            )
+        )
+        await app.call_tool("wait_for_job", {"job_id": job["job_id"], "timeout_s": 5})
+    cancelled = unwrap(await app.call_tool("cancel_job", {"job_id": job["job_id"]}))
+    assert cancelled["status"] == "error"
+    assert cancelled["job_status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_relative_output_path(app):
+    response = unwrap(
+        await app.call_tool("submit_diagram_job", {"prompt": "a box", "output_path": "rel.png"})
+    )
+    assert response["status"] == "error"
@@ -0,0 +1,100 @@
+"""latency_tier on generate_diagram: config/template plans and the echoed resolution."""
+
+from __future__ import annotations
+
+import pytest
+
+from diagram_forge.models import Quality, Resolution, TierPlan
+from tests.conftest import call_tool
+
+
+@pytest.fixture
+def app(make_server):
+    app, _ = make_server(
+        {
+            "openai": "gpt-image-2-2026-04-21",
+            "openai_mini": "gpt-image-1-mini",
+            "gemini": "gemini-3-pro-image-preview",
+        },
+        provider_fallback_chain=["openai", "gemini"],
+        latency_tiers={
+            "fast": {"provider": "openai_mini", "quality": "low", "resolution": "1K"},
+            "best": {"provider": "gemini"},
+        },
+    )
+    return app
+
+
+@pytest.fixture
+def factory(stub_factory):
+    """Records which provider, model and config each call used."""
+    return stub_factory()
+
+
+async def _generate(app, factory, **args):
+    return await call_tool(app, "generate_diagram", {"prompt": "a box", **args}, factory)
+
+
+@pytest.mark.asyncio
+async def test_fast_tier_resolves_to_configured_plan(app, factory):
+    response = await _generate(app, factory, latency_tier="fast")
+
+    assert response["status"] == "success"
+    (call,) = factory.calls
+    assert (call.provider, call.model) == ("openai_mini", "gpt-image-1-mini")
+    assert (call.config.quality, call.config.resolution) == (Quality.LOW, Resolution.RES_1K)
+    assert response["latency_tier"] == {
+        "tier": "fast",
+        "plan": {"provider": "openai_mini", "quality": "low", "resolution": "1K"},
+        "sources": ["config"],
+        "resolved": {
+            "provider": "openai_mini",
+            "model": "gpt-image-1-mini",
+            "quality": "low",
+            "resolution": "1K",
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_template_overrides_tier_field_by_field(app, factory):
+    response = await _generate(app, factory, latency_tier="fast", diagram_type="exec_infographic")
+
+    # exec_infographic keeps "fast" at 2K; the rest of the config plan still applies.
+    assert factory.calls[0].provider == "openai_mini"
+    assert factory.calls[0].config.resolution == Resolution.RES_2K
+    assert response["latency_tier"]["sources"] == ["config", "template:exec_infographic"]
+
+
+@pytest.mark.asyncio
+async def test_explicit_arguments_win_over_the_tier(app, factory):
+    response = await _generate(
+        app, factory, latency_tier="fast", provider="gemini", resolution="4K"
+    )
+
+    assert factory.calls[0].provider == "gemini"
+    assert factory.calls[0].config.resolution == Resolution.RES_4K
+    assert response["latency_tier"]["resolved"]["provider"] == "gemini"
+
+
+@pytest.mark.asyncio
+async def test_tier_without_quality_falls_back_to_template_recommendation(app, factory):
+    await _generate(app, factory, latency_tier="best", diagram_type="architecture")
+
+    assert factory.calls[0].provider == "gemini"
+    assert (
+        factory.calls[0].config.quality == Quality.MEDIUM
+    )  # architecture.yaml recommended_quality
+
+
+@pytest.mark.asyncio
+async def test_unknown_tier_is_rejected(app, factory):
+    response = await _generate(app, factory, latency_tier="instant")
+    assert response["status"] == "error"
+    assert "latency_tier" in response["error"]
+
+
+def test_plan_merge_keeps_unset_fields():
+    base = TierPlan(provider="openai", quality=Quality.HIGH)
+    merged = base.merged(TierPlan(resolution=Resolution.RES_4K))
+    assert merged == TierPlan(provider="openai", quality=Quality.HIGH, resolution=Resolution.RES_4K)
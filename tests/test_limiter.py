@@ -0,0 +1,146 @@
+"""Tests for the adaptive per-provider concurrency limiter."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from diagram_forge.limiter import (
+    AdaptiveLimiter,
+    LimiterRegistry,
+    retry_after_from_headers,
+    run_limited,
+)
+from diagram_forge.models import ErrorKind, GenerationResult
+from diagram_forge.providers.openai_provider import OpenAIProvider
+
+
+def _ok() -> GenerationResult:
+    return GenerationResult(success=True)
+
+
+def _throttled(retry_after_s: float | None = None) -> GenerationResult:
+    return GenerationResult(
+        success=False, error_kind=ErrorKind.RATE_LIMITED, retry_after_s=retry_after_s
+    )
+
+
+class TestRetryAfterHeaders:
+    def test_retry_after_seconds(self):
+        assert retry_after_from_headers({"Retry-After": "3"}) == 3.0
+
+    def test_retry_after_ms_wins(self):
+        assert retry_after_from_headers({"retry-after-ms": "250", "retry-after": "3"}) == 0.25
+
+    def test_ratelimit_reset_only_when_exhausted(self):
+        """A reset header alone is not a request to wait — only with remaining == 0."""
+        headers = {"x-ratelimit-remaining-requests": "5", "x-ratelimit-reset-requests": "6m0s"}
+        assert retry_after_from_headers(headers) is None
+        headers["x-ratelimit-remaining-requests"] = "0"
+        assert retry_after_from_headers(headers) == 360.0
+
+    def test_no_hint(self):
+        assert retry_after_from_headers({"content-type": "application/json"}) is None
+
+
+class TestAdaptiveLimiter:
+    @pytest.mark.asyncio
+    async def test_caps_concurrency(self):
+        """No more than `limit` calls run at once; the rest queue."""
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.02)
+            return _ok()
+
+        results = await asyncio.gather(*(run_limited(limiter, call) for _ in range(6)))
+        assert peak == 2
+        assert max(r.queue_wait_ms for r in results) > 0
+
+    @pytest.mark.asyncio
+    async def test_additive_increase_on_success(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=8)
+        for _ in range(4):
+            await limiter.acquire()
+            limiter.release(_ok())
+        assert limiter.limit > 2
+
+    @pytest.mark.asyncio
+    async def test_multiplicative_decrease_on_429(self):
+        limiter = AdaptiveLimiter(initial_limit=8)
+        await limiter.acquire()
+        limiter.release(_throttled())
+        assert limiter.limit == 4
+        for _ in range(5):
+            await limiter.acquire()
+            limiter.release(_throttled())
+        assert limiter.limit == limiter.min_limit
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_new_calls(self):
+        """A 429 with Retry-After holds the next caller until the hint expires."""
+        limiter = AdaptiveLimiter(initial_limit=4)
+        await limiter.acquire()
+        limiter.release(_throttled(retry_after_s=0.1))
+        waited_ms = await limiter.acquire()
+        assert waited_ms >= 80
+
+    @pytest.mark.asyncio
+    async def test_failed_call_releases_slot(self):
+        """An exception inside the slot must not leak capacity."""
+        limiter = AdaptiveLimiter(initial_limit=1)
+
+        async def boom():
+            raise RuntimeError("network down")
+
+        with pytest.raises(RuntimeError):
+            await run_limited(limiter, boom)
+        assert limiter.in_flight == 0
+        assert limiter.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_woken_then_cancelled_waiter_passes_its_slot_on(self):
+        """A waiter cancelled after its wake-up must not take the freed slot with it."""
+        limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+        await limiter.acquire()
+        second = asyncio.create_task(limiter.acquire())
+        third = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.release()  # wakes `second`...
+        second.cancel()  # ...which is cancelled before it resumes
+        with pytest.raises(asyncio.CancelledError):
+            await second
+
+        await asyncio.wait_for(third, timeout=1)
+        assert limiter.snapshot()["in_flight"] == 1
+        assert limiter.queued == 0
+
+
+class TestLimiterRegistry:
+    def test_one_limiter_per_provider_model(self):
+        registry = LimiterRegistry()
+        assert registry.get("openai", "a") is registry.get("openai", "a")
+        assert registry.get("openai", "a") is not registry.get("openai", "b")
+
+
+class TestProviderRateLimitDetection:
+    def test_429_exception_is_flagged_with_hint(self):
+        """Provider error results carry the 429 flag and Retry-After hint."""
+        exc = RuntimeError("Error code: 429 - rate_limit_exceeded")
+        exc.status_code = 429
+        exc.response = SimpleNamespace(headers={"retry-after": "2"})
+        result = OpenAIProvider(api_key="t")._error_from_exception(exc, 5)
+        assert result.rate_limited
+        assert result.retry_after_s == 2.0
+
+    def test_other_errors_are_not_rate_limits(self):
+        exc = RuntimeError("Error code: 500")
+        exc.status_code = 500
+        result = OpenAIProvider(api_key="t")._error_from_exception(exc, 5)
+        assert not result.rate_limited
+        assert result.retry_after_s is None
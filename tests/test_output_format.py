@@ -0,0 +1,144 @@
+"""Compressed output formats (webp/jpeg) and format-matched file extensions."""
+
+from __future__ import annotations
+
+import base64
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from diagram_forge.models import GenerationConfig, OutputFormat
+from diagram_forge.providers.gemini import GeminiProvider
+from diagram_forge.providers.local import LocalProvider
+from diagram_forge.providers.openai_provider import OpenAIProvider
+from diagram_forge.server import _with_format_suffix
+from tests.conftest import call_tool
+
+
+class TestOutputFormat:
+    @pytest.mark.parametrize(
+        ("data", "expected"),
+        [
+            (b"\x89PNG\r\n\x1a\n...", OutputFormat.PNG),
+            (b"\xff\xd8\xff\xe0...", OutputFormat.JPEG),
+            (b"RIFF\x00\x00\x00\x00WEBPVP8 ", OutputFormat.WEBP),
+            (b"GIF89a", None),
+        ],
+    )
+    def test_detect(self, data, expected):
+        assert OutputFormat.detect(data) == expected
+
+    def test_extensions(self):
+        assert [f.extension for f in OutputFormat] == [".png", ".webp", ".jpg"]
+
+    def test_compression_is_bounded(self):
+        with pytest.raises(ValueError):
+            GenerationConfig(prompt="x", output_compression=101)
+
+    def test_suffix_follows_bytes(self, tmp_path):
+        webp = b"RIFF\x00\x00\x00\x00WEBP"
+        assert _with_format_suffix(tmp_path / "d.png", webp) == tmp_path / "d.webp"
+        assert _with_format_suffix(tmp_path / "d.jpeg", b"\xff\xd8\xff") == tmp_path / "d.jpeg"
+        assert _with_format_suffix(tmp_path / "d.png", b"unknown") == tmp_path / "d.png"
+
+
+class TestOpenAIOutputFormat:
+    def _provider(self, model: str | None = None) -> OpenAIProvider:
+        p = OpenAIProvider(api_key="t", model=model)
+        response = MagicMock()
+        response.data = [MagicMock(b64_json=base64.b64encode(b"img").decode())]
+        p._client = MagicMock()
+        p._client.images.generate = AsyncMock(return_value=response)
+        return p
+
+    @pytest.mark.asyncio
+    async def test_webp_and_compression_are_requested(self):
+        p = self._provider()
+        await p.generate(GenerationConfig(prompt="x", output_format="webp", output_compression=60))
+        kwargs = p._client.images.generate.await_args.kwargs
+        assert kwargs["output_format"] == "webp"
+        assert kwargs["output_compression"] == 60
+
+    @pytest.mark.asyncio
+    async def test_png_default_sends_nothing_extra(self):
+        p = self._provider()
+        await p.generate(GenerationConfig(prompt="x", output_compression=60))
+        kwargs = p._client.images.generate.await_args.kwargs
+        assert "output_format" not in kwargs
+        assert "output_compression" not in kwargs
+
+    @pytest.mark.asyncio
+    async def test_dall_e_ignores_format(self):
+        p = self._provider("dall-e-3")
+        await p.generate(GenerationConfig(prompt="x", output_format="jpeg"))
+        assert "output_format" not in p._client.images.generate.await_args.kwargs
+
+
+class TestEditInputFormat:
+    """A webp/jpeg diagram fed back into edit_diagram is labelled as what it is."""
+
+    WEBP = b"RIFF\x00\x00\x00\x00WEBPVP8 "
+
+    @pytest.mark.asyncio
+    async def test_openai_uploads_with_detected_type(self):
+        p = OpenAIProvider(api_key="t")
+        response = MagicMock()
+        response.data = [MagicMock(b64_json=base64.b64encode(b"img").decode())]
+        p._client = MagicMock()
+        p._client.images.edit = AsyncMock(return_value=response)
+
+        await p.edit(self.WEBP, GenerationConfig(prompt="x"))
+
+        assert p._client.images.edit.await_args.kwargs["image"] == (
+            "image.webp",
+            self.WEBP,
+            "image/webp",
+        )
+
+    @pytest.mark.asyncio
+    async def test_gemini_sends_detected_mime_type(self):
+        p = GeminiProvider(api_key="t")
+        sent = []
+
+        async def fake_request(contents, config, start, label):
+            sent.extend(contents)
+            return MagicMock(success=True)
+
+        p._request_images = fake_request
+        await p.edit(b"\xff\xd8\xff\xe0jpeg", GenerationConfig(prompt="x"))
+
+        assert sent[0] == (b"\xff\xd8\xff\xe0jpeg", "image/jpeg")
+
+
+@pytest.mark.asyncio
+async def test_local_provider_encodes_requested_format():
+    result = await LocalProvider().generate(GenerationConfig(prompt="x", output_format="webp"))
+    assert OutputFormat.detect(result.image_data) == OutputFormat.WEBP
+
+
+@pytest.fixture
+def app(make_server):
+    return make_server()[0]
+
+
+@pytest.mark.asyncio
+async def test_server_saves_with_extension_of_returned_format(app, tmp_path):
+    response = await call_tool(
+        app,
+        "generate_diagram",
+        {"prompt": "a box", "output_path": str(tmp_path / "d.png"), "output_format": "webp"},
+        lambda *_a, **_k: LocalProvider(),
+    )
+
+    assert response["status"] == "success"
+    assert response["output_path"] == str(tmp_path / "d.webp")
+    assert response["output_format"] == "webp"
+    assert response["image_bytes"] == (tmp_path / "d.webp").stat().st_size
+    assert not (tmp_path / "d.png").exists()
+
+
+@pytest.mark.asyncio
+async def test_server_rejects_unknown_format(app):
+    response = await call_tool(app, "generate_diagram", {"prompt": "a box", "output_format": "gif"})
+    assert response["status"] == "error"
+    assert "output_format" in response["error"]
@@ -0,0 +1,81 @@
+"""Atomic, off-loop image writes and collision-free default names."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import stat
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from diagram_forge.output_writer import output_stamp, save_image, write_atomic
+from tests.conftest import unwrap
+
+
+class TestWriteAtomic:
+    def test_writes_and_creates_parents(self, tmp_path):
+        target = tmp_path / "a" / "b" / "out.png"
+        assert write_atomic(target, b"data", fsync=True) == target
+        assert target.read_bytes() == b"data"
+        assert list(target.parent.iterdir()) == [target]
+
+    def test_replaces_existing_file(self, tmp_path):
+        target = tmp_path / "out.png"
+        target.write_bytes(b"old")
+        write_atomic(target, b"new")
+        assert target.read_bytes() == b"new"
+
+    @pytest.mark.skipif(not hasattr(os, "fchmod"), reason="POSIX file modes")
+    def test_file_mode_matches_a_plain_write(self, tmp_path):
+        plain = tmp_path / "plain.png"
+        plain.write_bytes(b"data")
+        target = write_atomic(tmp_path / "out.png", b"data")
+        assert stat.S_IMODE(target.stat().st_mode) == stat.S_IMODE(plain.stat().st_mode)
+
+    def test_failed_write_keeps_old_file_and_no_temp(self, tmp_path):
+        target = tmp_path / "out.png"
+        target.write_bytes(b"old")
+        with (
+            patch("diagram_forge.output_writer.os.replace", side_effect=OSError("disk full")),
+            pytest.raises(OSError),
+        ):
+            write_atomic(target, b"new")
+        assert target.read_bytes() == b"old"
+        assert list(tmp_path.iterdir()) == [target]
+
+    @pytest.mark.asyncio
+    async def test_save_image_runs_off_the_loop(self, tmp_path):
+        threads = []
+        real = write_atomic
+
+        def spy(*args):
+            threads.append(threading.current_thread())
+            return real(*args)
+
+        with patch("diagram_forge.output_writer.write_atomic", spy):
+            await save_image(tmp_path / "out.png", b"data")
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_stamps_are_unique_within_a_second(self):
+        assert len({output_stamp() for _ in range(200)}) == 200
+
+
+@pytest.mark.asyncio
+async def test_concurrent_default_names_do_not_collide(make_server, stub_factory, tmp_path):
+    app, _ = make_server()
+    with patch("diagram_forge.server.get_provider", stub_factory(delays={"openai": 0.01})):
+        responses = await asyncio.gather(
+            *(
+                app.call_tool(
+                    "generate_diagram", {"prompt": f"box {i}", "diagram_type": "architecture"}
+                )
+                for i in range(8)
+            )
+        )
+    paths = {unwrap(r)["output_path"] for r in responses}
+    assert len(paths) == 8
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == sorted(
+        p.rsplit("/", 1)[-1] for p in paths
+    )
@@ -0,0 +1,46 @@
+"""Slice-wise base64 decoding and payload-free response serialization."""
+
+from __future__ import annotations
+
+import base64
+import os
+
+import pytest
+
+from diagram_forge.models import GenerationResult
+from diagram_forge.payloads import decode_base64
+from diagram_forge.server import _serialize
+
+
+class TestDecodeBase64:
+    @pytest.mark.parametrize("size", [0, 1, 2, 3, 5, 6, 7, 1000, 1001, 1002])
+    def test_matches_b64decode_across_slice_boundaries(self, size):
+        data = os.urandom(size)
+        encoded = base64.b64encode(data).decode("ascii")
+        assert decode_base64(encoded, chunk_chars=8) == data
+
+    def test_text_with_line_breaks_decodes_in_one_piece(self):
+        data = os.urandom(500)
+        encoded = base64.encodebytes(data).decode("ascii")
+        assert "\n" in encoded
+        assert decode_base64(encoded, chunk_chars=8) == data
+
+    def test_chunk_size_must_keep_quanta_whole(self):
+        with pytest.raises(ValueError, match="multiple of 4"):
+            decode_base64("QUJD", chunk_chars=6)
+
+
+def test_serialize_leaves_image_payloads_out_and_untouched():
+    image = b"\x89PNG\r\n\x1a\n" + os.urandom(64)
+    extra = [b"\x89PNG\r\n\x1a\n-second"]
+    result = GenerationResult(
+        success=True, image_data=image, extra_images=extra, metadata={"size": [1, 2]}
+    )
+
+    response = _serialize(result)
+
+    assert "image_data" not in response
+    assert "extra_images" not in response
+    assert response["metadata"] == {"size": [1, 2]}
+    assert result.image_data is image
+    assert result.extra_images is extra
@@ -0,0 +1,152 @@
+"""Streaming partial images and stage progress for generate_diagram."""
+
+from __future__ import annotations
+
+import base64
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from diagram_forge.models import (
+    BillingModel,
+    GenerationConfig,
+    GenerationEvent,
+    GenerationResult,
+)
+from diagram_forge.providers.openai_provider import OpenAIProvider
+from tests.conftest import unwrap
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+class _Stream:
+    """Async iterator standing in for the SDK's AsyncStream."""
+
+    def __init__(self, events):
+        self._events = iter(events)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._events)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class TestOpenAIStreaming:
+    @pytest.mark.asyncio
+    async def test_partial_frames_are_emitted_before_final_image(self):
+        events = [
+            SimpleNamespace(
+                type="image_generation.partial_image", partial_image_index=0, b64_json=_b64(b"p0")
+            ),
+            SimpleNamespace(
+                type="image_generation.partial_image", partial_image_index=1, b64_json=_b64(b"p1")
+            ),
+            SimpleNamespace(type="image_generation.completed", b64_json=_b64(b"final")),
+        ]
+        p = OpenAIProvider(api_key="t")
+        p._client = MagicMock()
+        p._client.images.generate = AsyncMock(return_value=_Stream(events))
+        seen: list[GenerationEvent] = []
+
+        async def on_event(event):
+            seen.append(event)
+
+        result = await p.generate_with_progress(
+            GenerationConfig(prompt="test", partial_images=2), on_event
+        )
+
+        kwargs = p._client.images.generate.await_args.kwargs
+        assert kwargs["stream"] is True
+        assert kwargs["partial_images"] == 2
+        assert [e.stage for e in seen] == ["request_sent", "partial_image", "partial_image"]
+        assert [e.image_data for e in seen[1:]] == [b"p0", b"p1"]
+        assert result.success
+        assert result.image_data == b"final"
+
+    @pytest.mark.asyncio
+    async def test_without_partials_uses_regular_request(self):
+        p = OpenAIProvider(api_key="t")
+        response = MagicMock()
+        response.data = [MagicMock(b64_json=_b64(b"img"))]
+        p._client = MagicMock()
+        p._client.images.generate = AsyncMock(return_value=response)
+
+        result = await p.generate_with_progress(GenerationConfig(prompt="test"), AsyncMock())
+
+        assert "stream" not in p._client.images.generate.await_args.kwargs
+        assert result.image_data == b"img"
+
+
+def _streaming_factory(name: str, api_key: str, model: str | None = None):
+    """Stands in for `get_provider`; emits the requested partial frames before finishing."""
+
+    class _Provider:
+        async def generate(self, _config):
+            raise AssertionError("streaming path expected")
+
+        async def generate_with_progress(self, config, on_event):
+            await on_event(GenerationEvent(stage="request_sent"))
+            for i in range(config.partial_images):
+                await on_event(GenerationEvent(stage="partial_image", index=i, image_data=b"frame"))
+            return GenerationResult(
+                success=True, image_data=b"\x89PNG-final", billing_model=BillingModel.PER_IMAGE
+            )
+
+    return _Provider()
+
+
+@pytest.mark.asyncio
+async def test_server_reports_stage_and_partial_progress(make_server, tmp_path):
+    app, _ = make_server()
+    out = tmp_path / "out.png"
+    reported: list[tuple[int, int, str]] = []
+    previews_during_call: list[bool] = []
+
+    async def record(_ctx, progress, total, message):
+        reported.append((progress, total, message))
+        if message.startswith("partial image"):
+            previews_during_call.append(Path(message.rsplit(": ", 1)[1]).exists())
+
+    with (
+        patch("diagram_forge.server.get_provider", _streaming_factory),
+        patch("diagram_forge.server._report_progress", record),
+    ):
+        response = unwrap(
+            await app.call_tool(
+                "generate_diagram",
+                {"prompt": "a box", "output_path": str(out), "partial_images": 2},
+            )
+        )
+
+    assert response["status"] == "success"
+    assert out.read_bytes() == b"\x89PNG-final"
+    messages = [m for _, _, m in reported]
+    assert messages[0] == "prompt built"
+    assert messages[1].startswith("request sent to ")
+    assert messages[2].startswith("partial image 1/2")
+    assert messages[-1].startswith("saving")
+    # Progress only moves forward and ends at the total.
+    steps = [p for p, _, _ in reported]
+    assert steps == sorted(steps)
+    assert reported[-1][0] == reported[-1][1] == 5
+    # Previews existed while the image was rendering and are gone afterwards.
+    assert previews_during_call == [True, True]
+    assert not list(tmp_path.glob("out.partial*.png"))
+
+
+@pytest.mark.asyncio
+async def test_server_rejects_out_of_range_partial_images(make_server):
+    app, _ = make_server()
+    response = unwrap(
+        await app.call_tool("generate_diagram", {"prompt": "a box", "partial_images": 7})
+    )
+    assert response["status"] == "error"
+    assert "partial_images" in response["error"]
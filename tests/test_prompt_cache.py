@@ -0,0 +1,182 @@
+"""Cache-friendly prompt assembly and Gemini cached-content handles for template prefixes."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from google.genai import errors
+
+from diagram_forge.models import DiagramTemplate, GenerationConfig, GenerationResult, TokenUsage
+from diagram_forge.providers.asset_cache import AssetCache
+from diagram_forge.providers.gemini import GeminiProvider
+from diagram_forge.template_engine import (
+    build_prompt,
+    build_prompt_parts,
+    load_all_templates,
+    render_prompt_parts,
+)
+from tests.conftest import call_tool
+
+from .test_providers.test_gemini import _image_response
+
+
+class TestPromptParts:
+    @pytest.mark.parametrize("name", sorted(load_all_templates()))
+    def test_prefix_is_byte_stable_per_template(self, name):
+        first = build_prompt_parts(name, "first request", resolution="1K", aspect_ratio="1:1")
+        second = build_prompt_parts(
+            name, "second request", user_variables={"title": "Other"}, resolution="4K"
+        )
+        assert first.prefix == second.prefix
+        assert first.text.endswith("first request")
+
+    def test_theme_changes_the_prefix(self):
+        light = build_prompt_parts("architecture", "x", theme="light")
+        dark = build_prompt_parts("architecture", "x", theme="dark")
+        assert light.prefix != dark.prefix
+        assert "BACKGROUND THEME: DARK" in dark.prefix
+
+    def test_dynamic_values_stay_out_of_the_prefix(self):
+        parts = build_prompt_parts(
+            "architecture", "Payments platform", user_variables={"title": "Acme"}, resolution="4K"
+        )
+        for value in ("Payments platform", "Acme", "4K resolution"):
+            assert value not in parts.prefix
+            assert value in parts.dynamic
+        assert (
+            build_prompt("architecture", "Payments platform")
+            == build_prompt_parts("architecture", "Payments platform").text
+        )
+
+    def test_static_paragraphs_move_ahead_of_dynamic_ones(self):
+        t = DiagramTemplate(
+            name="t",
+            display_name="T",
+            description="T",
+            prompt_template="Intro.\n\nTITLE: {title}\n\nRules.\n{style_defaults_block}\n\nEnd {resolution}.",
+        )
+        parts = render_prompt_parts(
+            t, {"title": "Hi", "resolution": "1K"}, extra_instructions="More."
+        )
+        assert parts.prefix.startswith("Intro.\n\nRules.\nSTYLE:")
+        assert parts.dynamic == "TITLE: Hi\n\nEnd 1K.\n\nMore."
+
+    def test_preamble_goes_after_the_prefix(self):
+        parts = build_prompt_parts("generic", "body").with_preamble("STYLE REFERENCE — x")
+        assert parts.dynamic.startswith("STYLE REFERENCE — x\n\n")
+        assert parts.text.startswith(parts.prefix)
+
+
+class _CacheGone(Exception):
+    status_code = 404
+
+    def __init__(self):
+        super().__init__("CachedContent not found (or permission denied)")
+
+
+def _config() -> GenerationConfig:
+    parts = build_prompt_parts("architecture", "Payments platform")
+    return GenerationConfig(prompt=parts.text, prompt_prefix=parts.prefix)
+
+
+def _gemini(generate: AsyncMock, **extra) -> tuple[GeminiProvider, MagicMock]:
+    p = GeminiProvider(api_key="test-key", asset_cache_store=AssetCache(), **extra)
+    client = MagicMock()
+    client.aio.caches.create = AsyncMock(
+        return_value=SimpleNamespace(name="cachedContents/prefix-1", expire_time=None)
+    )
+    client.aio.models.generate_content = generate
+    p._client = client
+    return p, client
+
+
+class TestGeminiPromptCache:
+    @pytest.mark.asyncio
+    async def test_prefix_cached_once_and_only_the_rest_is_sent(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(generate, prompt_cache=True)
+        config = _config()
+
+        for _ in range(2):
+            assert (await p.generate(config)).success
+
+        client.aio.caches.create.assert_awaited_once()
+        created = client.aio.caches.create.await_args.kwargs["config"]
+        assert created.contents == [config.prompt_prefix]
+        kwargs = generate.await_args.kwargs
+        assert kwargs["config"].cached_content == "cachedContents/prefix-1"
+        assert kwargs["contents"] == [config.prompt[len(config.prompt_prefix) :].lstrip("\n")]
+
+    @pytest.mark.asyncio
+    async def test_off_by_default(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(generate)
+        config = _config()
+
+        await p.generate(config)
+
+        client.aio.caches.create.assert_not_awaited()
+        assert generate.await_args.kwargs["contents"] == [config.prompt]
+        assert generate.await_args.kwargs["config"].cached_content is None
+
+    @pytest.mark.asyncio
+    async def test_refused_prefix_is_sent_inline_and_not_retried(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(generate, prompt_cache=True)
+        client.aio.caches.create = AsyncMock(
+            side_effect=errors.ClientError(400, {"error": {"message": "below minimum token count"}})
+        )
+        config = _config()
+
+        for _ in range(2):
+            assert (await p.generate(config)).success
+
+        client.aio.caches.create.assert_awaited_once()
+        assert generate.await_args.kwargs["contents"] == [config.prompt]
+
+    @pytest.mark.asyncio
+    async def test_rejected_handle_falls_back_to_full_prompt(self):
+        generate = AsyncMock(side_effect=[_CacheGone(), _image_response(), _image_response()])
+        p, client = _gemini(generate, prompt_cache=True)
+        config = _config()
+
+        assert (await p.generate(config)).success
+        assert generate.await_args.kwargs["contents"] == [config.prompt]
+
+        # The stale handle was dropped, so the next call creates a fresh one.
+        await p.generate(config)
+        assert client.aio.caches.create.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_server_sends_prefix_and_reports_cache_hits(make_server, stub_factory, tmp_path):
+    async def respond(name, model, config):
+        return GenerationResult(
+            success=True,
+            image_data=b"\x89PNG-img",
+            usage=TokenUsage(input_tokens=900, cached_input_tokens=768, output_tokens=10),
+        )
+
+    factory = stub_factory(respond=respond)
+    reference = tmp_path / "ref.png"
+    reference.write_bytes(b"\x89PNG-ref")
+    app, _ = make_server()
+    response = await call_tool(
+        app,
+        "generate_diagram",
+        {
+            "prompt": "a box",
+            "diagram_type": "architecture",
+            "style_reference": str(reference),
+            "output_path": str(tmp_path / "d.png"),
+        },
+        factory,
+    )
+
+    assert response["cache_hit_tokens"] == 768
+    config = factory.calls[0].config
+    assert config.prompt.startswith(config.prompt_prefix)
+    assert "STYLE REFERENCE" not in config.prompt_prefix
+    assert "STYLE REFERENCE" in config.prompt[len(config.prompt_prefix) :]
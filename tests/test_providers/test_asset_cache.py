@@ -0,0 +1,184 @@
+"""Tests for the remote asset cache and its use by the Gemini provider."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from google.genai import errors
+
+from diagram_forge.models import GenerationConfig
+from diagram_forge.providers.asset_cache import (
+    AssetCache,
+    RemoteAsset,
+    asset_namespace,
+    content_digest,
+)
+from diagram_forge.providers.gemini import GeminiProvider
+
+from .test_gemini import _image_response
+
+
+def _uploader(calls: list):
+    async def upload(data: bytes, mime_type: str, digest: str) -> RemoteAsset:
+        calls.append(digest)
+        await asyncio.sleep(0.01)
+        return RemoteAsset(handle=f"files/{len(calls)}", mime_type=mime_type)
+
+    return upload
+
+
+class TestAssetCache:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_upload(self):
+        cache = AssetCache()
+        calls: list = []
+        results = await asyncio.gather(
+            *[cache.get_or_upload("ns", b"ref", "image/png", _uploader(calls)) for _ in range(5)]
+        )
+        assert len(calls) == 1
+        assert {asset.handle for asset, _ in results} == {"files/1"}
+        assert cache.uploads == 1
+        assert cache.hits == 4
+
+    def test_shared_cache_survives_a_new_event_loop(self):
+        cache = AssetCache()
+        calls: list = []
+
+        async def contend() -> None:
+            await asyncio.gather(
+                *[
+                    cache.get_or_upload("ns", b"ref", "image/png", _uploader(calls))
+                    for _ in range(3)
+                ]
+            )
+            cache.invalidate("ns", content_digest(b"ref"))
+
+        asyncio.run(contend())
+        asyncio.run(contend())
+        assert len(calls) == 2
+
+    def test_expiry_honours_safety_margin(self):
+        cache = AssetCache(safety_margin_s=60)
+        cache.put("ns", "a", RemoteAsset("files/a", "image/png", expires_at=time.time() + 30))
+        cache.put("ns", "b", RemoteAsset("files/b", "image/png", expires_at=time.time() + 3600))
+        assert cache.get("ns", "a") is None
+        assert cache.get("ns", "b").handle == "files/b"
+
+    def test_lru_eviction(self):
+        cache = AssetCache(max_entries=2)
+        cache.put("ns", "a", RemoteAsset("files/a", "image/png"))
+        cache.put("ns", "b", RemoteAsset("files/b", "image/png"))
+        cache.get("ns", "a")
+        cache.put("ns", "c", RemoteAsset("files/c", "image/png"))
+        assert cache.get("ns", "b") is None
+        assert cache.get("ns", "a") is not None
+
+    def test_namespaces_isolate_api_keys(self):
+        assert asset_namespace("gemini", "key-1") != asset_namespace("gemini", "key-2")
+
+
+class _FileGone(Exception):
+    status_code = 403
+
+    def __init__(self):
+        super().__init__("You do not have permission to access the File or it may not exist.")
+
+
+def _gemini(cache: AssetCache, generate: AsyncMock) -> tuple[GeminiProvider, MagicMock]:
+    p = GeminiProvider(api_key="test-key", asset_cache_store=cache, asset_cache_min_bytes=16)
+    client = MagicMock()
+    client.aio.files.upload = AsyncMock(
+        return_value=SimpleNamespace(
+            uri="https://files/abc", mime_type="image/png", expiration_time=None
+        )
+    )
+    client.aio.models.generate_content = generate
+    p._client = client
+    return p, client
+
+
+def _sent_parts(generate: AsyncMock, call: int = -1) -> list:
+    return generate.await_args_list[call].kwargs["contents"]
+
+
+class TestGeminiAssetReuse:
+    @pytest.mark.asyncio
+    async def test_edit_input_uploaded_once_and_sent_by_uri(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(AssetCache(), generate)
+        image = b"\x89PNG" + b"x" * 64
+
+        for _ in range(3):
+            result = await p.edit(image, GenerationConfig(prompt="tweak it"))
+            assert result.success
+
+        assert client.aio.files.upload.await_count == 1
+        first = _sent_parts(generate)[0]
+        assert first.file_data.file_uri == "https://files/abc"
+        assert first.inline_data is None
+
+    @pytest.mark.asyncio
+    async def test_small_images_stay_inline(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(AssetCache(), generate)
+
+        await p.edit(b"tiny", GenerationConfig(prompt="tweak it"))
+
+        client.aio.files.upload.assert_not_awaited()
+        assert _sent_parts(generate)[0].inline_data.data == b"tiny"
+
+    @pytest.mark.asyncio
+    async def test_rejected_handle_falls_back_inline_and_invalidates(self):
+        generate = AsyncMock(side_effect=[_FileGone(), _image_response()])
+        cache = AssetCache()
+        p, _ = _gemini(cache, generate)
+        image = b"\x89PNG" + b"y" * 64
+
+        result = await p.edit(image, GenerationConfig(prompt="tweak it"))
+
+        assert result.success
+        assert _sent_parts(generate, 0)[0].file_data is not None
+        assert _sent_parts(generate, 1)[0].inline_data.data == image
+        assert cache.get(asset_namespace("gemini", "test-key"), content_digest(image)) is None
+
+    @pytest.mark.asyncio
+    async def test_upload_failure_sends_inline(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(AssetCache(), generate)
+        client.aio.files.upload = AsyncMock(
+            side_effect=errors.ClientError(429, {"error": {"message": "quota"}})
+        )
+        image = b"\x89PNG" + b"z" * 64
+
+        result = await p.edit(image, GenerationConfig(prompt="tweak it"))
+
+        assert result.success
+        assert _sent_parts(generate)[0].inline_data.data == image
+
+    @pytest.mark.asyncio
+    async def test_upload_without_uri_sends_inline(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(AssetCache(), generate)
+        client.aio.files.upload = AsyncMock(
+            return_value=SimpleNamespace(uri=None, mime_type="image/png", expiration_time=None)
+        )
+        image = b"\x89PNG" + b"v" * 64
+
+        result = await p.edit(image, GenerationConfig(prompt="tweak it"))
+
+        assert result.success
+        assert _sent_parts(generate)[0].inline_data.data == image
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_extra(self):
+        generate = AsyncMock(return_value=_image_response())
+        p, client = _gemini(AssetCache(), generate)
+        p.use_asset_cache = False
+
+        await p.edit(b"\x89PNG" + b"w" * 64, GenerationConfig(prompt="tweak it"))
+
+        client.aio.files.upload.assert_not_awaited()
@@ -2,14 +2,31 @@
 
 from __future__ import annotations
 
+import asyncio
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from diagram_forge.models import GenerationConfig, Resolution
+from diagram_forge.models import AspectRatio, GenerationConfig, Resolution
 from diagram_forge.providers.gemini import GeminiProvider
 
 
+def _image_response(data: bytes = b"fake-image-data") -> MagicMock:
+    """Build a generate_content response carrying a single inline image part."""
+    mock_part = MagicMock()
+    mock_part.inline_data = MagicMock()
+    mock_part.inline_data.mime_type = "image/png"
+    mock_part.inline_data.data = data
+
+    mock_candidate = MagicMock()
+    mock_candidate.content.parts = [mock_part]
+
+    mock_response = MagicMock()
+    mock_response.candidates = [mock_candidate]
+    return mock_response
+
+
 class TestGeminiProvider:
     def test_default_model(self):
         """Should return the correct default model."""
@@ -51,26 +68,102 @@ class TestGeminiProvider:
 
         # Mock the google.genai module (imported locally in the provider)
         mock_client = MagicMock()
-        mock_part = MagicMock()
-        mock_part.inline_data = MagicMock()
-        mock_part.inline_data.mime_type = "image/png"
-        mock_part.inline_data.data = b"fake-image-data"
-
-        mock_candidate = MagicMock()
-        mock_candidate.content.parts = [mock_part]
-
-        mock_response = MagicMock()
-        mock_response.candidates = [mock_candidate]
-
-        mock_client.models.generate_content.return_value = mock_response
+        mock_client.aio.models.generate_content = AsyncMock(return_value=_image_response())
 
         mock_genai = MagicMock()
         mock_genai.Client.return_value = mock_client
 
         with patch.dict("sys.modules", {"google.genai": mock_genai, "google.genai.types": MagicMock()}):
-            with patch("google.genai.Client", return_value=mock_client):
+            # Also rebind the attribute on the ``google`` package, which ``from google
+            # import genai`` reads once the real module has been imported elsewhere.
+            with (
+                patch("google.genai", mock_genai),
+                patch("google.genai.Client", return_value=mock_client),
+            ):
                 result = await p.generate(config)
 
         assert result.success
         assert result.image_data == b"fake-image-data"
         assert result.cost_usd > 0
+
+    @pytest.mark.asyncio
+    async def test_overlapping_generations_do_not_block_each_other(self):
+        """Two concurrent generations should finish in about the time of one.
+
+        The SDK call used to be synchronous, which stalled the MCP event loop for the
+        full duration of every Gemini request and serialized concurrent tool calls.
+        """
+        delay = 0.3
+
+        async def slow_generate(**_kwargs):
+            await asyncio.sleep(delay)
+            return _image_response()
+
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(side_effect=slow_generate)
+        config = GenerationConfig(prompt="Test diagram", resolution=Resolution.RES_1K)
+
+        with patch("google.genai.Client", return_value=mock_client):
+            start = time.monotonic()
+            results = await asyncio.gather(
+                GeminiProvider(api_key="test-key").generate(config),
+                GeminiProvider(api_key="test-key").generate(config),
+            )
+            elapsed = time.monotonic() - start
+
+        assert all(r.success for r in results)
+        assert elapsed < delay * 1.5
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("model", "expected_size"),
+        [("gemini-3.1-flash-image-preview", "1K"), ("gemini-2.5-flash-image", None)],
+    )
+    async def test_resolution_and_aspect_ratio_reach_image_config(self, model, expected_size):
+        """Resolution maps to imageSize where the model supports it; aspect ratio always."""
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(return_value=_image_response())
+        p = GeminiProvider(api_key="test-key", model=model)
+        p._client = mock_client
+        config = GenerationConfig(
+            prompt="Test diagram", resolution=Resolution.RES_1K, aspect_ratio=AspectRatio.PORTRAIT
+        )
+
+        await p.generate(config)
+
+        image_config = mock_client.aio.models.generate_content.await_args.kwargs[
+            "config"
+        ].image_config
+        assert image_config.aspect_ratio == "9:16"
+        assert image_config.image_size == expected_size
+
+
+class TestGeminiUsage:
+    @pytest.mark.asyncio
+    async def test_usage_metadata_is_summed_across_variants(self):
+        from google.genai import types
+
+        response = _image_response()
+        response.usage_metadata = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=300,
+            cached_content_token_count=100,
+            candidates_token_count=1290,
+            thoughts_token_count=10,
+            prompt_tokens_details=[types.ModalityTokenCount(modality="TEXT", token_count=300)],
+            candidates_tokens_details=[
+                types.ModalityTokenCount(modality="IMAGE", token_count=1290)
+            ],
+        )
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(return_value=response)
+        p = GeminiProvider(api_key="test-key")
+        p._client = mock_client
+
+        result = await p.generate(GenerationConfig(prompt="Test diagram", variants=2))
+
+        assert result.usage.input_tokens == 600
+        assert result.usage.cached_input_tokens == 200
+        assert result.usage.output_tokens == 2600
+        assert result.usage.image_input_tokens == 0
+        assert result.usage.image_output_tokens == 2580
+        assert result.tokens_used == 3200
@@ -0,0 +1,153 @@
+"""Tests for the raw-HTTP provider transport."""
+
+from __future__ import annotations
+
+import base64
+import json
+
+import httpx
+import pytest
+
+from diagram_forge.models import ErrorKind, GenerationConfig
+from diagram_forge.providers.gemini import GeminiProvider
+from diagram_forge.providers.http_transport import RawHttpClient
+from diagram_forge.providers.openai_provider import OpenAIProvider
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def _attach(provider, handler, base_url: str, headers: dict[str, str]) -> list[httpx.Request]:
+    """Point the provider's http client at ``handler``; returns the captured requests."""
+    seen: list[httpx.Request] = []
+
+    def capture(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return handler(request)
+
+    provider._client = RawHttpClient(base_url, headers, transport=httpx.MockTransport(capture))
+    return seen
+
+
+class TestOpenAIHttpTransport:
+    @pytest.mark.asyncio
+    async def test_generate_posts_json_and_decodes_images(self):
+        p = OpenAIProvider(api_key="sk-test", transport="http")
+        seen = _attach(
+            p,
+            lambda _req: httpx.Response(200, json={"data": [{"b64_json": _b64(b"img")}]}),
+            "https://api.openai.com/v1/",
+            {"Authorization": "Bearer sk-test"},
+        )
+
+        result = await p.generate(GenerationConfig(prompt="a box"))
+
+        assert result.success
+        assert result.image_data == b"img"
+        assert seen[0].url.path == "/v1/images/generations"
+        assert seen[0].headers["authorization"] == "Bearer sk-test"
+        body = json.loads(seen[0].content)
+        assert body["prompt"] == "a box"
+        assert body["n"] == 1
+
+    @pytest.mark.asyncio
+    async def test_edit_is_multipart(self):
+        p = OpenAIProvider(api_key="t", transport="http")
+        seen = _attach(
+            p,
+            lambda _req: httpx.Response(200, json={"data": [{"b64_json": _b64(b"edited")}]}),
+            "https://api.openai.com/v1/",
+            {},
+        )
+
+        result = await p.edit(b"\x89PNG-in", GenerationConfig(prompt="make it blue"))
+
+        assert result.image_data == b"edited"
+        assert seen[0].url.path == "/v1/images/edits"
+        assert seen[0].headers["content-type"].startswith("multipart/form-data")
+
+    @pytest.mark.asyncio
+    async def test_http_errors_are_classified_with_retry_after(self):
+        p = OpenAIProvider(api_key="t", transport="http", max_retries=0)
+        _attach(
+            p,
+            lambda _req: httpx.Response(
+                429, headers={"retry-after": "12"}, json={"error": {"code": "rate_limit_exceeded"}}
+            ),
+            "https://api.openai.com/v1/",
+            {},
+        )
+
+        result = await p.generate(GenerationConfig(prompt="a box"))
+
+        assert result.error_kind == ErrorKind.RATE_LIMITED
+        assert result.retry_after_s == 12.0
+
+    @pytest.mark.asyncio
+    async def test_transient_http_error_is_retried(self):
+        p = OpenAIProvider(api_key="t", transport="http", retry_base_delay_s=0.001)
+        responses = iter(
+            [
+                httpx.Response(503, text="overloaded"),
+                httpx.Response(200, json={"data": [{"b64_json": _b64(b"img")}]}),
+            ]
+        )
+        _attach(p, lambda _req: next(responses), "https://api.openai.com/v1/", {})
+
+        result = await p.generate(GenerationConfig(prompt="a box"))
+
+        assert result.success
+        assert result.retries == 1
+
+
+class TestGeminiHttpTransport:
+    @pytest.mark.asyncio
+    async def test_generate_content_over_rest(self):
+        p = GeminiProvider(api_key="g-test", transport="http")
+        payload = {
+            "candidates": [
+                {
+                    "content": {
+                        "parts": [
+                            {"text": "here you go"},
+                            {"inlineData": {"mimeType": "image/png", "data": _b64(b"gem")}},
+                        ]
+                    }
+                }
+            ],
+            "usageMetadata": {
+                "promptTokenCount": 560,
+                "candidatesTokenCount": 1290,
+                "promptTokensDetails": [
+                    {"modality": "TEXT", "tokenCount": 302},
+                    {"modality": "IMAGE", "tokenCount": 258},
+                ],
+            },
+        }
+        seen = _attach(
+            p,
+            lambda _req: httpx.Response(200, json=payload),
+            "https://generativelanguage.googleapis.com/v1beta/",
+            {"x-goog-api-key": "g-test"},
+        )
+
+        result = await p.edit(b"\x89PNG-in", GenerationConfig(prompt="add a box"))
+
+        assert result.success
+        assert result.image_data == b"gem"
+        assert result.usage.input_tokens == 560
+        assert result.usage.image_input_tokens == 258
+        assert result.usage.output_tokens == 1290
+        assert seen[0].url.path == f"/v1beta/models/{p.model}:generateContent"
+        body = json.loads(seen[0].content)
+        parts = body["contents"][0]["parts"]
+        assert parts[0]["inlineData"]["data"] == _b64(b"\x89PNG-in")
+        assert parts[1] == {"text": "add a box"}
+        assert body["generationConfig"]["responseModalities"] == ["IMAGE", "TEXT"]
+        assert body["generationConfig"]["imageConfig"] == {"aspectRatio": "16:9", "imageSize": "2K"}
+
+
+def test_unknown_transport_rejected():
+    with pytest.raises(ValueError, match="transport"):
+        OpenAIProvider(api_key="t", transport="grpc")
@@ -0,0 +1,151 @@
+"""Tests for the offline local provider."""
+
+from __future__ import annotations
+
+import json
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+import yaml
+from PIL import Image
+
+from diagram_forge.cost_tracker import CostTracker
+from diagram_forge.models import (
+    AspectRatio,
+    BatchRequest,
+    ErrorKind,
+    GenerationConfig,
+    OutputFormat,
+    Resolution,
+)
+from diagram_forge.providers import PROVIDER_MAP, get_provider
+from diagram_forge.providers.local import LocalProvider
+from diagram_forge.server import create_server
+
+
+def _size(data: bytes) -> tuple[int, int]:
+    with Image.open(BytesIO(data)) as img:
+        return img.size
+
+
+class TestLocalProvider:
+    def test_registered_and_keyless(self):
+        assert PROVIDER_MAP["local"] is LocalProvider
+        p = get_provider("local", "")
+        assert p.model == "local-placeholder"
+        assert p.get_pricing().cost_per_unit == 0.0
+
+    @pytest.mark.asyncio
+    async def test_output_is_deterministic_per_prompt(self):
+        p = LocalProvider()
+        a = await p.generate(GenerationConfig(prompt="a box"))
+        b = await p.generate(GenerationConfig(prompt="a box"))
+        c = await p.generate(GenerationConfig(prompt="two boxes"))
+        assert a.success
+        assert a.image_data == b.image_data
+        assert a.image_data != c.image_data
+        assert a.cost_usd == 0.0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "resolution, aspect, size",
+        [
+            (Resolution.RES_1K, AspectRatio.WIDE, (1024, 576)),
+            (Resolution.RES_1K, AspectRatio.SQUARE, (1024, 1024)),
+            (Resolution.RES_1K, AspectRatio.PORTRAIT, (576, 1024)),
+            (Resolution.RES_2K, AspectRatio.STANDARD, (2048, 1536)),
+        ],
+    )
+    async def test_renders_requested_dimensions(self, resolution, aspect, size):
+        result = await LocalProvider().generate(
+            GenerationConfig(prompt="x", resolution=resolution, aspect_ratio=aspect)
+        )
+        assert _size(result.image_data) == size
+
+    @pytest.mark.asyncio
+    async def test_variants_are_distinct(self):
+        result = await LocalProvider().generate(GenerationConfig(prompt="x", variants=3))
+        assert len(set(result.images)) == 3
+
+    @pytest.mark.asyncio
+    async def test_higher_compression_gives_smaller_images(self):
+        p = LocalProvider()
+        light = await p.generate(
+            GenerationConfig(prompt="x", output_format="jpeg", output_compression=10)
+        )
+        heavy = await p.generate(
+            GenerationConfig(prompt="x", output_format="jpeg", output_compression=90)
+        )
+        assert len(heavy.image_data) < len(light.image_data)
+
+    @pytest.mark.asyncio
+    async def test_batch_keeps_output_format_and_compression(self):
+        p = LocalProvider()
+        config = GenerationConfig(prompt="x", output_format="webp", output_compression=70)
+        job = await p.submit_batch([BatchRequest(custom_id="item-0", config=config)])
+        results = await p.fetch_batch(await p.poll_batch(job))
+        assert OutputFormat.detect(results["item-0"].image_data) == OutputFormat.WEBP
+        assert results["item-0"].image_data == (await p.generate(config)).image_data
+
+    def test_latency_distributions_are_seeded(self):
+        profile = {"distribution": "lognormal", "median_ms": 100, "sigma": 0.5}
+        a = LocalProvider(latency=profile, seed=7)
+        b = LocalProvider(latency=profile, seed=7)
+        samples = [a._sample_latency_s() for _ in range(5)]
+        assert samples == [b._sample_latency_s() for _ in range(5)]
+        assert all(s > 0 for s in samples)
+        assert (
+            LocalProvider(latency={"distribution": "fixed", "ms": 250})._sample_latency_s() == 0.25
+        )
+
+    def test_unknown_distribution_rejected(self):
+        with pytest.raises(ValueError, match="distribution"):
+            LocalProvider(latency={"distribution": "pareto"})
+
+    @pytest.mark.asyncio
+    async def test_injected_failures_are_classified_and_retried(self):
+        p = LocalProvider(failure_rate=1.0, retry_base_delay_s=0.001)
+        result = await p.generate(GenerationConfig(prompt="x"))
+        assert not result.success
+        assert result.error_kind == ErrorKind.TRANSIENT
+        assert result.retries == p.max_retries
+
+    @pytest.mark.asyncio
+    async def test_injected_rate_limits_carry_retry_after(self):
+        p = LocalProvider(rate_limit_rate=1.0, retry_after_s=30)
+        result = await p.generate(GenerationConfig(prompt="x"))
+        assert result.rate_limited
+        assert result.retry_after_s == 30.0
+
+
+@pytest.mark.asyncio
+async def test_server_runs_offline_with_local_provider(tmp_path, monkeypatch):
+    """No API keys anywhere: the keyless local provider still serves requests."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    cfg = {
+        "default_provider": "local",
+        "provider_fallback_chain": ["local"],
+        "output_directory": str(tmp_path / "out"),
+        "styles_directory": str(tmp_path / "styles"),
+        "database_path": str(tmp_path / "usage.db"),
+        "providers": {
+            "local": {"model": "local-placeholder", "extra": {"latency": {"ms": 5}}},
+        },
+    }
+    cfg_path = tmp_path / "config.yaml"
+    cfg_path.write_text(yaml.dump(cfg))
+    with patch("diagram_forge.server.CostTracker", return_value=CostTracker(tmp_path / "u.db")):
+        app = create_server(str(cfg_path))
+
+    out = tmp_path / "diagram.png"
+    raw = await app.call_tool(
+        "generate_diagram", {"prompt": "a box", "provider": "local", "output_path": str(out)}
+    )
+    if isinstance(raw, tuple):
+        raw = raw[-1]
+    response = raw if isinstance(raw, dict) else json.loads(raw[0].text)
+
+    assert response["status"] == "success"
+    assert response["provider_used"] == "local"
+    assert out.exists()
@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import base64
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
+from openai.types import ImagesResponse
 
-from diagram_forge.models import GenerationConfig, Resolution
+from diagram_forge.models import BillingModel, GenerationConfig, Resolution
 from diagram_forge.providers.openai_provider import OpenAIProvider
 
 
@@ -75,3 +79,61 @@ class TestOpenAIProvider:
         from diagram_forge.models import AspectRatio
         config = GenerationConfig(prompt="test", aspect_ratio=AspectRatio.PORTRAIT)
         assert p._resolve_size(config) == "1024x1536"
+
+
+_USAGE = {
+    "input_tokens": 1000,
+    "input_tokens_details": {"text_tokens": 600, "image_tokens": 400, "cached_tokens": 200},
+    "output_tokens": 4160,
+    "output_tokens_details": {"text_tokens": 0, "image_tokens": 4160},
+    "total_tokens": 5160,
+}
+
+
+def _response_with_usage(usage: dict) -> ImagesResponse:
+    return ImagesResponse.model_validate(
+        {"created": 0, "data": [{"b64_json": base64.b64encode(b"img").decode()}], "usage": usage}
+    )
+
+
+class TestOpenAIUsage:
+    def _provider(self, model: str) -> OpenAIProvider:
+        p = OpenAIProvider(api_key="t", model=model)
+        p._client = MagicMock()
+        p._client.images.generate = AsyncMock(return_value=_response_with_usage(_USAGE))
+        return p
+
+    @pytest.mark.asyncio
+    async def test_usage_is_parsed_and_billed_per_token(self):
+        """Models with published token rates are billed from the reported usage."""
+        result = await self._provider("gpt-image-1-mini").generate(GenerationConfig(prompt="x"))
+
+        assert result.tokens_used == 5160
+        assert result.usage.input_tokens == 1000
+        assert result.usage.cached_input_tokens == 200
+        assert result.usage.image_input_tokens == 400
+        assert result.usage.image_output_tokens == 4160
+        assert result.billing_model == BillingModel.PER_TOKEN
+        # 400 text @ $2, 200 cached @ $0.20, 400 image in @ $2.50, 4160 out @ $8 (per 1M).
+        assert result.cost_usd == pytest.approx((800 + 40 + 1000 + 33280) / 1_000_000)
+
+    @pytest.mark.asyncio
+    async def test_default_model_is_billed_per_token(self):
+        """gpt-image-2 bills image input at its single published input rate."""
+        result = await self._provider("gpt-image-2-2026-04-21").generate(
+            GenerationConfig(prompt="x")
+        )
+
+        assert result.billing_model == BillingModel.PER_TOKEN
+        # 400 text @ $8, 200 cached @ $2, 400 image in @ $8, 4160 out @ $30 (per 1M).
+        assert result.cost_usd == pytest.approx((3200 + 400 + 3200 + 124800) / 1_000_000)
+
+    @pytest.mark.asyncio
+    async def test_unknown_rates_keep_per_image_estimate(self):
+        """Usage is still reported when the model's token rates are not in the table."""
+        p = self._provider("dall-e-3")
+        result = await p.generate(GenerationConfig(prompt="x"))
+
+        assert result.usage.output_tokens == 4160
+        assert result.billing_model == BillingModel.PER_IMAGE
+        assert result.cost_usd == p._estimate_cost(p._resolve_size(GenerationConfig(prompt="x")))
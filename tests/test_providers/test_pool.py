@@ -0,0 +1,137 @@
+"""Tests for the shared provider pool."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from diagram_forge.models import GenerationConfig, Resolution
+from diagram_forge.providers.gemini import GeminiProvider
+from diagram_forge.providers.pool import ProviderPool
+from tests.conftest import MockProvider
+
+
+class _ClosableMock(MockProvider):
+    closed = 0
+
+    async def aclose(self) -> None:
+        type(self).closed += 1
+
+
+def _factory(name: str, api_key: str, **kwargs):
+    return _ClosableMock(api_key=api_key, **kwargs)
+
+
+class TestProviderPool:
+    def test_same_key_returns_same_instance(self):
+        """Repeated lookups for one provider/model/key should reuse the instance."""
+        pool = ProviderPool(factory=_factory)
+        a = pool.get("mock", "key-1", model="m")
+        b = pool.get("mock", "key-1", model="m")
+        assert a is b
+        assert len(pool) == 1
+
+    def test_distinct_keys_and_models_get_distinct_instances(self):
+        """A different API key or model must never share a client."""
+        pool = ProviderPool(factory=_factory)
+        a = pool.get("mock", "key-1", model="m")
+        assert pool.get("mock", "key-2", model="m") is not a
+        assert pool.get("mock", "key-1", model="other") is not a
+        assert len(pool) == 3
+
+    def test_raw_api_key_not_kept_in_pool_keys(self):
+        """Pool keys should hold a digest, not the secret."""
+        pool = ProviderPool(factory=_factory)
+        pool.get("mock", "sk-very-secret", model="m")
+        assert all("sk-very-secret" not in part for key in pool._entries for part in key if part)
+
+    @pytest.mark.asyncio
+    async def test_idle_entries_are_evicted_and_closed(self):
+        """Entries idle past max_idle_s are dropped and their clients closed."""
+        _ClosableMock.closed = 0
+        pool = ProviderPool(factory=_factory, max_idle_s=10)
+        a = pool.get("mock", "key-1")
+        with patch("diagram_forge.providers.pool.time.monotonic", return_value=1e12):
+            b = pool.get("mock", "key-1")
+        await asyncio.sleep(0)
+        assert b is not a
+        assert _ClosableMock.closed == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_at_max_size(self):
+        """The least recently used entry goes first once the pool is full."""
+        pool = ProviderPool(factory=_factory, max_size=2)
+        a = pool.get("mock", "k1")
+        pool.get("mock", "k2")
+        pool.get("mock", "k1")
+        pool.get("mock", "k3")
+        assert len(pool) == 2
+        assert pool.get("mock", "k1") is a
+
+    @pytest.mark.asyncio
+    async def test_provider_evicted_mid_request_closes_after_lease_ends(self):
+        """Eviction must not close a client a leased request is still using."""
+        closed: list[MockProvider] = []
+
+        class _Tracked(MockProvider):
+            async def aclose(self) -> None:
+                closed.append(self)
+
+        pool = ProviderPool(
+            factory=lambda name, api_key, **kw: _Tracked(api_key=api_key, **kw), max_size=1
+        )
+        leased = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def request():
+            async with pool.lease("mock", "k1") as provider:
+                leased.set()
+                await finish.wait()
+                return provider
+
+        task = asyncio.create_task(request())
+        await leased.wait()
+        other = pool.get("mock", "k2")  # LRU-evicts k1 while its request is in flight
+        with patch("diagram_forge.providers.pool.time.monotonic", return_value=1e12):
+            pool.evict_idle()  # idle eviction closes k2 at once; k1 must still wait
+        await asyncio.sleep(0)
+        assert closed == [other]
+
+        finish.set()
+        leased_provider = await task
+        await asyncio.sleep(0)
+        assert closed == [other, leased_provider]
+        assert pool._leases == {}
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_everything(self):
+        """Shutdown hook should close every pooled provider and empty the pool."""
+        _ClosableMock.closed = 0
+        pool = ProviderPool(factory=_factory)
+        pool.get("mock", "k1")
+        pool.get("mock", "k2")
+        await pool.aclose()
+        assert _ClosableMock.closed == 2
+        assert len(pool) == 0
+
+
+class TestClientReuse:
+    @pytest.mark.asyncio
+    async def test_gemini_builds_one_client_for_many_calls(self):
+        """A pooled GeminiProvider should construct its SDK client once."""
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(return_value=MagicMock(candidates=[]))
+        mock_client.aio.aclose = AsyncMock()
+        provider = GeminiProvider(api_key="test-key")
+        config = GenerationConfig(prompt="test", resolution=Resolution.RES_1K)
+
+        with patch("google.genai.Client", return_value=mock_client) as client_cls:
+            await provider.generate(config)
+            await provider.generate(config)
+            await provider.health_check()
+
+        assert client_cls.call_count == 1
+        await provider.aclose()
+        mock_client.aio.aclose.assert_awaited_once()
@@ -0,0 +1,105 @@
+"""Tests for the lazy, entry-point-aware provider registry."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+import textwrap
+from importlib.metadata import EntryPoint
+from unittest.mock import patch
+
+import pytest
+
+from diagram_forge.providers import PROVIDER_MAP, get_provider
+from diagram_forge.providers.registry import ENTRY_POINT_GROUP, ProviderRegistry
+
+_PLUGIN_SOURCE = textwrap.dedent(
+    """
+    from diagram_forge.providers.local import LocalProvider
+
+    class PluginProvider(LocalProvider):
+        pass
+
+    NOT_A_PROVIDER = object()
+    """
+)
+
+
+@pytest.fixture
+def plugin_module(tmp_path, monkeypatch):
+    """An importable provider module that has not been imported yet."""
+    name = f"df_plugin_{tmp_path.name.replace('-', '_')}"
+    (tmp_path / f"{name}.py").write_text(_PLUGIN_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield name
+    sys.modules.pop(name, None)
+
+
+def _entry_points(*points: EntryPoint):
+    return patch("diagram_forge.providers.registry.entry_points", lambda group: list(points))
+
+
+class TestProviderRegistry:
+    def test_listing_does_not_import(self, plugin_module):
+        registry = ProviderRegistry({"plugin": f"{plugin_module}:PluginProvider"})
+        with _entry_points():
+            assert list(registry) == ["plugin"]
+            assert "plugin" in registry
+        assert plugin_module not in sys.modules
+        assert registry.import_times() == {"plugin": None}
+
+    def test_first_lookup_imports_and_times_it(self, plugin_module):
+        target = f"{plugin_module}:PluginProvider"
+        registry = ProviderRegistry({"plugin": target, "alias": target})
+        with _entry_points():
+            cls = registry["plugin"]
+            assert cls.__name__ == "PluginProvider"
+            assert registry["alias"] is cls
+            times = registry.import_times()
+        assert times["plugin"] is not None and times["plugin"] >= 0
+        assert times["alias"] == times["plugin"]
+
+    def test_entry_points_add_providers(self, plugin_module):
+        registry = ProviderRegistry({})
+        point = EntryPoint("acme", f"{plugin_module}:PluginProvider", ENTRY_POINT_GROUP)
+        with _entry_points(point):
+            assert "acme" in registry
+            provider = registry["acme"](api_key="k")
+        assert provider.__class__.__name__ == "PluginProvider"
+
+    def test_plugin_cannot_shadow_builtin(self, plugin_module):
+        registry = ProviderRegistry({"local": "diagram_forge.providers.local:LocalProvider"})
+        point = EntryPoint("local", f"{plugin_module}:PluginProvider", ENTRY_POINT_GROUP)
+        with _entry_points(point):
+            assert list(registry) == ["local"]
+            assert registry["local"].__name__ == "LocalProvider"
+        assert plugin_module not in sys.modules
+
+    def test_non_provider_target_is_rejected(self, plugin_module):
+        registry = ProviderRegistry({"bad": f"{plugin_module}:NOT_A_PROVIDER"})
+        with _entry_points(), pytest.raises(TypeError):
+            registry["bad"]
+
+    def test_unknown_name(self):
+        with _entry_points(), pytest.raises(KeyError):
+            ProviderRegistry({})["nope"]
+
+
+class TestDefaultRegistry:
+    def test_builtins_and_aliases(self):
+        for name in ("gemini", "gemini_flash", "openai", "openai_mini", "local"):
+            assert name in PROVIDER_MAP
+
+    def test_get_provider_unknown_name(self):
+        with pytest.raises(ValueError, match="Unknown provider"):
+            get_provider("no_such_provider", api_key="k")
+
+    def test_package_import_is_sdk_free(self):
+        code = (
+            "import sys, diagram_forge.providers as p; "
+            "assert 'diagram_forge.providers.gemini' not in sys.modules; "
+            "assert 'diagram_forge.providers.openai_provider' not in sys.modules; "
+            "assert 'PIL' not in sys.modules; "
+            "assert p.LocalProvider.__name__ == 'LocalProvider'"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,109 @@
+"""Tests for provider error classification and same-provider retries."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from diagram_forge.models import ErrorKind, GenerationConfig
+from diagram_forge.providers.base import BaseImageProvider
+from diagram_forge.providers.openai_provider import OpenAIProvider
+
+
+def _status_error(status: int, message: str = "", headers: dict | None = None) -> Exception:
+    exc = RuntimeError(f"Error code: {status} - {message}")
+    exc.status_code = status
+    exc.response = SimpleNamespace(headers=headers or {})
+    return exc
+
+
+def _image_response() -> MagicMock:
+    response = MagicMock()
+    response.data = [MagicMock(b64_json="aGVsbG8=")]
+    return response
+
+
+def _provider(side_effect) -> OpenAIProvider:
+    p = OpenAIProvider(api_key="t", retry_base_delay_s=0.001, retry_max_delay_s=0.5)
+    client = MagicMock()
+    client.images.generate = AsyncMock(side_effect=side_effect)
+    p._client = client
+    return p
+
+
+class TestClassifyException:
+    @pytest.mark.parametrize(
+        "exc, kind",
+        [
+            (_status_error(503), ErrorKind.TRANSIENT),
+            (_status_error(500), ErrorKind.TRANSIENT),
+            (_status_error(429, "rate_limit_exceeded"), ErrorKind.RATE_LIMITED),
+            (_status_error(429, "credit_balance_exhausted"), ErrorKind.AUTH),
+            (_status_error(401), ErrorKind.AUTH),
+            (_status_error(400, "content_policy_violation"), ErrorKind.POLICY),
+            (_status_error(400, "invalid size"), ErrorKind.INVALID_REQUEST),
+            (httpx.ConnectError("connection reset"), ErrorKind.TRANSIENT),
+            (TimeoutError(), ErrorKind.TRANSIENT),
+            (ValueError("no idea"), ErrorKind.UNKNOWN),
+        ],
+    )
+    def test_taxonomy(self, exc, kind):
+        assert BaseImageProvider._classify_exception(exc) == kind
+
+
+class TestRetries:
+    @pytest.mark.asyncio
+    async def test_transient_error_is_retried_on_same_provider(self):
+        """A 503 followed by success should succeed without involving the fallback chain."""
+        p = _provider([_status_error(503), _image_response()])
+        result = await p.generate(GenerationConfig(prompt="test"))
+        assert result.success
+        assert result.retries == 1
+
+    @pytest.mark.asyncio
+    async def test_policy_rejection_is_not_retried(self):
+        """Retrying a content-policy rejection only costs time."""
+        p = _provider([_status_error(400, "content_policy_violation"), _image_response()])
+        result = await p.generate(GenerationConfig(prompt="test"))
+        assert not result.success
+        assert result.error_kind == ErrorKind.POLICY
+        assert result.retries == 0
+        assert p._client.images.generate.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_are_bounded(self):
+        """A persistent outage gives up after max_retries and reports the last error."""
+        p = _provider([_status_error(503)] * 10)
+        result = await p.generate(GenerationConfig(prompt="test"))
+        assert not result.success
+        assert result.error_kind == ErrorKind.TRANSIENT
+        assert result.retries == p.max_retries
+        assert "503" in result.error_message
+        assert p._client.images.generate.await_count == p.max_retries + 1
+
+    @pytest.mark.asyncio
+    async def test_short_retry_after_is_honored(self):
+        """A 429 asking for a short wait is retried after that wait."""
+        p = _provider(
+            [_status_error(429, "slow down", {"retry-after-ms": "10"}), _image_response()]
+        )
+        result = await p.generate(GenerationConfig(prompt="test"))
+        assert result.success
+        assert result.retries == 1
+
+    @pytest.mark.asyncio
+    async def test_long_retry_after_falls_through(self):
+        """A 429 asking for a long wait is left to the limiter and fallback chain."""
+        p = _provider([_status_error(429, "slow down", {"retry-after": "120"}), _image_response()])
+        result = await p.generate(GenerationConfig(prompt="test"))
+        assert not result.success
+        assert result.rate_limited
+        assert result.retry_after_s == 120.0
+
+    def test_sdk_retries_disabled(self):
+        """The SDK's own retries would double up with ours."""
+        client = OpenAIProvider(api_key="t")._get_client()
+        assert client.max_retries == 0
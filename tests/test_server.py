@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import pytest
 
-from diagram_forge.server import create_server, _serialize
+from diagram_forge.server import create_server, _image_dimensions, _serialize
 from diagram_forge.models import UsageReport
 
 
@@ -48,6 +48,22 @@ class TestSerialize:
         assert result == ["a", "b", "c"]
 
 
+class TestImageDimensions:
+    def test_reads_png_size(self):
+        """Should report the encoded image's pixel size."""
+        import io
+
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (640, 360)).save(buf, format="PNG")
+        assert _image_dimensions(buf.getvalue()) == {"width": 640, "height": 360}
+
+    def test_unreadable_bytes(self):
+        """Should return None rather than fail on bytes it cannot decode."""
+        assert _image_dimensions(b"not an image") is None
+
+
 class TestCreateServer:
     def test_create_server_returns_app(self):
         """create_server should return a FastMCP instance."""
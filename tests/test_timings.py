@@ -0,0 +1,109 @@
+"""Per-stage `timings` in generation responses and on the cost-ledger row."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+
+import pytest
+
+from diagram_forge.cost_tracker import CostTracker
+from diagram_forge.models import GenerationRecord, GenerationResult
+from diagram_forge.timings import StageTimer
+from tests.conftest import STUB_PNG, call_tool
+
+
+class TestStageTimer:
+    def test_stages_accumulate_and_total_is_added(self):
+        timer = StageTimer()
+        timer.add("network_ms", 10.4)
+        timer.add("network_ms", 5.3)
+        timer.add("decode_ms", -3)  # clamped: a stage never reports negative time
+        with timer.stage("disk_write_ms"):
+            pass
+        timings = timer.as_dict()
+        assert timings["network_ms"] == 16
+        assert timings["decode_ms"] == 0
+        assert "disk_write_ms" in timings
+        assert timings["total_ms"] >= 0
+
+
+@pytest.fixture
+def factory(stub_factory):
+    """openai fails after 30 ms, gemini succeeds after 20 ms with a measured decode."""
+
+    async def respond(name, model, config):
+        if name == "openai":
+            return GenerationResult(success=False, error_message="boom")
+        return GenerationResult(success=True, image_data=STUB_PNG, cost_usd=0.01, decode_ms=4)
+
+    return stub_factory(delays={"openai": 0.03, "gemini": 0.02}, respond=respond)
+
+
+@pytest.mark.asyncio
+async def test_generate_returns_and_persists_timings(make_server, factory, tmp_path):
+    app, tracker = make_server({"openai": "o-model", "gemini": "g-model"})
+    response = await call_tool(
+        app,
+        "generate_diagram",
+        {"prompt": "a box", "diagram_type": "architecture", "output_path": str(tmp_path / "d.png")},
+        factory,
+    )
+
+    assert response["status"] == "success"
+    timings = response["timings"]
+    for stage in (
+        "template_load_ms",
+        "prompt_build_ms",
+        "queue_wait_ms",
+        "network_ms",
+        "decode_ms",
+        "fallback_ms",
+        "disk_write_ms",
+        "ledger_write_ms",
+        "total_ms",
+    ):
+        assert stage in timings, stage
+    assert timings["decode_ms"] == 4
+    assert timings["network_ms"] >= 15
+    # The failed openai attempt is fallback time, not network time of the winner.
+    assert timings["fallback_ms"] >= 25
+    assert timings["total_ms"] >= timings["network_ms"] + timings["fallback_ms"]
+
+    with sqlite3.connect(tracker.db_path) as conn:
+        rows = dict(conn.execute("SELECT provider, timings FROM generations").fetchall())
+    # The winner's row carries the whole breakdown; the failed attempt only its own call.
+    assert json.loads(rows["gemini"]) == timings
+    assert set(json.loads(rows["openai"])) == {"queue_wait_ms", "network_ms", "decode_ms"}
+
+    report = tracker.get_usage_report(days=1)
+    assert report.stage_timings["decode_ms"] == {"count": 1, "avg_ms": 4, "p95_ms": 4}
+    stages = list(report.stage_timings)
+    assert stages[0] == "template_load_ms" and stages[-1] == "total_ms"
+
+
+def test_timings_column_added_to_existing_database(tmp_path):
+    db = tmp_path / "old.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            """
+            CREATE TABLE generations (
+                id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, provider TEXT NOT NULL,
+                model TEXT NOT NULL, diagram_type TEXT, resolution TEXT, aspect_ratio TEXT,
+                tokens_used INTEGER, cost_usd REAL NOT NULL, billing_model TEXT NOT NULL,
+                generation_time_ms INTEGER, success INTEGER NOT NULL, output_path TEXT,
+                template_used TEXT, style_used TEXT, error_message TEXT
+            )
+            """
+        )
+    tracker = CostTracker(db)
+    tracker.record(
+        GenerationRecord(
+            provider="openai",
+            model="m",
+            cost_usd=0.0,
+            billing_model="per_image",
+            timings={"network_ms": 12},
+        )
+    )
+    assert tracker.get_usage_report(days=1).stage_timings["network_ms"]["avg_ms"] == 12
@@ -0,0 +1,179 @@
+"""Multiple variants from a single generate_diagram call."""
+
+from __future__ import annotations
+
+import base64
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from diagram_forge.models import BillingModel, GenerationConfig, GenerationResult
+from diagram_forge.providers.gemini import GeminiProvider
+from diagram_forge.providers.local import LocalProvider
+from diagram_forge.providers.openai_provider import OpenAIProvider
+from tests.conftest import call_tool
+
+
+class TestProviderVariants:
+    @pytest.mark.asyncio
+    async def test_openai_requests_n_images_in_one_call(self):
+        """variants maps to the images API's n, and every image comes back."""
+        p = OpenAIProvider(api_key="t")
+        response = MagicMock()
+        response.data = [
+            MagicMock(b64_json=base64.b64encode(b"img%d" % i).decode()) for i in range(3)
+        ]
+        p._client = MagicMock()
+        p._client.images.generate = AsyncMock(return_value=response)
+
+        result = await p.generate(GenerationConfig(prompt="test", variants=3))
+
+        assert p._client.images.generate.await_count == 1
+        assert p._client.images.generate.await_args.kwargs["n"] == 3
+        assert result.images == [b"img0", b"img1", b"img2"]
+        single = p._estimate_cost(p._resolve_size(GenerationConfig(prompt="x")), "auto")
+        assert result.cost_usd == pytest.approx(single * 3)
+
+    @pytest.mark.asyncio
+    async def test_gemini_returns_one_image_per_variant(self):
+        """Gemini image models take one candidate per request; variants still all arrive."""
+        part = MagicMock()
+        part.inline_data.mime_type = "image/png"
+        part.inline_data.data = b"gem"
+        response = MagicMock()
+        response.candidates = [MagicMock()]
+        response.candidates[0].content.parts = [part]
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(return_value=response)
+        p = GeminiProvider(api_key="t")
+        p._client = client
+
+        result = await p.generate(GenerationConfig(prompt="test", variants=2))
+
+        assert result.success
+        assert len(result.images) == 2
+        assert result.cost_usd == pytest.approx(0.078)
+
+    @pytest.mark.asyncio
+    async def test_gemini_keeps_variants_that_arrived_when_one_fails(self):
+        """Images already paid for are returned; only they are billed."""
+        part = MagicMock()
+        part.inline_data.mime_type = "image/png"
+        part.inline_data.data = b"gem"
+        response = MagicMock()
+        response.candidates = [MagicMock()]
+        response.candidates[0].content.parts = [part]
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(
+            side_effect=[response, ValueError("variant lost"), response]
+        )
+        p = GeminiProvider(api_key="t", max_retries=0)
+        p._client = client
+
+        result = await p.generate(GenerationConfig(prompt="test", variants=3))
+
+        assert result.success
+        assert len(result.images) == 2
+        assert result.cost_usd == pytest.approx(0.078)
+        assert result.metadata["failed_variants"] == 1
+        assert result.metadata["variant_errors"] == ["variant lost"]
+
+    @pytest.mark.asyncio
+    async def test_gemini_fails_only_when_every_variant_fails(self):
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(side_effect=ValueError("down"))
+        p = GeminiProvider(api_key="t", max_retries=0)
+        p._client = client
+
+        result = await p.generate(GenerationConfig(prompt="test", variants=2))
+
+        assert not result.success
+        assert result.error_message == "down"
+
+    @pytest.mark.asyncio
+    async def test_local_keeps_variants_that_arrived_when_one_fails(self):
+        p = LocalProvider(max_retries=0)
+        real_call = p._simulated_call
+
+        async def flaky(config, variant):
+            if variant == 1:
+                raise ValueError("variant lost")
+            return await real_call(config, variant)
+
+        p._simulated_call = flaky
+        result = await p.generate(GenerationConfig(prompt="test", variants=3))
+
+        assert result.success
+        assert len(result.images) == 2
+        assert result.metadata["failed_variants"] == 1
+
+    def test_variants_are_bounded(self):
+        with pytest.raises(ValueError):
+            GenerationConfig(prompt="test", variants=0)
+        with pytest.raises(ValueError):
+            GenerationConfig(prompt="test", variants=99)
+
+
+async def _one_image_per_variant(name, model, config) -> GenerationResult:
+    images = [b"\x89PNG-%d" % i for i in range(config.variants)]
+    return GenerationResult(
+        success=True,
+        image_data=images[0],
+        extra_images=images[1:],
+        cost_usd=0.03 * config.variants,
+        billing_model=BillingModel.PER_IMAGE,
+    )
+
+
+@pytest.mark.asyncio
+async def test_server_saves_every_variant_and_records_per_image_cost(
+    make_server, stub_factory, tmp_path
+):
+    app, tracker = make_server()
+    out = tmp_path / "diagram.png"
+    response = await call_tool(
+        app,
+        "generate_diagram",
+        {"prompt": "a box", "provider": "openai", "output_path": str(out), "variants": 3},
+        stub_factory(respond=_one_image_per_variant),
+    )
+
+    assert response["status"] == "success"
+    assert response["output_path"] == str(out)
+    assert response["output_paths"] == [
+        str(out),
+        str(tmp_path / "diagram_v2.png"),
+        str(tmp_path / "diagram_v3.png"),
+    ]
+    assert all((tmp_path / p).exists() for p in response["output_paths"])
+
+    report = tracker.get_usage_report(days=1)
+    assert report.total_generations == 3
+    assert report.total_cost_usd == pytest.approx(0.09)
+
+
+@pytest.mark.asyncio
+async def test_server_rejects_out_of_range_variants(make_server):
+    app, _ = make_server()
+    response = await call_tool(app, "generate_diagram", {"prompt": "a box", "variants": 9})
+    assert response["status"] == "error"
+    assert "variants" in response["error"]
+
+
+@pytest.mark.asyncio
+async def test_server_reports_produced_dimensions(make_server, tmp_path):
+    app, _ = make_server()
+    response = await call_tool(
+        app,
+        "generate_diagram",
+        {
+            "prompt": "a box",
+            "output_path": str(tmp_path / "square.png"),
+            "resolution": "1K",
+            "aspect_ratio": "1:1",
+        },
+        lambda *_a, **_k: LocalProvider(),
+    )
+
+    assert response["status"] == "success"
+    assert response["dimensions"] == {"width": 1024, "height": 1024}
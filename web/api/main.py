@@ -4,15 +4,26 @@ from __future__ import annotations
 
 import logging
 import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from diagram_forge.providers import default_pool
 from web.api.routers import extract, generate, templates
 
 logger = logging.getLogger("diagram_forge_api")
 
-app = FastAPI(title="Diagram Forge API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Close pooled provider clients on shutdown."""
+    yield
+    await default_pool.aclose()
+
+
+app = FastAPI(title="Diagram Forge API", version="0.1.0", lifespan=lifespan)
 
 # --- CORS ---
 
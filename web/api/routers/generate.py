@@ -4,37 +4,70 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import contextlib
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 
-from diagram_forge.models import GenerationConfig
-from diagram_forge.providers import get_provider
+from diagram_forge.limiter import default_limiters, run_limited
+from diagram_forge.models import ErrorKind, GenerationConfig, OutputFormat
+from diagram_forge.providers import default_pool
 from diagram_forge.template_engine import build_prompt
 
 router = APIRouter()
 
 _MAX_IMAGE_BYTES = 3_145_728  # 3 MB cap
 
+# How often a running generation checks whether the browser has gone away.
+_DISCONNECT_POLL_S = 0.5
+
+# Provider failure kind -> HTTP status returned to the web client.
+_ERROR_KIND_STATUS = {
+    ErrorKind.AUTH: 401,
+    ErrorKind.RATE_LIMITED: 429,
+    ErrorKind.INVALID_REQUEST: 400,
+    ErrorKind.POLICY: 422,
+}
+
 
 class GenerateRequest(BaseModel):
     template_id: str
     content: str = Field(max_length=50_000)
     provider: str
-    api_key: str
+    # Not needed for the offline "local" provider.
+    api_key: str = ""
     model: str | None = None
+    # webp/jpeg come back several times smaller than PNG (OpenAI gpt-image models).
+    output_format: OutputFormat = OutputFormat.PNG
+    output_compression: int | None = Field(default=None, ge=0, le=100)
+    # Total budget for the request; the provider call is cancelled when it runs out.
+    deadline_ms: int = Field(default=60_000, ge=1_000, le=600_000)
 
 
 class GenerateResponse(BaseModel):
     image_base64: str
+    mime_type: str = "image/png"
     provider: str
     model: str
     cost_usd: float
+    generation_time_ms: int = 0
+    queue_wait_ms: int = 0
+
+
+async def _cancel_on_disconnect(request: Request, task: asyncio.Task) -> None:
+    """Cancel ``task`` once the client disconnects; nobody is left to pay for the result."""
+    while not task.done():
+        if await request.is_disconnected():
+            task.cancel()
+            return
+        await asyncio.sleep(_DISCONNECT_POLL_S)
 
 
 @router.post("/generate", response_model=GenerateResponse)
-async def generate_diagram(body: GenerateRequest) -> GenerateResponse:
+async def generate_diagram(body: GenerateRequest, request: Request) -> GenerateResponse:
     """Generate a diagram via a diagram-forge provider."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + body.deadline_ms / 1000
     if body.provider == "auto":
         raise HTTPException(
             status_code=400,
@@ -44,21 +77,46 @@ async def generate_diagram(body: GenerateRequest) -> GenerateResponse:
     # Build the prompt from template + user content
     rendered_prompt = build_prompt(body.template_id, body.content)
 
-    # Instantiate provider
+    # Reuse the pooled provider (and its keep-alive connections) for this key
     try:
         provider_kwargs: dict = {}
         if body.model:
             provider_kwargs["model"] = body.model
-        provider = get_provider(body.provider, body.api_key, **provider_kwargs)
+        default_pool.get(body.provider, body.api_key, **provider_kwargs)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    # Generate with timeout
-    gen_config = GenerationConfig(prompt=rendered_prompt)
+    # Generate within what is left of the deadline, and stop if the client goes away.
+    gen_config = GenerationConfig(
+        prompt=rendered_prompt,
+        output_format=body.output_format,
+        output_compression=body.output_compression,
+    )
+
+    async def _generate():
+        # The lease keeps the client open even if another key's request evicts it.
+        async with default_pool.lease(body.provider, body.api_key, **provider_kwargs) as provider:
+            return await run_limited(
+                default_limiters.get(body.provider, provider.model),
+                lambda: provider.generate(gen_config),
+            )
+
+    generation = asyncio.ensure_future(
+        asyncio.wait_for(_generate(), timeout=max(0.0, deadline - loop.time()))
+    )
+    watcher = asyncio.create_task(_cancel_on_disconnect(request, generation))
     try:
-        result = await asyncio.wait_for(provider.generate(gen_config), timeout=60)
+        result = await generation
     except asyncio.TimeoutError:
-        raise HTTPException(status_code=504, detail="Provider generation timed out (60s limit)")
+        raise HTTPException(
+            status_code=504,
+            detail=f"Provider generation exceeded the {body.deadline_ms} ms deadline",
+        )
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # the server itself is cancelling this handler
+        # 499: the client closed the request; the response is never read.
+        raise HTTPException(status_code=499, detail="Client disconnected; generation cancelled")
     except Exception as exc:
         # Map auth-like errors
         msg = str(exc).lower()
@@ -67,10 +125,15 @@ async def generate_diagram(body: GenerateRequest) -> GenerateResponse:
         if "forbidden" in msg or "403" in msg:
             raise HTTPException(status_code=403, detail=f"Provider access denied: {exc}") from exc
         raise HTTPException(status_code=502, detail=f"Provider error: {exc}") from exc
+    finally:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
 
     # Check generation success
     if not result.success:
-        raise HTTPException(status_code=502, detail=f"Generation failed: {result.error_message}")
+        status = _ERROR_KIND_STATUS.get(result.error_kind, 502)
+        raise HTTPException(status_code=status, detail=f"Generation failed: {result.error_message}")
 
     if result.image_data is None:
         raise HTTPException(status_code=502, detail="Generation succeeded but returned no image data")
@@ -83,10 +146,14 @@ async def generate_diagram(body: GenerateRequest) -> GenerateResponse:
         )
 
     image_b64 = base64.b64encode(result.image_data).decode()
+    produced = OutputFormat.detect(result.image_data) or OutputFormat.PNG
 
     return GenerateResponse(
         image_base64=image_b64,
+        mime_type=produced.mime_type,
         provider=body.provider,
         model=result.model_used,
         cost_usd=result.cost_usd,
+        generation_time_ms=result.generation_time_ms,
+        queue_wait_ms=result.queue_wait_ms,
     )